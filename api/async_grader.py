@@ -0,0 +1,297 @@
+"""
+Remodely AI - Async Website Grader
+Grades many sites concurrently on one event loop; parsing and checks run on an executor
+so a slow site only costs a pending socket, not a blocked worker
+"""
+
+import asyncio
+import atexit
+import os
+import threading
+import time
+
+import aiohttp
+
+from crawler_access import (CRAWL_FILES, CRAWL_FILE_MAX_BYTES, CRAWL_FILE_TIMEOUT, origin_of,
+                            crawl_file_result, crawl_file_failed)
+from grader import WebsiteGrader, FETCH_TIMEOUT
+from http_fetch import read_capped_async
+from http_session import DNS_CACHE_TTL, PhaseTimer
+from page_weight import WeightPrefetch
+from tls_inspect import TLSInspection
+
+MAX_CONNECTIONS = 100
+PER_HOST_CONNECTIONS = 4  # a page and its three crawl files at once
+KEEPALIVE_TIMEOUT = 30  # seconds an idle connection stays in the pool
+
+
+def _phase_trace_config():
+    """
+    aiohttp tracing that fills the PhaseTimer passed as trace_request_ctx
+    aiohttp reports connection setup as one step, so connect includes the TLS handshake
+    """
+    config = aiohttp.TraceConfig()
+
+    def timer_of(ctx):
+        return ctx.trace_request_ctx if isinstance(ctx.trace_request_ctx, PhaseTimer) else None
+
+    async def on_request_start(session, ctx, params):
+        ctx.hop_start = time.perf_counter()
+        ctx.dns_total = 0.0
+
+    async def on_dns_start(session, ctx, params):
+        ctx.dns_start = time.perf_counter()
+
+    async def on_dns_end(session, ctx, params):
+        elapsed = time.perf_counter() - ctx.dns_start
+        ctx.dns_total += elapsed
+        timer = timer_of(ctx)
+        if timer:
+            timer.add('dns', elapsed)
+
+    async def on_connection_start(session, ctx, params):
+        ctx.connection_start = time.perf_counter()
+        ctx.dns_before = ctx.dns_total
+
+    async def on_connection_end(session, ctx, params):
+        timer = timer_of(ctx)
+        if timer:
+            # Connection setup includes the DNS lookup, which was already counted
+            dns = ctx.dns_total - ctx.dns_before
+            timer.add('connect', max(time.perf_counter() - ctx.connection_start - dns, 0.0))
+
+    async def on_hop_end(session, ctx, params):
+        timer = timer_of(ctx)
+        now = time.perf_counter()
+        if timer:
+            timer.end_hop(str(params.url), params.response.status, now - ctx.hop_start)
+        ctx.hop_start = now  # the next redirect hop starts here
+
+    config.on_request_start.append(on_request_start)
+    config.on_dns_resolvehost_start.append(on_dns_start)
+    config.on_dns_resolvehost_end.append(on_dns_end)
+    config.on_connection_create_start.append(on_connection_start)
+    config.on_connection_create_end.append(on_connection_end)
+    config.on_request_redirect.append(on_hop_end)
+    config.on_request_end.append(on_hop_end)
+    return config
+
+
+def create_session(limit=MAX_CONNECTIONS, limit_per_host=PER_HOST_CONNECTIONS):
+    """aiohttp session with bounded total and per-host connections, keep-alive and a DNS cache"""
+    connector = aiohttp.TCPConnector(
+        limit=limit,
+        limit_per_host=limit_per_host,
+        keepalive_timeout=KEEPALIVE_TIMEOUT,
+        use_dns_cache=DNS_CACHE_TTL > 0,
+        ttl_dns_cache=DNS_CACHE_TTL or None,
+    )
+    timeout = aiohttp.ClientTimeout(total=FETCH_TIMEOUT)
+    return aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                 trace_configs=[_phase_trace_config()])
+
+
+class SharedSession:
+    """
+    One event loop on a daemon thread owning one pooled session for the worker process,
+    so blocking callers reuse warm connections instead of opening a session per grade
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop = None
+        self._session = None
+        self._pid = None
+
+    def _start(self):
+        loop = asyncio.new_event_loop()
+        threading.Thread(target=loop.run_forever, name='grader-http', daemon=True).start()
+
+        async def open_session():
+            return create_session()
+
+        self._session = asyncio.run_coroutine_threadsafe(open_session(), loop).result()
+        self._loop = loop
+        self._pid = os.getpid()
+        atexit.register(self.close)
+
+    def close(self):
+        """Close the pooled connections (registered to run at interpreter exit)"""
+        with self._lock:
+            if self._loop is not None and self._pid == os.getpid():
+                asyncio.run_coroutine_threadsafe(self._session.close(), self._loop).result()
+                self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop = None
+            self._session = None
+
+    def run(self, make_coro):
+        """Block until make_coro(session) finishes on the shared loop and return its result"""
+        with self._lock:
+            # A forked worker inherits the loop object but not its thread
+            if self._loop is None or self._pid != os.getpid():
+                self._start()
+        return asyncio.run_coroutine_threadsafe(make_coro(self._session), self._loop).result()
+
+
+shared_session = SharedSession()
+
+
+async def fetch_crawl_file_async(session, url, headers, timeout=CRAWL_FILE_TIMEOUT):
+    """aiohttp version of crawler_access.fetch_crawl_file; never raises"""
+    try:
+        async with session.get(url, headers=headers, allow_redirects=True,
+                               timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            content, truncated = await read_capped_async(response, CRAWL_FILE_MAX_BYTES)
+            return crawl_file_result(str(response.url), response.status, response.headers.get('Content-Type'),
+                                     content, truncated)
+    except asyncio.TimeoutError:
+        return crawl_file_failed(url, 'timed out')
+    except Exception as e:
+        return crawl_file_failed(url, e)
+
+
+class AsyncCrawlFilePrefetch:
+    """crawler_access.CrawlFilePrefetch as tasks on the running loop, sharing the page fetch's session"""
+
+    def __init__(self, session, page_url, headers):
+        self.session = session
+        self.origin = origin_of(page_url)
+        self.headers = headers
+        self._tasks = self._start(self.origin)
+        self.speculation_hit = None
+
+    def _start(self, origin):
+        return {name: asyncio.ensure_future(fetch_crawl_file_async(self.session, origin + path, self.headers))
+                for name, path in CRAWL_FILES.items()}
+
+    def cancel(self):
+        for task in self._tasks.values():
+            task.cancel()
+
+    async def files(self, final_url=None):
+        origin = origin_of(final_url) if final_url else self.origin
+        self.speculation_hit = origin == self.origin
+        if not self.speculation_hit:
+            self.cancel()
+            self.origin = origin
+            self._tasks = self._start(origin)
+        results = await asyncio.gather(*self._tasks.values())
+        return dict(zip(self._tasks, results))
+
+
+class AsyncWebsiteGrader(WebsiteGrader):
+    """
+    WebsiteGrader with a non-blocking fetch
+    executor: where parsing and checks run (None = the loop's default thread pool)
+    """
+
+    def __init__(self, url, session, parser=None, executor=None):
+        super().__init__(url, parser=parser)
+        self.session = session
+        self.executor = executor
+
+    async def fetch_page(self, validators=None, parse=True, prefetch=True, checks=None):
+        """
+        Fetch the webpage without blocking the loop, then parse it on the executor
+        prefetch and checks as for WebsiteGrader.fetch_page
+        """
+        start = time.time()
+        planned = {check.name for check in self.plan_checks(checks)} if prefetch else set()
+        if 'crawler_access' in planned:
+            self.crawl_prefetch = AsyncCrawlFilePrefetch(self.session, self.url, self._request_headers())
+        if 'https' in planned:
+            self.tls_inspection = TLSInspection(self.url)  # blocking handshake, on tls_inspect's own pool
+        try:
+            timer = PhaseTimer(tls=False)
+            async with self.session.get(
+                self.url,
+                headers=self._request_headers(validators),
+                allow_redirects=True,
+                trace_request_ctx=timer
+            ) as response:
+                headers_at = time.time()
+                content, truncated = await read_capped_async(response)
+                self.load_time = time.time() - start
+                timer.download = self.load_time - (headers_at - start)
+                self.timings = timer.summary()
+                self._record_step('fetch', self.load_time)
+                needs_parse = self._store_response(response.status, response.headers,
+                                                   str(response.url), content, truncated)
+        except Exception as e:
+            self._record_step('fetch', time.time() - start)
+            self._cancel_prefetch()
+            self.issues.append(f"Could not fetch website: {str(e) or type(e).__name__}")
+            return False
+
+        if not needs_parse:
+            self._cancel_prefetch()
+        elif 'page_weight' in planned:
+            self.weight_prefetch = WeightPrefetch(self.final_url, self.html, self._request_headers())
+        if needs_parse and parse:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(self.executor, self.parse_page)
+        return True
+
+    def _analyze(self, checks=None):
+        self.run_checks(checks)
+        return self.build_result()
+
+    async def run_full_analysis(self, checks=None):
+        """Run complete website analysis (checks: optional subset of check names)"""
+        if not await self.fetch_page(checks=checks):
+            return {
+                'success': False,
+                'error': 'Could not fetch website',
+                'url': self.url
+            }
+
+        await self.resolve_crawl_files(checks)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self._analyze, checks)
+
+    async def resolve_crawl_files(self, checks=None):
+        """
+        Await the prefetched crawl files before the checks run on the executor, where
+        check_crawler_access couldn't await them; drops them when that check won't run
+        """
+        if not self.crawl_prefetch or self.crawl_files is not None:
+            return
+        if any(check.name == 'crawler_access' for check in self.plan_checks(checks)):
+            self.crawl_files = await self.crawl_prefetch.files(self.final_url)
+        else:
+            self.crawl_prefetch.cancel()
+
+
+async def grade_website_async(url, session=None, parser=None, executor=None, checks=None):
+    """Grade a website on the running event loop"""
+    if session is None:
+        async with create_session() as session:
+            return await grade_website_async(url, session, parser, executor, checks)
+
+    grader = AsyncWebsiteGrader(url, session, parser=parser, executor=executor)
+    return await grader.run_full_analysis(checks)
+
+
+async def grade_websites_async(urls, concurrency=MAX_CONNECTIONS, per_host_limit=PER_HOST_CONNECTIONS,
+                               parser=None, executor=None):
+    """
+    Grade many websites concurrently, yielding (url, result) as each finishes
+    concurrency bounds grades in flight; per_host_limit bounds connections to one host
+    """
+    async with create_session(limit=concurrency, limit_per_host=per_host_limit) as session:
+        slots = asyncio.Semaphore(concurrency)
+
+        async def grade_one(url):
+            async with slots:
+                try:
+                    return url, await grade_website_async(url, session, parser, executor)
+                except Exception as e:
+                    return url, {'success': False, 'error': str(e), 'url': url}
+
+        tasks = [asyncio.ensure_future(grade_one(url)) for url in urls]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
@@ -0,0 +1,277 @@
+"""
+Remodely AI - Offline Bulk Grading
+Grades saved pages - HTML files or WARC archives - with no network, for research and
+for backtesting scoring changes. Pages are graded on a process pool and written one
+JSON line each; the output file doubles as the checkpoint, so a run started again
+with --resume skips every page already in it.
+
+Usage: python api/bulk_grade.py PATH [PATH ...] -o results.jsonl [--workers N] [--resume]
+PATH is an .html file, a directory of them (searched recursively) or a .warc/.warc.gz archive
+"""
+
+import argparse
+import gzip
+import json
+import multiprocessing
+import os
+import sys
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import quote
+
+from grader import WebsiteGrader, grade_saved_page
+
+HTML_SUFFIXES = ('.html', '.htm', '.html.gz', '.htm.gz')
+WARC_SUFFIXES = ('.warc', '.warc.gz')
+HTML_TYPES = ('text/html', 'application/xhtml+xml')
+DEFAULT_BASE_URL = 'https://offline.invalid'  # pages from files get a URL under this
+IN_FLIGHT_PER_WORKER = 4  # pages read ahead per worker; bounds memory on big archives
+PROGRESS_EVERY = 100
+
+
+class JsonlResults:
+    """
+    Appends one JSON object per line, flushed as it is written
+    Each line carries a 'source' key; on resume the sources already in the file are
+    skipped, and a line cut short by a crash is dropped first
+    path '-' streams to stdout (no resume)
+    """
+
+    def __init__(self, path, resume=False):
+        self.path = path
+        self.done = set()
+        if path == '-':
+            self._file = sys.stdout
+            return
+        if os.path.exists(path) and os.path.getsize(path):
+            if not resume:
+                raise FileExistsError(f"{path} already exists - pass --resume to continue it")
+            self.done = self._recover(path)
+        self._file = open(path, 'a', encoding='utf-8')
+
+    @staticmethod
+    def _recover(path):
+        done = set()
+        with open(path, 'rb+') as f:
+            data = f.read()
+            end = data.rfind(b'\n') + 1
+            if end < len(data):
+                f.truncate(end)
+        for line in data[:end].splitlines():
+            try:
+                done.add(json.loads(line)['source'])
+            except (ValueError, KeyError):
+                continue
+        return done
+
+    def write(self, record):
+        self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._file.flush()
+        self.done.add(record['source'])
+
+    def close(self):
+        if self._file is not sys.stdout:
+            self._file.close()
+
+
+def _open(path):
+    return gzip.open(path, 'rb') if path.endswith('.gz') else open(path, 'rb')
+
+
+def _parse_headers(lines):
+    headers = {}
+    for line in lines:
+        name, sep, value = line.decode('latin-1').partition(':')
+        if sep:
+            headers[name.strip().lower()] = value.strip()
+    return headers
+
+
+def _dechunk(body):
+    out = []
+    pos = 0
+    while True:
+        end = body.find(b'\r\n', pos)
+        if end < 0:
+            break
+        size = int(body[pos:end].split(b';')[0] or b'0', 16)
+        if size == 0:
+            break
+        out.append(body[end + 2:end + 2 + size])
+        pos = end + 2 + size + 2
+    return b''.join(out)
+
+
+def parse_http_response(block):
+    """(status, headers, body) of an archived HTTP response, with transfer and content encodings undone"""
+    head, sep, body = block.partition(b'\r\n\r\n')
+    if not sep:
+        head, _, body = block.partition(b'\n\n')
+    lines = head.splitlines()
+    status = int(lines[0].split()[1]) if lines and len(lines[0].split()) > 1 else None
+    headers = _parse_headers(lines[1:])
+
+    if 'chunked' in headers.get('transfer-encoding', '').lower():
+        body = _dechunk(body)
+    encoding = headers.get('content-encoding', '').lower()
+    if encoding in ('gzip', 'x-gzip'):
+        body = gzip.decompress(body)
+    elif encoding == 'deflate':
+        try:
+            body = zlib.decompress(body)
+        except zlib.error:
+            body = zlib.decompress(body, -zlib.MAX_WBITS)  # raw deflate, as some servers send it
+    elif encoding == 'br':
+        import brotli  # optional; records needing it fail on their own if it's missing
+        body = brotli.decompress(body)
+    return status, headers, body
+
+
+def iter_warc_records(path):
+    """(WARC headers, block) for every record; .warc.gz archives are one gzip member per record"""
+    with _open(path) as f:
+        while True:
+            line = f.readline()
+            if not line:
+                return
+            if not line.strip():
+                continue
+            if not line.startswith(b'WARC/'):
+                raise ValueError(f"{path}: expected a WARC record header, got {line[:40]!r}")
+            header_lines = []
+            while True:
+                line = f.readline()
+                if not line.strip():
+                    break
+                header_lines.append(line)
+            headers = _parse_headers(header_lines)
+            yield headers, f.read(int(headers.get('content-length', 0)))
+
+
+def iter_warc_pages(path):
+    """Pages in an archive: (source, url, body, content type, captured at) of each HTML response"""
+    for headers, block in iter_warc_records(path):
+        if headers.get('warc-type') != 'response' or 'application/http' not in headers.get('content-type', ''):
+            continue
+        source = f"{path}#{headers.get('warc-record-id', '')}"
+        url = headers.get('warc-target-uri', '').strip('<>')
+        try:
+            status, http_headers, body = parse_http_response(block)
+        except Exception as e:
+            yield source, url, e, None, headers.get('warc-date')
+            continue
+        content_type = http_headers.get('content-type', '')
+        if status == 200 and content_type.split(';')[0].strip().lower() in HTML_TYPES:
+            yield source, url, body, content_type, headers.get('warc-date')
+
+
+def iter_file_pages(path, base_url):
+    """Pages from an HTML file or a directory of them, each given a URL under base_url"""
+    if os.path.isdir(path):
+        root = path
+        files = (os.path.join(d, name) for d, _, names in sorted(os.walk(path)) for name in sorted(names)
+                 if name.lower().endswith(HTML_SUFFIXES))
+    else:
+        root = os.path.dirname(path)
+        files = [path]
+    for file_path in files:
+        with _open(file_path) as f:
+            body = f.read()
+        rel = os.path.relpath(file_path, root).replace(os.sep, '/')
+        yield file_path, f"{base_url.rstrip('/')}/{quote(rel)}", body, None, None
+
+
+def iter_pages(paths, base_url=DEFAULT_BASE_URL):
+    for path in paths:
+        if path.lower().endswith(WARC_SUFFIXES):
+            yield from iter_warc_pages(path)
+        else:
+            yield from iter_file_pages(path, base_url)
+
+
+def grade_page(source, url, body, content_type, captured_at, parser=None, checks=None):
+    """Runs in a worker process; returns the JSONL record for one page"""
+    record = {'source': source}
+    if captured_at:
+        record['captured_at'] = captured_at
+    try:
+        if isinstance(body, Exception):
+            raise body
+        record.update(grade_saved_page(url, body, content_type, parser=parser, checks=checks))
+    except Exception as e:
+        record.update({'success': False, 'url': url, 'error': f"{type(e).__name__}: {e}"})
+    return record
+
+
+def grade_offline(pages, results, workers=None, parser=None, checks=None, progress=None):
+    """
+    Grade (source, url, body, content type, captured at) pages on a process pool into results
+    Pages whose source results already holds are skipped; returns (graded, failed, skipped)
+    """
+    workers = workers or os.cpu_count() or 2
+    graded = failed = skipped = 0
+    running = set()
+
+    def collect(done):
+        nonlocal graded, failed
+        for future in done:
+            record = future.result()
+            results.write(record)
+            graded += 1
+            failed += not record.get('success')
+            if progress and graded % PROGRESS_EVERY == 0:
+                progress(graded, failed)
+
+    # spawn, not fork, as in grade_pool: workers only need the grader modules
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        for source, url, body, content_type, captured_at in pages:
+            if source in results.done:
+                skipped += 1
+                continue
+            if len(running) >= workers * IN_FLIGHT_PER_WORKER:
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                collect(done)
+            running.add(pool.submit(grade_page, source, url, body, content_type, captured_at, parser, checks))
+        collect(wait(running)[0])
+    return graded, failed, skipped
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Grade saved HTML files and WARC archives offline")
+    parser.add_argument('paths', nargs='+', help=".html files, directories of them, or .warc/.warc.gz archives")
+    parser.add_argument('-o', '--output', required=True, help="JSONL results file ('-' for stdout)")
+    parser.add_argument('--resume', action='store_true', help="continue an interrupted run into the same output")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2, help="grading processes")
+    parser.add_argument('--parser', help="HTML parser backend (default GRADER_PARSER)")
+    parser.add_argument('--checks', help="comma-separated subset of checks to run")
+    parser.add_argument('--base-url', default=DEFAULT_BASE_URL,
+                        help="URL the paths of HTML files are graded under (archives keep their own)")
+    args = parser.parse_args(argv)
+
+    checks = [name.strip() for name in args.checks.split(',') if name.strip()] if args.checks else None
+    try:
+        WebsiteGrader.plan_checks(checks)
+        results = JsonlResults(args.output, resume=args.resume)
+    except (ValueError, FileExistsError) as e:
+        parser.error(str(e))
+
+    started = time.time()
+
+    def progress(graded, failed):
+        rate = graded / max(time.time() - started, 1e-9)
+        print(f"  {graded} graded, {failed} failed, {rate:.1f} pages/s", file=sys.stderr, flush=True)
+
+    try:
+        graded, failed, skipped = grade_offline(iter_pages(args.paths, args.base_url), results,
+                                                args.workers, args.parser, checks, progress)
+    finally:
+        results.close()
+    elapsed = time.time() - started
+    print(f"Graded {graded} pages ({failed} failed, {skipped} already done) in {elapsed:.1f}s"
+          f" - {graded / max(elapsed, 1e-9):.1f} pages/s", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
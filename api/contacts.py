@@ -0,0 +1,79 @@
+"""
+Remodely AI - Contact Extractor
+Pulls phone numbers and email addresses from what a visitor can actually see:
+the visible page text plus tel:/mailto: links. Inline scripts never get scanned.
+"""
+
+import re
+from urllib.parse import unquote
+
+# Characters of visible text scanned per page; pages beyond this are cut off
+CONTACT_SCAN_BUDGET = 200_000
+MAX_RESULTS = 5
+
+# Every quantifier is bounded and matches can only start at a token boundary,
+# so each scan is linear in the text length
+
+# (602) 555-0187, 602.555.0187, +1 602 555 0187 - but not digits inside a longer number
+PHONE_PATTERN = re.compile(
+    r'(?<![\w+])(?:\+?1[-\s.]?)?\(?[0-9]{3}\)?[-\s.]?[0-9]{3}[-\s.]?[0-9]{4}(?!\d)'
+)
+
+EMAIL_PATTERN = re.compile(
+    r'(?<![a-zA-Z0-9._%+-])[a-zA-Z0-9._%+-]{1,64}@[a-zA-Z0-9-]{1,63}(?:\.[a-zA-Z0-9-]{1,63}){0,8}\.[a-zA-Z]{2,24}(?![a-zA-Z])'
+)
+
+# Retina assets like logo@2x.png look like addresses
+ASSET_SUFFIXES = ('.png', '.jpg', '.jpeg', '.gif', '.webp', '.svg', '.avif')
+
+
+def _digits(phone):
+    """Digits only, without the US country code, so tel: links and visible text agree"""
+    digits = re.sub(r'\D', '', phone)
+    if len(digits) == 11 and digits.startswith('1'):
+        digits = digits[1:]
+    return digits
+
+
+def extract_contacts(features, budget=CONTACT_SCAN_BUDGET):
+    """
+    Find phones and emails on a parsed page
+    Returns {'phones': [...], 'emails': [...], 'truncated': bool}; link targets come first
+    """
+    phones = []
+    emails = []
+
+    def add(found, value):
+        if value not in found and len(found) < MAX_RESULTS:
+            found.append(value)
+
+    for href in features.links:
+        scheme, _, target = href.strip().partition(':')
+        scheme = scheme.lower()
+        if scheme == 'tel':
+            digits = _digits(target)
+            if len(digits) >= 7:
+                add(phones, digits)
+        elif scheme == 'mailto':
+            address = unquote(target.split('?', 1)[0]).strip()
+            if EMAIL_PATTERN.fullmatch(address):
+                add(emails, address.lower())
+
+    text = features.visible_text
+    truncated = len(text) > budget
+    if truncated:
+        text = text[:budget]
+
+    for match in PHONE_PATTERN.finditer(text):
+        add(phones, _digits(match.group()))
+        if len(phones) >= MAX_RESULTS:
+            break
+
+    for match in EMAIL_PATTERN.finditer(text):
+        address = match.group().lower()
+        if not address.endswith(ASSET_SUFFIXES):
+            add(emails, address)
+        if len(emails) >= MAX_RESULTS:
+            break
+
+    return {'phones': phones, 'emails': emails, 'truncated': truncated}
@@ -0,0 +1,158 @@
+"""
+Remodely AI - Crawler Access Files
+robots.txt, llms.txt and sitemap.xml decide whether AI assistants and search engines can
+read a site. They are fetched speculatively from the requested URL's origin while the page
+itself downloads, so the grade costs max(page, files) rather than the sum; a redirect to
+another origin (http -> https, bare -> www) throws the guess away and fetches them again.
+The async engine's version of the prefetch lives in async_grader.py.
+"""
+
+import os
+import urllib.robotparser
+from concurrent.futures import ThreadPoolExecutor, wait
+from urllib.parse import urlparse
+
+from http_fetch import read_capped, decode_body
+from http_session import get_session
+
+CRAWL_FILES = {
+    'robots_txt': '/robots.txt',
+    'llms_txt': '/llms.txt',
+    'sitemap': '/sitemap.xml',
+}
+CRAWL_FILE_TIMEOUT = float(os.environ.get('GRADER_CRAWL_FILE_TIMEOUT', 5.0))  # seconds per file
+CRAWL_FILE_MAX_BYTES = 512 * 1024  # Google reads the first 500 KiB of robots.txt too
+CRAWL_FILE_WORKERS = int(os.environ.get('GRADER_CRAWL_FILE_WORKERS', 32))
+
+# User agents of the crawlers behind AI assistants and AI search
+AI_CRAWLERS = [
+    'GPTBot', 'OAI-SearchBot', 'ChatGPT-User', 'ClaudeBot', 'Claude-Web', 'anthropic-ai',
+    'PerplexityBot', 'Google-Extended', 'Applebot-Extended', 'CCBot', 'meta-externalagent',
+    'Bytespider', 'Amazonbot',
+]
+
+_executor = ThreadPoolExecutor(max_workers=CRAWL_FILE_WORKERS, thread_name_prefix='crawl-files')
+
+
+def origin_of(url):
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{parsed.netloc}".lower()
+
+
+def crawl_file_result(url, status, content_type, content, truncated):
+    return {
+        'url': url,
+        'status': status,
+        'content_type': (content_type or '').split(';')[0].strip().lower(),
+        'text': decode_body(content, content_type) if content else '',
+        'truncated': truncated,
+        'error': None,
+    }
+
+
+def crawl_file_failed(url, error):
+    return {'url': url, 'status': None, 'content_type': '', 'text': '', 'truncated': False,
+            'error': str(error) or type(error).__name__}
+
+
+def fetch_crawl_file(url, headers, timeout=CRAWL_FILE_TIMEOUT):
+    """GET one file on the shared pooled session, capped at CRAWL_FILE_MAX_BYTES; never raises"""
+    try:
+        response = get_session().get(url, headers=headers, timeout=timeout, stream=True, allow_redirects=True)
+        content, truncated = read_capped(response, CRAWL_FILE_MAX_BYTES)
+        return crawl_file_result(response.url, response.status_code, response.headers.get('Content-Type'),
+                                 content, truncated)
+    except Exception as e:
+        return crawl_file_failed(url, e)
+
+
+class CrawlFilePrefetch:
+    """
+    Fetches the crawl files of a page's origin on a thread pool, started alongside the page fetch
+    files(final_url) waits for them - or fetches again when the page redirected to another origin
+    """
+
+    def __init__(self, page_url, headers):
+        self.origin = origin_of(page_url)
+        self.headers = headers
+        self._futures = self._start(self.origin)
+        self.speculation_hit = None
+
+    def _start(self, origin):
+        return {name: _executor.submit(fetch_crawl_file, origin + path, self.headers)
+                for name, path in CRAWL_FILES.items()}
+
+    def cancel(self):
+        for future in self._futures.values():
+            future.cancel()
+
+    def files(self, final_url=None):
+        origin = origin_of(final_url) if final_url else self.origin
+        self.speculation_hit = origin == self.origin
+        if not self.speculation_hit:
+            self.cancel()
+            self.origin = origin
+            self._futures = self._start(origin)
+        wait(self._futures.values(), timeout=CRAWL_FILE_TIMEOUT + 1)
+        return {name: future.result() if future.done() and not future.cancelled()
+                else crawl_file_failed(self.origin + CRAWL_FILES[name], 'timed out')
+                for name, future in self._futures.items()}
+
+
+def _is_html(result):
+    """A 200 that is really an HTML page (a soft 404 or a catch-all route), not the file asked for"""
+    head = result['text'][:512].lstrip().lower()
+    return result['content_type'] in ('text/html', 'application/xhtml+xml') or head.startswith(('<!doctype html', '<html'))
+
+
+def audit_robots(result, origin):
+    """Who robots.txt lets crawl the homepage, and the sitemaps it declares"""
+    status = result['status']
+    audit = {'status': status, 'found': False, 'blocks_all': False, 'blocked_ai_crawlers': [], 'sitemaps': []}
+    if status is None:
+        audit['error'] = result['error']  # couldn't check (timeout, connection error) - assume nothing
+        return audit
+    if status >= 500:
+        # Crawlers treat an unreachable robots.txt as "crawl nothing" until it comes back
+        audit['blocks_all'] = True
+        audit['blocked_ai_crawlers'] = list(AI_CRAWLERS)
+        return audit
+    if status >= 400 or _is_html(result):
+        return audit  # no robots.txt: everything may be crawled
+
+    parser = urllib.robotparser.RobotFileParser()
+    parser.parse(result['text'].splitlines())
+    home = origin + '/'
+    audit['found'] = True
+    audit['blocks_all'] = not parser.can_fetch('*', home)
+    audit['blocked_ai_crawlers'] = [bot for bot in AI_CRAWLERS if not parser.can_fetch(bot, home)]
+    audit['sitemaps'] = parser.site_maps() or []
+    return audit
+
+
+def audit_llms_txt(result):
+    found = result['status'] == 200 and bool(result['text'].strip()) and not _is_html(result)
+    return {'status': result['status'], 'found': found, 'bytes': len(result['text'].encode('utf-8')) if found else 0}
+
+
+def audit_sitemap(result, declared):
+    head = result['text'][:2048]
+    found = result['status'] == 200 and ('<urlset' in head or '<sitemapindex' in head)
+    return {
+        'status': result['status'],
+        'found': found or bool(declared),
+        'urls': result['text'].count('<loc>') if found else 0,
+        'index': found and '<sitemapindex' in head,
+        'declared_in_robots': len(declared),
+    }
+
+
+def audit_crawl_files(files, origin, speculation_hit=None):
+    """Summarize fetched crawl files for the crawler_access check and the result details"""
+    robots = audit_robots(files['robots_txt'], origin)
+    return {
+        'robots_txt': robots,
+        'llms_txt': audit_llms_txt(files['llms_txt']),
+        'sitemap': audit_sitemap(files['sitemap'], robots['sitemaps']),
+        'speculative_prefetch_hit': speculation_hit,
+    }
@@ -0,0 +1,102 @@
+"""
+Remodely AI - Page Feature Index
+Everything the grader checks need from a parsed page, collected in one traversal
+"""
+
+# Tags whose text never shows up in get_text() (raw code, template and ruby annotations)
+NON_TEXT_TAGS = {'script', 'style', 'template', 'rt', 'rp'}
+
+# Sections dropped before measuring real content
+BOILERPLATE_TAGS = {'script', 'style', 'nav', 'footer', 'header'}
+
+# The text views are rebuilt by parsing and can be large, so they aren't stored
+TEXT_FIELDS = ('text', 'visible_text', 'content_text')
+
+# <link rel="preload" as=...> values that load a sub-resource, and the kind it counts as
+PRELOAD_KINDS = {'style': 'stylesheet', 'script': 'script', 'font': 'font', 'image': 'image'}
+
+
+class PageFeatures:
+    """
+    Compact index of a parsed page
+    Built once per grade by a parser backend so the checks never walk the DOM themselves
+    """
+
+    def __init__(self):
+        self.tag_counts = {}
+        self.title = None          # text of the first <title>, None if empty or mixed content
+        self.meta = {}             # meta name -> content of the first match
+        self.properties = {}       # meta property (og:*) -> content of the first match
+        self.link_rels = {}        # link rel value -> href of the first match
+        self.links = []            # href of every <a href>
+        self.images = []           # {'src', 'alt', 'loading'} per <img>
+        self.json_ld = []          # raw body of every JSON-LD script
+        self.resources = []        # (kind, url) of every stylesheet, script, font and image the page loads
+        self.text = ''             # all page text, concatenated as-is
+        self.visible_text = ''     # stripped text nodes joined with spaces
+        self.content_text = ''     # visible text without script/style/nav/footer/header
+
+    def to_dict(self):
+        """The extracted features without the text views, for storing alongside a grade"""
+        return {key: value for key, value in vars(self).items() if key not in TEXT_FIELDS}
+
+    @classmethod
+    def from_dict(cls, data):
+        features = cls()
+        for key, value in data.items():
+            setattr(features, key, value)
+        features.resources = [tuple(resource) for resource in features.resources]
+        return features
+
+    def count(self, tag_name):
+        return self.tag_counts.get(tag_name, 0)
+
+    def add_tag(self, name, attrs, node, string_of):
+        """
+        Record the parts of a single tag the checks care about
+        string_of(node) returns the tag's sole text child and is only called for title/script
+        """
+        self.tag_counts[name] = self.tag_counts.get(name, 0) + 1
+
+        if name == 'a':
+            if attrs.get('href') is not None:
+                self.links.append(attrs['href'])
+        elif name == 'img':
+            self.images.append({
+                'src': attrs.get('src'),
+                'alt': attrs.get('alt'),
+                'loading': attrs.get('loading'),
+            })
+            if attrs.get('src'):
+                self.resources.append(('image', attrs['src']))
+        elif name == 'meta':
+            if 'name' in attrs:
+                self.meta.setdefault(attrs['name'], attrs.get('content'))
+            if 'property' in attrs:
+                self.properties.setdefault(attrs['property'], attrs.get('content'))
+        elif name == 'link':
+            rel = attrs.get('rel')
+            if isinstance(rel, str):
+                rel = rel.split()
+            rel = rel or []
+            for value in rel:
+                self.link_rels.setdefault(value, attrs.get('href'))
+            if attrs.get('href'):
+                if 'stylesheet' in rel:
+                    self.resources.append(('stylesheet', attrs['href']))
+                elif 'preload' in rel and attrs.get('as') in PRELOAD_KINDS:
+                    self.resources.append((PRELOAD_KINDS[attrs['as']], attrs['href']))
+        elif name == 'title':
+            if self.tag_counts[name] == 1:
+                self.title = string_of(node)
+        elif name == 'script':
+            if (attrs.get('type') or '').split(';')[0].strip().lower() == 'application/ld+json':
+                self.json_ld.append(string_of(node))
+            elif attrs.get('src'):
+                self.resources.append(('script', attrs['src']))
+
+    def set_text(self, strings, content_strings):
+        """Build the text views from the text nodes collected during the walk"""
+        self.text = ''.join(strings)
+        self.visible_text = ' '.join(s for s in (s.strip() for s in strings) if s)
+        self.content_text = ' '.join(s for s in (s.strip() for s in content_strings) if s)
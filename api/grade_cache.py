@@ -0,0 +1,233 @@
+"""
+Remodely AI - Grade Result Cache
+Keeps recent /api/grade results per normalized URL and revalidates them with
+conditional GETs once they go stale, so repeat grades skip the full analysis
+"""
+
+import itertools
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+from grader import WebsiteGrader
+from grade_history import get_grade_history, reuse_analysis
+from grade_pool import grade_pool, PoolSaturated
+from single_flight import grade_flights
+
+GRADE_CACHE_TTL = int(os.environ.get('GRADE_CACHE_TTL', 300))  # seconds a result is served as-is
+GRADE_CACHE_MAX_ENTRIES = int(os.environ.get('GRADE_CACHE_MAX_ENTRIES', 1000))
+
+
+class GradeCache:
+    """
+    Per-process LRU of grade results
+    Each entry keeps the page's ETag/Last-Modified and content hash for revalidation
+    """
+
+    def __init__(self, ttl=GRADE_CACHE_TTL, max_entries=GRADE_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, result, grader):
+        entry = {
+            'result': result,
+            'etag': grader.headers.get('ETag') if grader.headers else None,
+            'last_modified': grader.headers.get('Last-Modified') if grader.headers else None,
+            'content_hash': grader.content_hash,
+            'stored_at': time.time(),
+        }
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def refresh(self, key, entry, grader):
+        """Mark an entry fresh again after the origin confirmed it unchanged"""
+        with self._lock:
+            entry['stored_at'] = time.time()
+            if grader.headers:
+                entry['etag'] = grader.headers.get('ETag') or entry['etag']
+                entry['last_modified'] = grader.headers.get('Last-Modified') or entry['last_modified']
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+grade_cache = GradeCache()
+
+
+def _with_cache_status(result, status, entry=None):
+    result = dict(result)
+    result['cache'] = {
+        'status': status,
+        'age': round(time.time() - entry['stored_at'], 1) if entry and status == 'hit' else 0,
+    }
+    return result
+
+
+def grade_website_cached(url, refresh=False, cache=None, debug=False, checks=None, block=False, progress=None):
+    """
+    Grade a website, reusing a cached result when possible
+    cache.status in the response:
+        hit         - served from cache within the TTL, no network request
+        revalidated - stale entry confirmed unchanged (304 or same content hash), not rescored
+        incremental - page unchanged since its last stored grade (same content hash): that
+                      analysis was reused and only speed, page weight and overall were rescored
+        miss        - fetched and graded from scratch
+        coalesced   - another request was already grading this page; its result is shared
+    debug adds a per-step 'timing' breakdown of the work done for this request
+    checks: optional subset of check names; a cached full grade still answers it,
+    but a partial grade is never cached
+    Parsing and scoring run on grade_pool; when it is saturated this raises PoolSaturated,
+    or with block=True waits for a free worker
+    progress: optional callback(event, data) called with ('fetched', {url, load_time}) and
+    ('check', (name, score)) as each score is computed - only when this call does the grading
+    """
+    cache = cache or grade_cache
+    key = WebsiteGrader._normalize_url(url)
+    entry = None if refresh else cache.get(key)
+
+    if entry and time.time() - entry['stored_at'] < cache.ttl:
+        return _with_cache_status(entry['result'], 'hit', entry)
+
+    # Concurrent grades of the same page share one fetch and analysis, whoever asked for them
+    flight_key = ('cached', key, tuple(checks) if checks else None)
+
+    def grade():
+        return _grade(url, key, cache, entry, checks, block, progress)
+
+    try:
+        (result, timing), shared = grade_flights.do(flight_key, grade)
+    except PoolSaturated:
+        if not block:
+            raise
+        # The grade this call joined may not have waited for a worker; this caller does
+        (result, timing), shared = grade_flights.do(flight_key, grade)
+    if shared and result.get('success'):
+        result = _with_cache_status(result, 'coalesced')
+    else:
+        result = dict(result)
+
+    if debug and timing is not None:
+        result['timing'] = timing
+    return result
+
+
+def grade_website_streamed(url, checks=None, debug=False):
+    """
+    grade_website_cached() for /api/grade/stream, yielding (event, data) as the grade goes:
+    ('fetched', {url, load_time}), ('check', (name, score)) per check, then ('result', result),
+    or ('error', result) when the page can't be fetched
+    It always regrades, but joins a grade of the same page already in flight; that grade's
+    scores then arrive all at once with its result. Raises PoolSaturated when the pool is full
+    """
+    events = queue.Queue()
+
+    def run():
+        # On its own thread, so the grade is finished (and shared) even if the client goes away
+        try:
+            result = grade_website_cached(url, refresh=True, debug=debug, checks=checks,
+                                          progress=lambda event, data: events.put((event, data)))
+            events.put(('done', result))
+        except Exception as e:
+            events.put(('raised', e))
+
+    threading.Thread(target=run, name='grade-stream', daemon=True).start()
+    sent = set()
+    while True:
+        event, data = events.get()
+        if event == 'raised':
+            raise data
+        if event == 'done':
+            break
+        sent.add(data[0] if event == 'check' else event)
+        yield event, data
+
+    result = data
+    if not result.get('success'):
+        yield 'error', result
+        return
+    if 'fetched' not in sent:
+        yield 'fetched', {'url': result['url'], 'load_time': result['details']['load_time']}
+    for check in WebsiteGrader.plan_checks(checks):
+        if check.name not in sent:
+            yield 'check', (check.name, _result_score(result, check.name))
+    yield 'result', result
+
+
+def _result_score(result, name):
+    """A check's score from a result's scores block, where it may sit in a group (seo, technical...)"""
+    scores = result['scores']
+    if name in scores:
+        return scores[name]
+    for group in scores.values():
+        if isinstance(group, dict) and name in group:
+            return group[name]
+    return None
+
+
+def _grade(url, key, cache, entry, checks, block, progress=None):
+    """Fetch (or revalidate) and score one page; returns (result, timing breakdown)"""
+    grader = WebsiteGrader(url)
+    if not grader.fetch_page(validators=entry, parse=False, checks=checks):
+        return {
+            'success': False,
+            'error': 'Could not fetch website',
+            'url': grader.url,
+            'issues': grader.issues,
+        }, None
+    if progress:
+        progress('fetched', {'url': grader.url,
+                             'load_time': round(grader.load_time, 2) if grader.load_time else None})
+
+    if entry and (grader.not_modified or grader.content_hash == entry['content_hash']):
+        grader._cancel_prefetch()  # the cached result stands; nothing will read them
+        cache.refresh(key, entry, grader)
+        return _with_cache_status(entry['result'], 'revalidated'), grader.timing_breakdown()
+
+    # Only full grades are stored, and only they can pick up from a stored one
+    history = get_grade_history() if checks is None else None
+    stored = None
+    if history:
+        try:
+            stored = history.analysis_for(grader.url, grader.content_hash)
+        except Exception as e:
+            print(f"Grade history lookup failed: {e}")
+
+    reused = reuse_analysis(grader, stored)
+    if not reused:
+        if grade_pool.enabled:
+            scored = grade_pool.iter_checks(grader, checks, block=block)
+        else:
+            grader.parse_page()
+            scored = itertools.chain(grader.iter_checks(checks, defer_volatile=True),
+                                     grader.iter_deferred_checks())
+        for check, score in scored:
+            if progress:
+                progress('check', (check, score))
+
+    result = grader.build_result()
+    if checks is None:
+        cache.put(key, result, grader)
+        if history:
+            try:
+                history.record(grader, result, reused=reused)
+            except Exception as e:
+                print(f"Grade history write failed: {e}")
+    return _with_cache_status(result, 'incremental' if reused else 'miss'), grader.timing_breakdown()
@@ -0,0 +1,229 @@
+"""
+Remodely AI - Grade History
+Every full grade is stored with its page's content hash and scores, and the HTML-only
+analysis of each version of a page is stored once beside them. A regrade whose fetched HTML
+hashes the same reuses that analysis and only reruns the checks that measure the fetch
+itself (TLS, speed, page weight, crawler access and the scores built on them) - as long as
+the checks haven't changed since (ANALYSIS_VERSION). The grade rows also give each page of
+a domain a score history; old rows are pruned per URL and by age, and an analysis goes
+with the last grade that used it.
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
+
+from sqlalchemy import select, delete, func
+from sqlalchemy.orm import sessionmaker
+
+from features import PageFeatures
+from grader import ANALYSIS_VERSION
+from grader_db import grader_database_url, create_grader_engine
+from models import GradeRecord, GradeAnalysis
+
+GRADE_HISTORY_ENABLED = os.environ.get('GRADE_HISTORY', '1').lower() not in ('0', 'false', 'no')
+HISTORY_DEFAULT_LIMIT = 30  # grades per URL in a history response
+HISTORY_MAX_LIMIT = 500
+HISTORY_MAX_PAGES = 100  # URLs per history response, most recently graded first
+# Retention: grades kept per URL, and days a grade is kept at all (0 turns either off)
+GRADE_HISTORY_MAX_PER_URL = int(os.environ.get('GRADE_HISTORY_MAX_PER_URL', 200))
+GRADE_HISTORY_MAX_AGE_DAYS = int(os.environ.get('GRADE_HISTORY_MAX_AGE_DAYS', 365))
+PRUNE_INTERVAL = 3600  # seconds between age sweeps
+
+# Scores whose movement the history endpoint summarizes
+TREND_SCORES = ('overall', 'ai_visibility', 'business_essentials')
+
+
+class GradeHistory:
+    """Stores grades and page analyses; looks up a page version's analysis or the series of each URL of a domain"""
+
+    def __init__(self, engine, max_per_url=GRADE_HISTORY_MAX_PER_URL, max_age_days=GRADE_HISTORY_MAX_AGE_DAYS):
+        self.engine = engine
+        self.max_per_url = max_per_url
+        self.max_age_days = max_age_days
+        GradeRecord.__table__.create(engine, checkfirst=True)
+        GradeAnalysis.__table__.create(engine, checkfirst=True)
+        self.Session = sessionmaker(bind=engine, expire_on_commit=False)
+        self._last_prune = 0
+
+    def analysis_for(self, url, content_hash):
+        """The stored analysis of a normalized URL's HTML with this content hash, or None"""
+        with self.Session() as session:
+            return session.scalars(
+                select(GradeAnalysis)
+                .where(GradeAnalysis.url == url, GradeAnalysis.content_hash == content_hash)
+                .order_by(GradeAnalysis.used_at.desc()).limit(1)
+            ).first()
+
+    def record(self, grader, result, reused=False):
+        """
+        Store a finished full grade, and its analysis unless that is already stored
+        grader.analysis must be set (see run_deferred_checks)
+        """
+        scores = result['scores']
+        now = datetime.utcnow()
+        record = GradeRecord(
+            url=grader.url,
+            domain=grader.domain.lower(),
+            content_hash=grader.content_hash,
+            overall_score=scores.get('overall'),
+            overall_grade=scores.get('overall_grade'),
+            scores=json.dumps(scores),
+            reused=reused,
+            load_time=grader.load_time,
+            page_bytes=grader.page_bytes,
+            graded_at=now,
+        )
+        with self.Session() as session:
+            session.add(record)
+            if grader.content_hash:
+                self._store_analysis(session, grader, now, reused)
+            session.commit()
+            self._prune(session, record.url)
+        return record
+
+    def _store_analysis(self, session, grader, now, reused):
+        """Save the grade's analysis under its URL and content hash, or mark the stored one as used"""
+        stored = session.scalars(
+            select(GradeAnalysis)
+            .where(GradeAnalysis.url == grader.url, GradeAnalysis.content_hash == grader.content_hash)
+            .order_by(GradeAnalysis.used_at.desc()).limit(1)
+        ).first()
+        if stored is None:
+            stored = GradeAnalysis(url=grader.url, content_hash=grader.content_hash, created_at=now)
+            session.add(stored)
+        elif reused:
+            stored.used_at = now
+            return
+        stored.features = json.dumps(grader.features.to_dict())
+        stored.analysis = json.dumps(grader.analysis)
+        stored.analysis_version = ANALYSIS_VERSION
+        stored.used_at = now
+
+    def _prune(self, session, url):
+        """
+        Drop the URL's grades past max_per_url and the analyses no remaining grade of it used;
+        at most hourly, every grade and analysis past max_age_days
+        """
+        if self.max_per_url > 0:
+            stale = session.scalars(
+                select(GradeRecord.id).where(GradeRecord.url == url)
+                .order_by(GradeRecord.graded_at.desc()).offset(self.max_per_url)
+            ).all()
+            if stale:
+                session.execute(delete(GradeRecord).where(GradeRecord.id.in_(stale)))
+                kept = select(GradeRecord.content_hash).where(GradeRecord.url == url,
+                                                              GradeRecord.content_hash.is_not(None))
+                session.execute(
+                    delete(GradeAnalysis).where(GradeAnalysis.url == url, GradeAnalysis.content_hash.not_in(kept))
+                )
+        if self.max_age_days > 0 and time.monotonic() - self._last_prune > PRUNE_INTERVAL:
+            self._last_prune = time.monotonic()
+            cutoff = datetime.utcnow() - timedelta(days=self.max_age_days)
+            session.execute(delete(GradeRecord).where(GradeRecord.graded_at < cutoff))
+            session.execute(delete(GradeAnalysis).where(GradeAnalysis.used_at < cutoff))
+        session.commit()
+
+    def for_domain(self, domain, limit=HISTORY_DEFAULT_LIMIT, url=None):
+        """
+        The domain's grades grouped by normalized URL: [(url, its latest `limit` grades oldest first)],
+        most recently graded URL first. url narrows it to that one page
+        """
+        rank = func.row_number().over(partition_by=GradeRecord.url,
+                                      order_by=GradeRecord.graded_at.desc()).label('rank')
+        ranked = select(GradeRecord.id, rank).where(GradeRecord.domain == domain)
+        if url:
+            ranked = ranked.where(GradeRecord.url == url)
+        ranked = ranked.subquery()
+        with self.Session() as session:
+            records = session.scalars(
+                select(GradeRecord).join(ranked, GradeRecord.id == ranked.c.id)
+                .where(ranked.c.rank <= limit).order_by(GradeRecord.graded_at)
+            ).all()
+
+        pages = {}
+        for record in records:
+            pages.setdefault(record.url, []).append(record)
+        by_latest = sorted(pages.items(), key=lambda page: page[1][-1].graded_at, reverse=True)
+        return by_latest[:HISTORY_MAX_PAGES]
+
+
+def reuse_analysis(grader, stored):
+    """
+    Complete a fetched grader from the stored GradeAnalysis of identical HTML
+    Returns False (leaving the grader untouched) when it can't be reused
+    """
+    if not stored or not stored.analysis or stored.content_hash != grader.content_hash:
+        return False
+    if stored.analysis_version != ANALYSIS_VERSION:
+        return False  # analysed by older (or newer) check logic
+    state = json.loads(stored.analysis)
+    if set(state['deferred_checks']) != grader.volatile_checks():
+        return False  # stored before the checks changed; its deferred set would skip new ones
+    grader.restore_analysis(state, PageFeatures.from_dict(json.loads(stored.features)))
+    grader.run_deferred_checks()
+    return True
+
+
+def normalize_domain(value):
+    """Accepts a bare domain or a URL"""
+    value = value.strip().lower()
+    if '://' in value:
+        value = urlparse(value).netloc
+    return value.split('/')[0]
+
+
+def _trend(grades, key):
+    values = [(grade['scores'] or {}).get(key) for grade in grades]
+    values = [value for value in values if isinstance(value, (int, float))]
+    if not values:
+        return None
+    return {
+        'first': values[0],
+        'latest': values[-1],
+        'change': values[-1] - values[0],
+        'previous_change': values[-1] - values[-2] if len(values) > 1 else None,
+        'min': min(values),
+        'max': max(values),
+    }
+
+
+def history_response(domain, pages):
+    """
+    Payload for the per-domain history endpoint: for each page (normalized URL) of the domain
+    its grades, oldest first, and how the key scores moved
+    Trends never mix pages - a domain's homepage and blog post score differently
+    """
+    results = []
+    for url, records in pages:
+        grades = [record.to_dict() for record in records]
+        results.append({
+            'url': url,
+            'count': len(grades),
+            'grades': grades,
+            'trend': {key: _trend(grades, key) for key in TREND_SCORES},
+        })
+    return {
+        'success': True,
+        'domain': domain,
+        'count': sum(page['count'] for page in results),
+        'pages': results,
+    }
+
+
+_history = None
+_history_lock = threading.Lock()
+
+
+def get_grade_history():
+    """The process's grade history store, created (with its table) on first use; None when disabled"""
+    global _history
+    if not GRADE_HISTORY_ENABLED:
+        return None
+    with _history_lock:
+        if _history is None:
+            _history = GradeHistory(create_grader_engine(grader_database_url()))
+        return _history
@@ -0,0 +1,329 @@
+"""
+Remodely AI - Grading Job Queue
+Durable queue for grades that shouldn't hold an HTTP request open (single grades on request,
+batches and site crawls always): POST returns a job id, background worker threads grade it,
+callers poll for the result. Jobs live in the grade_jobs
+table of the grader database (see grader_db.py), so no broker is needed and several API
+processes can share one queue.
+"""
+
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
+
+from sqlalchemy import select, update, delete, and_, or_, func
+from sqlalchemy.orm import sessionmaker, aliased
+
+from grade_cache import grade_website_cached
+from grader import WebsiteGrader
+from grader_db import grader_database_url, create_grader_engine
+from models import GradeJob
+from site_crawler import crawl_site
+
+GRADE_JOB_WORKERS = int(os.environ.get('GRADE_JOB_WORKERS', 2))  # worker threads per API process
+GRADE_JOB_MAX_ATTEMPTS = int(os.environ.get('GRADE_JOB_MAX_ATTEMPTS', 3))
+# Jobs allowed to run against one host at once, across every worker sharing the queue
+GRADE_JOB_PER_HOST = int(os.environ.get('GRADE_JOB_PER_HOST', 2))
+GRADE_JOB_RETRY_DELAY = 10  # seconds before the first retry, doubled for each later one
+GRADE_JOB_LEASE = 300  # seconds a job may go unrenewed before another worker takes it over
+HEARTBEAT_INTERVAL = GRADE_JOB_LEASE / 3  # seconds between lease renewals of a running job
+GRADE_JOB_QUEUE_TIMEOUT = int(os.environ.get('GRADE_JOB_QUEUE_TIMEOUT', 3600))  # unstarted jobs expire after
+GRADE_JOB_RESULT_TTL = int(os.environ.get('GRADE_JOB_RESULT_TTL', 24 * 3600))  # finished jobs are kept for
+POLL_INTERVAL = 1.0  # seconds an idle worker waits before checking the queue again
+EXPIRE_INTERVAL = 60  # seconds between expiry sweeps
+
+FINISHED = ('done', 'failed', 'expired')
+
+
+def _utcnow():
+    return datetime.utcnow()
+
+
+def _host_of(url):
+    return urlparse(WebsiteGrader._normalize_url(url)).netloc.lower()[:255] or None
+
+
+class GradeJobQueue:
+    """
+    Jobs go queued -> running -> done, or back to queued with a backoff when an attempt fails,
+    and failed after the last attempt. The worker running a job renews its lease while it
+    runs, so only a job whose worker disappears is picked up again once its lease runs out.
+    Unstarted jobs expire; finished ones are deleted after a TTL.
+    """
+
+    def __init__(self, engine, grade_fn=grade_website_cached, crawl_fn=crawl_site):
+        self.engine = engine
+        self.grade_fn = grade_fn
+        self.crawl_fn = crawl_fn
+        GradeJob.__table__.create(engine, checkfirst=True)
+        self.Session = sessionmaker(bind=engine, expire_on_commit=False)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self._last_expire = 0
+
+    def enqueue(self, url, refresh=False, checks=None, max_attempts=GRADE_JOB_MAX_ATTEMPTS):
+        return self.enqueue_many([url], refresh, checks, max_attempts)[0]
+
+    def enqueue_many(self, urls, refresh=False, checks=None, max_attempts=GRADE_JOB_MAX_ATTEMPTS, batch_id=None):
+        """Queue one job per URL in a single transaction; returns the jobs in the same order"""
+        return self._insert(urls, {'refresh': refresh, 'checks': checks}, max_attempts, batch_id)
+
+    def enqueue_crawl(self, url, max_pages, max_depth, max_attempts=GRADE_JOB_MAX_ATTEMPTS):
+        """Queue a site crawl (see site_crawler.py); its result is the site-level grade"""
+        return self._insert([url], {'crawl': {'max_pages': max_pages, 'max_depth': max_depth}}, max_attempts)[0]
+
+    def _insert(self, urls, options, max_attempts, batch_id=None):
+        now = _utcnow()
+        options = json.dumps(options)
+        jobs = [
+            GradeJob(
+                id=str(uuid.uuid4()),
+                url=url,
+                host=_host_of(url),
+                batch_id=batch_id,
+                options=options,
+                status='queued',
+                attempts=0,
+                max_attempts=max_attempts,
+                run_after=now,
+                # created_at orders claims, so a batch is graded in the caller's order
+                created_at=now + timedelta(microseconds=i),
+                expires_at=now + timedelta(seconds=GRADE_JOB_QUEUE_TIMEOUT),
+            )
+            for i, url in enumerate(urls)
+        ]
+        with self.Session() as session:
+            session.add_all(jobs)
+            session.commit()
+        self._wake.set()
+        return jobs
+
+    def get(self, job_id):
+        with self.Session() as session:
+            return session.get(GradeJob, job_id)
+
+    def get_batch(self, batch_id):
+        """A batch's jobs in the order they were queued; empty once they have all been deleted"""
+        with self.Session() as session:
+            return session.scalars(
+                select(GradeJob).where(GradeJob.batch_id == batch_id).order_by(GradeJob.created_at)
+            ).all()
+
+    def claim(self, worker_id):
+        """
+        Take the oldest runnable job (or one whose worker's lease ran out); None if there is none
+        Jobs whose host already has GRADE_JOB_PER_HOST jobs running wait without holding a worker
+        """
+        now = _utcnow()
+        running = aliased(GradeJob)
+        host_load = (
+            select(func.count()).select_from(running)
+            .where(running.host == GradeJob.host, running.status == 'running', running.lease_expires_at >= now)
+            .scalar_subquery()
+        )
+        runnable = and_(
+            GradeJob.attempts < GradeJob.max_attempts,
+            or_(
+                and_(GradeJob.status == 'queued', GradeJob.run_after <= now),
+                and_(GradeJob.status == 'running', GradeJob.lease_expires_at < now),
+            ),
+            or_(GradeJob.host.is_(None), host_load < GRADE_JOB_PER_HOST),
+        )
+        with self.Session() as session:
+            candidates = session.scalars(
+                select(GradeJob.id).where(runnable).order_by(GradeJob.created_at).limit(5)
+            ).all()
+            for job_id in candidates:
+                # Only one worker's conditional update can win a job, in this process or another
+                claimed = session.execute(
+                    update(GradeJob)
+                    .where(GradeJob.id == job_id, runnable)
+                    .values(status='running', locked_by=worker_id, started_at=now,
+                            lease_expires_at=now + timedelta(seconds=GRADE_JOB_LEASE),
+                            attempts=GradeJob.attempts + 1)
+                ).rowcount
+                session.commit()
+                if claimed:
+                    return session.get(GradeJob, job_id)
+        return None
+
+    def _finish(self, job_id, worker_id, **values):
+        """Update a job this worker still holds; False if it lost the lease meanwhile"""
+        with self.Session() as session:
+            updated = session.execute(
+                update(GradeJob)
+                .where(GradeJob.id == job_id, GradeJob.status == 'running', GradeJob.locked_by == worker_id)
+                .values(locked_by=None, lease_expires_at=None, **values)
+            ).rowcount
+            session.commit()
+            return bool(updated)
+
+    def renew(self, job_id, worker_id):
+        """Extend the lease of a job this worker still holds; False if it lost it meanwhile"""
+        with self.Session() as session:
+            updated = session.execute(
+                update(GradeJob)
+                .where(GradeJob.id == job_id, GradeJob.status == 'running', GradeJob.locked_by == worker_id)
+                .values(lease_expires_at=_utcnow() + timedelta(seconds=GRADE_JOB_LEASE))
+            ).rowcount
+            session.commit()
+            return bool(updated)
+
+    def _heartbeat(self, job_id, worker_id, finished):
+        while not finished.wait(HEARTBEAT_INTERVAL):
+            try:
+                if not self.renew(job_id, worker_id):
+                    return
+            except Exception as e:
+                print(f"Grade job lease renewal failed: {e}")
+
+    def complete(self, job, worker_id, result):
+        now = _utcnow()
+        return self._finish(job.id, worker_id, status='done', result=json.dumps(result), error=None,
+                            finished_at=now, expires_at=now + timedelta(seconds=GRADE_JOB_RESULT_TTL))
+
+    def fail(self, job, worker_id, error, result=None):
+        """Re-queue with exponential backoff, or mark failed after the last attempt"""
+        now = _utcnow()
+        if job.attempts < job.max_attempts:
+            delay = GRADE_JOB_RETRY_DELAY * 2 ** (job.attempts - 1)
+            return self._finish(job.id, worker_id, status='queued', error=error,
+                                run_after=now + timedelta(seconds=delay))
+        return self._finish(job.id, worker_id, status='failed', error=error,
+                            result=json.dumps(result) if result is not None else None,
+                            finished_at=now, expires_at=now + timedelta(seconds=GRADE_JOB_RESULT_TTL))
+
+    def expire(self):
+        """Expire jobs nobody started in time, fail abandoned last attempts, delete old finished jobs"""
+        now = _utcnow()
+        keep_until = now + timedelta(seconds=GRADE_JOB_RESULT_TTL)
+        with self.Session() as session:
+            session.execute(
+                update(GradeJob)
+                .where(GradeJob.status == 'queued', GradeJob.expires_at < now)
+                .values(status='expired', error='Job was not started before it expired',
+                        finished_at=now, expires_at=keep_until)
+            )
+            session.execute(
+                update(GradeJob)
+                .where(GradeJob.status == 'running', GradeJob.lease_expires_at < now,
+                       GradeJob.attempts >= GradeJob.max_attempts)
+                .values(status='failed', error='Worker stopped responding', locked_by=None,
+                        lease_expires_at=None, finished_at=now, expires_at=keep_until)
+            )
+            session.execute(
+                delete(GradeJob).where(GradeJob.status.in_(FINISHED), GradeJob.expires_at < now)
+            )
+            session.commit()
+
+    def process(self, job, worker_id):
+        """Grade (or crawl) one claimed job, renewing its lease until it is done"""
+        options = json.loads(job.options or '{}')
+        finished = threading.Event()
+        threading.Thread(target=self._heartbeat, args=(job.id, worker_id, finished),
+                         name=f"grade-job-lease-{job.id[:8]}", daemon=True).start()
+        try:
+            if options.get('crawl'):
+                result = self.crawl_fn(job.url, **options['crawl'])
+            else:
+                result = self.grade_fn(job.url, refresh=bool(options.get('refresh')),
+                                       checks=options.get('checks'), block=True)
+        except Exception as e:
+            self.fail(job, worker_id, str(e) or type(e).__name__)
+            return
+        finally:
+            finished.set()
+        if result.get('success'):
+            self.complete(job, worker_id, result)
+        else:
+            # Usually an unreachable site - worth another try later
+            self.fail(job, worker_id, result.get('error'), result)
+
+    def _work(self, worker_id):
+        while not self._stop.is_set():
+            try:
+                if time.monotonic() - self._last_expire > EXPIRE_INTERVAL:
+                    self._last_expire = time.monotonic()
+                    self.expire()
+                job = self.claim(worker_id)
+            except Exception as e:
+                print(f"Grade job queue error: {e}")
+                self._stop.wait(POLL_INTERVAL * 5)
+                continue
+
+            if job is None:
+                self._wake.wait(POLL_INTERVAL)
+                self._wake.clear()
+                continue
+            self.process(job, worker_id)
+
+    def start_workers(self, count=GRADE_JOB_WORKERS):
+        """Start the background worker threads (once per process)"""
+        if self._threads:
+            return
+        base = f"{socket.gethostname()}:{os.getpid()}"
+        for i in range(count):
+            thread = threading.Thread(target=self._work, args=(f"{base}:{i}",),
+                                      name=f"grade-job-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop_workers(self):
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """The process's job queue, created (with its table) on first use"""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = GradeJobQueue(create_grader_engine(grader_database_url()))
+        return _queue
+
+
+def job_response(job):
+    """Status payload for the polling endpoint; the grade result is included once the job is done"""
+    data = {'success': True, 'job': job.to_dict()}
+    if job.result is not None:
+        data['result'] = json.loads(job.result)
+    return data
+
+
+def batch_response(batch_id, jobs):
+    """
+    Status payload for the batch polling endpoint: how many jobs are in each state, and
+    one {'input', 'job_id', 'status'} entry per URL in the caller's order, with the
+    'result' of every job that has finished so far
+    """
+    counts = {}
+    entries = []
+    for job in jobs:
+        counts[job.status] = counts.get(job.status, 0) + 1
+        entry = {'input': job.url, 'job_id': job.id, 'status': job.status}
+        if job.status in FINISHED:
+            entry['result'] = json.loads(job.result) if job.result is not None else None
+            entry['error'] = job.error
+        entries.append(entry)
+    return {
+        'success': True,
+        'batch_id': batch_id,
+        'count': len(jobs),
+        'finished': sum(counts.get(status, 0) for status in FINISHED),
+        'done': all(job.status in FINISHED for job in jobs),
+        'statuses': counts,
+        'results': entries,
+    }
@@ -0,0 +1,144 @@
+"""
+Remodely AI - URL List Grading
+Grades a list of sites (a file, or stdin) with bounded concurrency and a per-host limit,
+streaming one JSON line per result as each finishes. A checkpoint file records every
+finished URL, so an interrupted run started again with the same checkpoint skips them.
+
+Usage: python api/grader.py --list urls.txt [-o results.jsonl] [--checkpoint run.ckpt]
+       cat urls.txt | python api/grader.py --list - --workers 32 >> results.jsonl
+One URL or bare domain per line; blank lines and # comments are ignored
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from grader import WebsiteGrader, grade_website, grade_websites
+
+DEFAULT_WORKERS = 16
+DEFAULT_PER_HOST = 2
+PROGRESS_EVERY = 100
+
+
+def read_urls(lines):
+    """URLs from text lines, normalized, without duplicates, in input order"""
+    seen = set()
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        url = WebsiteGrader._normalize_url(line.split()[0])
+        if url not in seen:
+            seen.add(url)
+            yield url
+
+
+class Checkpoint:
+    """
+    Append-only record of finished URLs, one 'ok|failed<TAB>url' line each, flushed as written
+    A URL is checkpointed after its result line is flushed, so a crash between the two
+    means that one URL is graded (and output) again on resume, never lost
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.finished = {}
+        if path and os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    status, sep, url = line.rstrip('\n').partition('\t')
+                    if sep and status in ('ok', 'failed'):
+                        self.finished[url] = status
+        self._file = open(path, 'a', encoding='utf-8') if path else None
+
+    def is_done(self, url, retry_failed=False):
+        status = self.finished.get(url)
+        return status == 'ok' or (status == 'failed' and not retry_failed)
+
+    def add(self, url, ok):
+        self.finished[url] = 'ok' if ok else 'failed'
+        if self._file:
+            self._file.write(f"{self.finished[url]}\t{url}\n")
+            self._file.flush()
+
+    def close(self):
+        if self._file:
+            self._file.close()
+
+
+def grade_list(urls, out, checkpoint, workers=DEFAULT_WORKERS, per_host=DEFAULT_PER_HOST,
+               checks=None, retry_failed=False, progress=None):
+    """
+    Grade urls, writing a JSON line to out for each as it finishes
+    URLs the checkpoint already has are skipped; returns (graded, failed, skipped)
+    """
+    todo = []
+    skipped = 0
+    for url in urls:
+        if checkpoint.is_done(url, retry_failed):
+            skipped += 1
+        else:
+            todo.append(url)
+
+    graded = failed = 0
+    for url, result in grade_websites(todo, max_workers=workers, per_host_limit=per_host,
+                                      grade_fn=lambda u: grade_website(u, checks=checks)):
+        ok = bool(result.get('success'))
+        out.write(json.dumps(dict({'source': url}, **result), ensure_ascii=False) + '\n')
+        out.flush()
+        checkpoint.add(url, ok)
+        graded += 1
+        failed += not ok
+        if progress and graded % PROGRESS_EVERY == 0:
+            progress(graded, failed, len(todo))
+    return graded, failed, skipped
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='grader.py --list',
+                                     description="Grade a list of websites, streaming JSONL results")
+    parser.add_argument('source', help="file with one URL or domain per line, or '-' for stdin")
+    parser.add_argument('-o', '--output', default='-', help="JSONL file to append results to (default stdout)")
+    parser.add_argument('--checkpoint', help="file of finished URLs; reuse it to resume an interrupted run")
+    parser.add_argument('--retry-failed', action='store_true',
+                        help="on resume, grade URLs that failed last time again")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="grades in flight at once")
+    parser.add_argument('--per-host', type=int, default=DEFAULT_PER_HOST, help="grades in flight per host")
+    parser.add_argument('--checks', help="comma-separated subset of checks to run")
+    args = parser.parse_args(argv)
+
+    checks = [name.strip() for name in args.checks.split(',') if name.strip()] if args.checks else None
+    try:
+        WebsiteGrader.plan_checks(checks)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.workers < 1 or args.per_host < 1:
+        parser.error("--workers and --per-host must be at least 1")
+
+    source = sys.stdin if args.source == '-' else open(args.source, 'r', encoding='utf-8')
+    out = sys.stdout if args.output == '-' else open(args.output, 'a', encoding='utf-8')
+    checkpoint = Checkpoint(args.checkpoint)
+    started = time.time()
+
+    def progress(graded, failed, total):
+        rate = graded / max(time.time() - started, 1e-9)
+        print(f"  {graded}/{total} graded, {failed} failed, {rate:.1f} sites/s", file=sys.stderr, flush=True)
+
+    try:
+        with source:
+            urls = list(read_urls(source))
+        graded, failed, skipped = grade_list(urls, out, checkpoint, args.workers, args.per_host,
+                                             checks, args.retry_failed, progress)
+    finally:
+        checkpoint.close()
+        if out is not sys.stdout:
+            out.close()
+    print(f"Graded {graded} sites ({failed} failed, {skipped} already done) in {time.time() - started:.1f}s",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
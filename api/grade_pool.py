@@ -0,0 +1,175 @@
+"""
+Remodely AI - Grading Process Pool
+Parsing and scoring are CPU-bound, so they run on a bounded pool of worker processes
+instead of the request thread. Only the fetched HTML goes to a worker; scores, issues
+and recommendations come back. When every worker is busy and the wait queue is full,
+new grades are turned away instead of piling up behind the GIL.
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from features import PageFeatures
+from grader import WebsiteGrader
+
+
+def _usable_cpus():
+    """CPUs this process may run on - in a container, not the host's count"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # not on Linux
+        return os.cpu_count() or 1
+
+
+# Worker processes per API process; 0 grades on the request thread as before. Every gunicorn
+# worker gets its own pool and each process imports the parsers, so the default stays small
+GRADE_POOL_WORKERS = int(os.environ.get('GRADE_POOL_WORKERS', min(2, _usable_cpus())))
+# Grades allowed to wait for a free worker before new ones are rejected
+GRADE_POOL_QUEUE = int(os.environ.get('GRADE_POOL_QUEUE', GRADE_POOL_WORKERS * 4))
+GRADE_POOL_TIMEOUT = 60  # seconds a grade may wait for and run on a worker
+RETRY_AFTER = 5  # seconds suggested to rejected callers
+
+
+class PoolSaturated(Exception):
+    """Every grading worker is busy and the wait queue is full"""
+
+
+class PoolTimeout(PoolSaturated):
+    """A grade waited for, or ran on, a worker longer than GRADE_POOL_TIMEOUT"""
+
+
+def _analyze_in_worker(url, html, parser, load_time, timings, checks):
+    """
+    Runs in a worker process: parse the page and score it
+    Network and volatile checks are left for the caller, which has the fetch they measure
+    """
+    started = time.time()
+    grader = WebsiteGrader(url, parser=parser)
+    grader.html = html
+    grader.load_time = load_time
+    grader.timings = timings
+    grader.parse_page()
+    grader.run_checks(checks, defer_volatile=True)
+    return {
+        'started': started,
+        'scores': grader.scores,
+        'issues': grader.issues,
+        'recommendations': grader.recommendations,
+        'checks_run': grader.checks_run,
+        'deferred_checks': grader.deferred_checks,
+        'features': grader.features.to_dict(),
+        'step_timings': grader.step_timings,
+    }
+
+
+class GradePool:
+    """
+    Bounded process pool with admission control
+    At most workers + queue_size grades are in flight; run_checks() raises PoolSaturated past that
+    """
+
+    def __init__(self, workers=GRADE_POOL_WORKERS, queue_size=GRADE_POOL_QUEUE):
+        self.workers = workers
+        self.queue_size = queue_size
+        self._slots = threading.BoundedSemaphore(max(workers + queue_size, 1))
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self.rejected = 0
+
+    @property
+    def enabled(self):
+        return self.workers > 0
+
+    @property
+    def saturated(self):
+        """True when a grade submitted now would be turned away"""
+        if not self._slots.acquire(blocking=False):
+            return True
+        self._slots.release()
+        return False
+
+    def _get_executor(self):
+        with self._lock:
+            # A forked API worker can't use its parent's pool
+            if self._executor is None or self._pid != os.getpid():
+                # spawn, not fork: the API process has live threads (HTTP pools, event loop)
+                self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                     mp_context=multiprocessing.get_context('spawn'))
+                self._pid = os.getpid()
+            return self._executor
+
+    def _reset(self, executor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def run_checks(self, grader, checks=None, block=False):
+        """
+        Parse and score a fetched grader's page on a worker, then run its network and volatile checks here
+        block=True waits (up to GRADE_POOL_TIMEOUT) for a slot instead of raising PoolSaturated
+        """
+        self.analyze(grader, checks, block)
+        grader.run_deferred_checks()
+
+    def iter_checks(self, grader, checks=None, block=False):
+        """
+        run_checks() yielding (score key, score) per check, like WebsiteGrader.iter_checks():
+        the worker's checks all at once when it returns, then each deferred check as it finishes
+        """
+        self.analyze(grader, checks, block)
+        for check in grader.plan_checks(checks):
+            if check.name not in grader.deferred_checks:
+                yield check.name, grader.scores.get(check.name, 0)
+        yield from grader.iter_deferred_checks()
+
+    def analyze(self, grader, checks=None, block=False):
+        """
+        run_checks() without the deferred checks: they are left for the caller to run (or
+        stream with grader.iter_deferred_checks())
+        """
+        acquired = self._slots.acquire(timeout=GRADE_POOL_TIMEOUT) if block else self._slots.acquire(blocking=False)
+        if not acquired:
+            self.rejected += 1
+            raise PoolSaturated("Grader is at capacity - try again shortly")
+
+        executor = self._get_executor()
+        submitted = time.time()
+        try:
+            future = executor.submit(_analyze_in_worker, grader.url, grader.html, grader.parser,
+                                     grader.load_time, grader.timings, checks)
+        except BaseException:
+            self._slots.release()
+            raise
+        # The slot is only freed once the worker is, even if this caller gives up waiting
+        future.add_done_callback(lambda _: self._slots.release())
+
+        try:
+            state = future.result(timeout=GRADE_POOL_TIMEOUT)
+        except BrokenProcessPool:
+            self._reset(executor)
+            raise
+        except TimeoutError:
+            self.rejected += 1
+            raise PoolTimeout("Grader is overloaded - try again shortly") from None
+
+        grader.scores = state['scores']
+        grader.issues = state['issues']
+        grader.recommendations = state['recommendations']
+        grader.checks_run = state['checks_run']
+        grader.deferred_checks = state['deferred_checks']
+        # Everything but the text views; the deferred checks and the grade history use it
+        grader.features = PageFeatures.from_dict(state['features'])
+
+        # The worker's histograms live in its own process; fold its steps into ours
+        grader._record_step('pool_wait', max(state['started'] - submitted, 0.0))
+        for step, seconds in state['step_timings'].items():
+            grader._record_step(step, seconds)
+
+
+grade_pool = GradePool()
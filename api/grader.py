@@ -3,73 +3,367 @@ Remodely AI - Website & AI Visibility Grader
 Analyzes websites for SEO, performance, and AI discoverability
 """
 
-import requests
 from bs4 import BeautifulSoup
-from urllib.parse import urlparse, urljoin
-import json
-import re
-import ssl
-import socket
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from collections import deque, namedtuple
 import time
 
+from parsers import parse_features
+from keywords import KeywordMatcher
+from contacts import extract_contacts
+from structured_data import extract_json_ld
+from http_fetch import read_capped, decode_body, MAX_PAGE_BYTES
+from http_session import open_page, PhaseTimer
+from page_weight import WeightPrefetch, audit_page_weight
+from crawler_access import CrawlFilePrefetch, audit_crawl_files
+from tls_inspect import (TLSInspection, days_left, EXPIRY_WARNING_DAYS, EXPIRY_NOTICE_DAYS,
+                         X509_EXPIRED, X509_NOT_YET_VALID, X509_SELF_SIGNED, X509_MISSING_ISSUER,
+                         X509_HOSTNAME_MISMATCH)
+from profiling import profiler
+from single_flight import grade_flights
+
+USER_AGENT = 'Mozilla/5.0 (compatible; RemodelySiteGrader/1.0)'
+FETCH_TIMEOUT = 15  # seconds
+
+# Keyword groups found in one pass over the visible page text
+PAGE_KEYWORDS = KeywordMatcher({
+    # Address indicators
+    'address': ['street', 'avenue', 'ave', 'road', 'rd', 'boulevard',
+                'blvd', 'suite', 'floor', 'az', 'arizona', 'phoenix'],
+    # Service area mentions - critical for local businesses
+    'service_area': ['serving', 'service area', 'we serve', 'locations',
+                     'phoenix', 'scottsdale', 'mesa', 'tempe', 'chandler',
+                     'gilbert', 'glendale', 'peoria', 'tucson', 'arizona',
+                     'az', 'valley', 'metro', 'surrounding areas'],
+    # Trust signals - licenses, insurance, certifications
+    'trust': ['licensed', 'insured', 'bonded', 'certified', 'roc#', 'roc #',
+              'license #', 'license:', 'bbb', 'better business', 'accredited',
+              'warranty', 'guarantee', 'satisfaction', 'background check'],
+    'cta': ['free quote', 'free estimate', 'get a quote', 'call now', 'call today',
+            'schedule', 'book', 'contact us', 'request', 'get started'],
+    'portfolio': ['portfolio', 'gallery', 'our work', 'projects', 'before and after',
+                  'recent work', 'completed', 'showcase'],
+    'reviews': ['review', 'testimonial', 'customer said', 'clients say',
+                'what our', 'rated', 'stars', '5 star', 'five star'],
+    'services': ['remodel', 'renovation', 'kitchen', 'bathroom', 'flooring',
+                 'painting', 'plumbing', 'hvac', 'electrical', 'roofing',
+                 'landscaping', 'deck', 'patio', 'addition', 'repair',
+                 'installation', 'maintenance', 'construction'],
+})
+
+# Keyword groups found in the main content (no script/style/nav/footer/header)
+CONTENT_KEYWORDS = KeywordMatcher({
+    'faq': ['faq', 'frequently asked', 'questions', 'q:', 'a:', 'q&a'],
+    'services': ['service', 'we offer', 'we provide', 'our services',
+                 'what we do', 'how we help'],
+})
+
+
+# One grading step: the score key it is requested by, the method that computes it,
+# the score keys it reads (produced by other checks) and the score keys it writes;
+# network checks make their own requests and so never run on a CPU worker process;
+# volatile checks score this particular fetch (its timing) rather than the HTML
+Check = namedtuple('Check', ['name', 'method', 'requires', 'outputs', 'network', 'volatile'],
+                   defaults=(False, False))
+
+# Placeholder left in issues/recommendations where a deferred network check's messages go
+DEFERRED_MARK = '\x00deferred:'
+
+# Version of what the checks compute from a page's HTML. Bump it whenever a check's scoring,
+# messages or outputs change: stored analyses of another version are never reused (grade_history.py)
+ANALYSIS_VERSION = 1
+
+# Share of the overall score per check
+OVERALL_WEIGHTS = {
+    'ai_visibility': 0.22,  # Most important for the future
+    'business_essentials': 0.15,  # Critical for home services
+    'structured_data': 0.12,
+    'meta_tags': 0.10,
+    'mobile': 0.08,
+    'speed': 0.07,
+    'headings': 0.06,
+    'content': 0.06,
+    'social': 0.05,
+    'contact': 0.05,
+    'https': 0.02,
+    'images': 0.02
+}
+
+
 class WebsiteGrader:
-    def __init__(self, url):
+    # Check registry in run order - every check comes after the checks producing what it requires
+    CHECKS = [
+        Check('https', 'check_https', [], ['https'], network=True),
+        Check('mobile', 'check_mobile_viewport', [], ['mobile']),
+        Check('meta_tags', 'check_meta_tags', [], ['meta_tags']),
+        Check('headings', 'check_headings', [], ['headings']),
+        Check('images', 'check_images', [], ['images']),
+        Check('speed', 'check_page_speed', [], ['speed'], volatile=True),
+        Check('page_weight', 'check_page_weight', [], ['page_weight'], network=True),
+        Check('crawler_access', 'check_crawler_access', [], ['crawler_access', 'ai_crawlers_blocked', 'crawl_files'],
+              network=True),
+        Check('structured_data', 'check_structured_data', [], ['structured_data', 'schema_types', 'json_ld']),
+        Check('social', 'check_social_presence', [], ['social', 'social_platforms']),
+        Check('contact', 'check_contact_info', [], ['contact', 'contact_details']),
+        Check('content', 'check_content_quality', [], ['content', 'word_count']),
+        # Home services specific checks
+        Check('business_essentials', 'check_business_essentials', [], ['business_essentials', 'business_factors']),
+        Check('ai_visibility', 'check_ai_visibility',
+              ['structured_data', 'schema_types', 'social_platforms', 'contact', 'word_count',
+               'https', 'business_essentials', 'business_factors', 'ai_crawlers_blocked', 'crawl_files'],
+              ['ai_visibility', 'ai_factors']),
+        Check('overall', 'calculate_overall_score', list(OVERALL_WEIGHTS), ['overall']),
+    ]
+
+    @classmethod
+    def plan_checks(cls, names=None):
+        """
+        The checks to run for the requested names, in run order: the names themselves plus
+        everything they transitively require. None means every check
+        Raises ValueError for a name that isn't a check
+        """
+        if names is None:
+            return list(cls.CHECKS)
+
+        by_name = {check.name: check for check in cls.CHECKS}
+        producers = {output: check for check in cls.CHECKS for output in check.outputs}
+        unknown = [name for name in names if name not in by_name]
+        if unknown:
+            raise ValueError(f"Unknown check(s): {', '.join(unknown)} - available: {', '.join(by_name)}")
+
+        needed = set()
+        stack = [by_name[name] for name in names]
+        while stack:
+            check = stack.pop()
+            if check.name not in needed:
+                needed.add(check.name)
+                stack.extend(producers[key] for key in check.requires)
+        return [check for check in cls.CHECKS if check.name in needed]
+
+    @classmethod
+    def volatile_checks(cls):
+        """
+        Names of the checks whose scores can change while the HTML stays the same:
+        network and volatile checks, plus every check reading their outputs
+        """
+        names, outputs = set(), set()
+        for check in cls.CHECKS:  # run order, so producers come before their readers
+            if check.network or check.volatile or outputs.intersection(check.requires):
+                names.add(check.name)
+                outputs.update(check.outputs)
+        return names
+
+    def __init__(self, url, parser=None):
         self.url = self._normalize_url(url)
         self.domain = urlparse(self.url).netloc
+        self.parser = parser  # HTML parser backend, None = GRADER_PARSER default
         self.html = None
-        self.soup = None
+        self._soup = None
+        self.features = None
+        self._page_keywords = None
         self.headers = None
+        self.status_code = None
+        self.final_url = None
         self.load_time = None
+        self.content_hash = None
+        self.not_modified = False  # True when a conditional fetch got 304
+        self.page_bytes = None
+        self.truncated = False  # True when the page hit MAX_PAGE_BYTES and was cut off
+        self.timings = None  # PhaseTimer.summary() of the page fetch
+        self.page_weight = None  # audit_page_weight() result, None when not audited
+        self.weight_prefetch = None  # resource probes started once the page was fetched
+        self.probe_scope = None  # set by the site crawler so its pages share resource probes
+        self.crawl_prefetch = None  # robots.txt/llms.txt/sitemap.xml fetches started with the page fetch
+        self.crawl_files = None  # their results, once awaited
+        self.crawler_access = None  # audit_crawl_files() result, None when not checked
+        self.tls_inspection = None  # certificate inspection started with the page fetch
+        self.tls = None  # its result, None when not inspected
+        self.step_timings = {}  # step (fetch, parse, check method) -> seconds for this grade
+        self.checks_run = None  # names of the checks a partial run executed, None = all
+        self.deferred_checks = []  # checks skipped by run_checks(defer_network/defer_volatile=True)
+        self.analysis = None  # analysis_state() from before the deferred checks ran
         self.scores = {}
         self.issues = []
         self.recommendations = []
 
-    def _normalize_url(self, url):
+    @staticmethod
+    def _normalize_url(url):
         """Ensure URL has proper format"""
         if not url.startswith(('http://', 'https://')):
             url = 'https://' + url
         return url.rstrip('/')
 
-    def fetch_page(self):
-        """Fetch the webpage and measure load time"""
+    def _cancel_prefetch(self):
+        """Drop the fetches started alongside the page when no check will read them"""
+        for prefetch in (self.crawl_prefetch, self.tls_inspection, self.weight_prefetch):
+            if prefetch:
+                prefetch.cancel()
+
+    def _request_headers(self, validators=None):
+        """
+        Headers for the page request
+        validators: optional {'etag', 'last_modified'} from an earlier fetch to make it conditional
+        """
+        headers = {
+            'User-Agent': USER_AGENT
+        }
+        if validators:
+            if validators.get('etag'):
+                headers['If-None-Match'] = validators['etag']
+            if validators.get('last_modified'):
+                headers['If-Modified-Since'] = validators['last_modified']
+        return headers
+
+    def _store_response(self, status_code, headers, final_url, content, truncated=False):
+        """Keep what the checks need from a response; returns False for a 304 (nothing to parse)"""
+        self.headers = headers
+        self.status_code = status_code
+        self.final_url = final_url
+        if status_code == 304:
+            self.not_modified = True
+            return False
+        self.html = decode_body(content, headers.get('Content-Type'))
+        self.page_bytes = len(content)
+        self.truncated = truncated
+        self.content_hash = hashlib.sha256(content).hexdigest()
+        return True
+
+    def fetch_page(self, validators=None, parse=True, prefetch=True, checks=None):
+        """
+        Fetch the webpage and measure load time
+        A 304 to a conditional request sets self.not_modified and skips parsing
+        parse=False leaves the HTML unparsed (for grading on a worker process)
+        prefetch starts fetching the site's crawl files and inspecting its TLS certificate
+        alongside the page, and sizing its resources once it has arrived (see crawler_access.py,
+        tls_inspect.py and page_weight.py) - each only when the checks that will run
+        (checks: as for run_checks) read it
+        """
+        start = time.time()
+        planned = {check.name for check in self.plan_checks(checks)} if prefetch else set()
+        if 'crawler_access' in planned:
+            self.crawl_prefetch = CrawlFilePrefetch(self.url, self._request_headers())
+        if 'https' in planned:
+            self.tls_inspection = TLSInspection(self.url)
         try:
-            start = time.time()
-            response = requests.get(
-                self.url,
-                timeout=15,
-                headers={
-                    'User-Agent': 'Mozilla/5.0 (compatible; RemodelySiteGrader/1.0)'
-                },
-                allow_redirects=True
-            )
+            timer = PhaseTimer()
+            response = open_page(self.url, self._request_headers(validators), FETCH_TIMEOUT, timer)
+            headers_at = time.time()
+            content, truncated = read_capped(response)
             self.load_time = time.time() - start
-            self.html = response.text
-            self.headers = response.headers
-            self.soup = BeautifulSoup(self.html, 'html.parser')
-            self.final_url = response.url
+            timer.download = self.load_time - (headers_at - start)
+            self.timings = timer.summary()
+            self._record_step('fetch', self.load_time)
+            if self._store_response(response.status_code, response.headers, response.url,
+                                    content, truncated):
+                if 'page_weight' in planned:
+                    self.weight_prefetch = WeightPrefetch(self.final_url, self.html, self._request_headers())
+                if parse:
+                    self.parse_page()
+            else:
+                self._cancel_prefetch()  # 304: nothing gets rescored
             return True
         except Exception as e:
+            self._record_step('fetch', time.time() - start)
+            self._cancel_prefetch()
             self.issues.append(f"Could not fetch website: {str(e)}")
             return False
 
+    def parse_page(self):
+        """Parse the fetched HTML once and index everything the checks read"""
+        self._soup = None
+        self._page_keywords = None
+        start = time.perf_counter()
+        self.features = parse_features(self.html, self.parser)
+        self._record_step('parse', time.perf_counter() - start)
+
+    def _record_step(self, step, seconds):
+        """Time one grading step for this grade's breakdown and the process-wide histograms"""
+        self.step_timings[step] = self.step_timings.get(step, 0) + seconds
+        profiler.record(step, seconds)
+
+    def timing_breakdown(self):
+        """Milliseconds per step of this grade, for debug responses"""
+        steps = {step: round(seconds * 1000, 1) for step, seconds in self.step_timings.items()}
+        return {'steps': steps, 'total_ms': round(sum(steps.values()), 1)}
+
+    def page_keywords(self):
+        """PAGE_KEYWORDS hits for the visible text, scanned once and shared by the checks"""
+        if self._page_keywords is None:
+            self._page_keywords = PAGE_KEYWORDS.scan(self.features.visible_text.lower())
+        return self._page_keywords
+
+    @property
+    def soup(self):
+        """BeautifulSoup tree of the page, built on first access (the checks don't need it)"""
+        if self._soup is None and self.html is not None:
+            self._soup = BeautifulSoup(self.html, 'html.parser')
+        return self._soup
+
     def check_https(self):
-        """Check if site uses HTTPS"""
-        score = 0
-        if self.url.startswith('https://'):
-            score = 100
-        else:
+        """
+        Check the site is served over HTTPS with a certificate browsers accept
+        Fetched pages get their certificate inspected (expiry, chain, hostname, protocol);
+        pages graded offline only have their URL to go by
+        """
+        url = self.final_url or self.url
+        if not url.startswith('https://'):
             self.issues.append("Website not using HTTPS - security risk")
             self.recommendations.append("Install SSL certificate for HTTPS")
+            self.scores['https'] = 0
+            return 0
+
+        score = 100
+        if self.status_code is not None:
+            if self.tls_inspection is None:
+                self.tls_inspection = TLSInspection(url)
+            inspection = self.tls_inspection.result(url)
+            self.tls = dict(inspection, days_left=days_left(inspection))
+            tls = self.tls
+            host = tls['host']
+            if tls.get('error'):
+                pass  # couldn't inspect; the page itself still loaded over HTTPS
+            elif not tls['chain_valid'] or tls['hostname_match'] is False:
+                score = 0
+                code = tls['verify_code']
+                if code == X509_EXPIRED:
+                    self.issues.append(f"SSL certificate expired on {tls['not_after'][:10]} - browsers block the site")
+                elif code == X509_NOT_YET_VALID:
+                    self.issues.append(f"SSL certificate isn't valid until {tls['not_before'][:10]}")
+                elif code in X509_SELF_SIGNED:
+                    self.issues.append("SSL certificate is self-signed - browsers show a security warning")
+                elif code in X509_MISSING_ISSUER:
+                    self.issues.append("SSL certificate chain is incomplete - some browsers and phones show a security warning")
+                    self.recommendations.append("Install the intermediate certificates from your certificate provider")
+                elif code == X509_HOSTNAME_MISMATCH:
+                    self.issues.append(f"SSL certificate doesn't cover {host} - browsers show a security warning")
+                    self.recommendations.append(f"Get a certificate that covers {host} (and its www. version)")
+                else:
+                    self.issues.append(f"SSL certificate isn't trusted: {tls['verify_error']}")
+                self.recommendations.append("Reissue your SSL certificate (Let's Encrypt certificates are free)")
+            elif tls['days_left'] is not None and tls['days_left'] < EXPIRY_WARNING_DAYS:
+                score = 60
+                self.issues.append(f"SSL certificate expires in {tls['days_left']} days")
+                self.recommendations.append("Renew your SSL certificate now and turn on auto-renewal")
+            elif tls['days_left'] is not None and tls['days_left'] < EXPIRY_NOTICE_DAYS:
+                score = 90
+                self.recommendations.append(
+                    f"SSL certificate expires in {tls['days_left']} days - check auto-renewal is on")
+
+            if tls.get('legacy_protocol'):
+                score = max(score - 30, 0)
+                self.issues.append(f"Server still accepts outdated {tls['legacy_protocol']} encryption")
+                self.recommendations.append("Turn off TLS 1.0 and 1.1 on your server - browsers only need TLS 1.2 and 1.3")
+
         self.scores['https'] = score
         return score
 
     def check_mobile_viewport(self):
         """Check for mobile-friendly viewport"""
         score = 0
-        viewport = self.soup.find('meta', attrs={'name': 'viewport'})
-        if viewport and viewport.get('content'):
-            content = viewport.get('content', '')
+        content = self.features.meta.get('viewport')
+        if content:
             if 'width=device-width' in content:
                 score = 100
             else:
@@ -88,9 +382,9 @@ class WebsiteGrader:
         points_per_item = 20
 
         # Title
-        title = self.soup.find('title')
-        if title and title.string:
-            title_text = title.string.strip()
+        title = self.features.title
+        if title:
+            title_text = title.strip()
             if 10 <= len(title_text) <= 60:
                 score += points_per_item
             else:
@@ -101,9 +395,9 @@ class WebsiteGrader:
             self.recommendations.append("Add a descriptive page title (50-60 characters)")
 
         # Meta description
-        meta_desc = self.soup.find('meta', attrs={'name': 'description'})
-        if meta_desc and meta_desc.get('content'):
-            desc_len = len(meta_desc.get('content', ''))
+        meta_desc = self.features.meta.get('description')
+        if meta_desc:
+            desc_len = len(meta_desc)
             if 120 <= desc_len <= 160:
                 score += points_per_item
             else:
@@ -114,11 +408,8 @@ class WebsiteGrader:
             self.recommendations.append("Add meta description for search results")
 
         # Open Graph tags
-        og_title = self.soup.find('meta', property='og:title')
-        og_desc = self.soup.find('meta', property='og:description')
-        og_image = self.soup.find('meta', property='og:image')
-
-        og_count = sum([1 for og in [og_title, og_desc, og_image] if og])
+        og_tags = ['og:title', 'og:description', 'og:image']
+        og_count = sum([1 for og in og_tags if og in self.features.properties])
         if og_count == 3:
             score += points_per_item
         elif og_count > 0:
@@ -129,15 +420,13 @@ class WebsiteGrader:
             self.recommendations.append("Add Open Graph tags for better social sharing")
 
         # Canonical URL
-        canonical = self.soup.find('link', rel='canonical')
-        if canonical:
+        if 'canonical' in self.features.link_rels:
             score += points_per_item
         else:
             self.issues.append("No canonical URL specified")
 
         # Keywords (less important now but still counts)
-        keywords = self.soup.find('meta', attrs={'name': 'keywords'})
-        if keywords and keywords.get('content'):
+        if self.features.meta.get('keywords'):
             score += points_per_item
 
         self.scores['meta_tags'] = min(score, max_score)
@@ -147,30 +436,30 @@ class WebsiteGrader:
         """Check heading structure"""
         score = 0
 
-        h1_tags = self.soup.find_all('h1')
-        h2_tags = self.soup.find_all('h2')
-        h3_tags = self.soup.find_all('h3')
+        h1_count = self.features.count('h1')
+        h2_count = self.features.count('h2')
+        h3_count = self.features.count('h3')
 
         # Should have exactly one H1
-        if len(h1_tags) == 1:
+        if h1_count == 1:
             score += 40
-        elif len(h1_tags) > 1:
+        elif h1_count > 1:
             score += 20
-            self.issues.append(f"Multiple H1 tags found ({len(h1_tags)}) - should have only one")
+            self.issues.append(f"Multiple H1 tags found ({h1_count}) - should have only one")
         else:
             self.issues.append("No H1 tag found")
             self.recommendations.append("Add a single H1 tag with your main keyword")
 
         # Should have H2s for structure
-        if len(h2_tags) >= 2:
+        if h2_count >= 2:
             score += 30
-        elif len(h2_tags) == 1:
+        elif h2_count == 1:
             score += 15
         else:
             self.issues.append("No H2 tags for content structure")
 
         # H3s for sub-sections
-        if len(h3_tags) >= 1:
+        if h3_count >= 1:
             score += 30
 
         self.scores['headings'] = score
@@ -178,7 +467,7 @@ class WebsiteGrader:
 
     def check_images(self):
         """Check image optimization"""
-        images = self.soup.find_all('img')
+        images = self.features.images
         if not images:
             self.scores['images'] = 50  # No images isn't necessarily bad
             return 50
@@ -210,10 +499,36 @@ class WebsiteGrader:
         return score
 
     def check_page_speed(self):
-        """Basic page speed check"""
+        """
+        Page speed from the network timings: server response time (TTFB) plus what the
+        redirect chain costs before the page starts loading
+        Falls back to the total load time when the fetch recorded no phase timings
+        """
         score = 100
 
-        if self.load_time:
+        if self.timings and self.timings['ttfb'] is not None:
+            ttfb = self.timings['ttfb']
+            if ttfb < 0.8:
+                score = 100
+            elif ttfb < 1.8:
+                score = 75
+            elif ttfb < 3:
+                score = 50
+                self.issues.append(f"Slow server response: {ttfb:.2f}s to first byte")
+            else:
+                score = 25
+                self.issues.append(f"Very slow server response: {ttfb:.2f}s to first byte")
+                self.recommendations.append("Speed up the server response - enable page caching or move to a faster host")
+
+            hops = len(self.timings['redirects'])
+            redirect_time = self.timings['redirect_time']
+            if hops:
+                # Each redirect is a full extra round trip (often with its own DNS lookup and handshake)
+                score = max(score - min(40, round(redirect_time * 40)), 0)
+                if hops > 1 or redirect_time > 0.5:
+                    self.issues.append(f"Redirect chain adds {redirect_time:.2f}s ({hops} hops) before the page loads")
+                    self.recommendations.append("Link straight to the final URL - every redirect is an extra round trip")
+        elif self.load_time:
             if self.load_time < 1:
                 score = 100
             elif self.load_time < 2:
@@ -231,25 +546,118 @@ class WebsiteGrader:
         self.scores['speed'] = score
         return score
 
+    def check_page_weight(self):
+        """
+        Total download size of the page and everything it loads (CSS, JS, fonts, images)
+        Needs the network, so pages graded offline (never fetched) are skipped, and so are
+        audits that couldn't size enough of the resources to tell
+        """
+        if self.status_code is None:
+            return None
+
+        audit = audit_page_weight(self.final_url or self.url, self.features.resources,
+                                  self.page_bytes, self._request_headers(), scope=self.probe_scope,
+                                  prefetch=self.weight_prefetch)
+        self.page_weight = audit
+        if audit['inconclusive']:
+            return None  # a page whose files timed out would otherwise look lighter than it is
+        total_mb = audit['total_bytes'] / (1024 * 1024)
+
+        if total_mb < 1:
+            score = 100
+        elif total_mb < 2:
+            score = 80
+        elif total_mb < 4:
+            score = 60
+            self.issues.append(f"Heavy page: {total_mb:.1f} MB to download")
+        elif total_mb < 8:
+            score = 40
+            self.issues.append(f"Very heavy page: {total_mb:.1f} MB to download")
+        else:
+            score = 20
+            self.issues.append(f"Extremely heavy page: {total_mb:.1f} MB to download")
+
+        if score <= 60 and audit['largest']:
+            biggest = audit['largest'][0]
+            name = biggest['url'].rsplit('/', 1)[-1][:60] or biggest['url']
+            self.recommendations.append(
+                f"Shrink the largest files first - {name} alone is {biggest['bytes'] / 1024:.0f} KB")
+
+        if audit['uncompressed']:
+            score = max(score - 10, 0)
+            self.issues.append(f"{len(audit['uncompressed'])} CSS/JS files served without compression")
+            self.recommendations.append("Enable gzip or brotli compression for CSS and JavaScript")
+
+        self.scores['page_weight'] = score
+        return score
+
+    def check_crawler_access(self):
+        """
+        Can search engines and AI assistants crawl the site: robots.txt rules for the
+        homepage, an XML sitemap and an llms.txt
+        Needs the network, so pages graded offline (never fetched) are skipped
+        """
+        if self.status_code is None:
+            return None
+
+        if self.crawl_files is None:
+            if self.crawl_prefetch is None:
+                self.crawl_prefetch = CrawlFilePrefetch(self.final_url or self.url, self._request_headers())
+            self.crawl_files = self.crawl_prefetch.files(self.final_url)
+        origin = self.crawl_prefetch.origin if self.crawl_prefetch else self.final_url or self.url
+        speculation_hit = self.crawl_prefetch.speculation_hit if self.crawl_prefetch else None
+        audit = audit_crawl_files(self.crawl_files, origin, speculation_hit)
+        self.crawler_access = audit
+        robots = audit['robots_txt']
+        score = 0
+
+        # robots.txt (40 points)
+        if robots['status'] is not None and robots['status'] >= 500:
+            self.issues.append("robots.txt returns a server error - crawlers stop crawling the site until it's fixed")
+            self.recommendations.append("Fix robots.txt so it loads (or returns 404)")
+        elif robots['blocks_all']:
+            self.issues.append("robots.txt blocks all crawlers from the homepage")
+            self.recommendations.append("Remove 'Disallow: /' from robots.txt so search engines can index the site")
+        else:
+            if robots['found'] or robots['status'] is None:
+                score += 20
+            else:
+                score += 15
+                self.recommendations.append("Add a robots.txt that points crawlers to your sitemap")
+            blocked = robots['blocked_ai_crawlers']
+            if blocked:
+                score += max(20 - 5 * len(blocked), 0)
+                self.issues.append(f"robots.txt blocks AI crawlers: {', '.join(blocked)}")
+                self.recommendations.append("Allow GPTBot, ClaudeBot and PerplexityBot in robots.txt so AI assistants can cite you")
+            else:
+                score += 20
+
+        # XML sitemap (35 points)
+        if audit['sitemap']['found']:
+            score += 35
+        else:
+            self.issues.append("No XML sitemap found")
+            self.recommendations.append("Publish sitemap.xml and list it in robots.txt")
+
+        # llms.txt (25 points) - a plain-text summary written for AI assistants
+        if audit['llms_txt']['found']:
+            score += 25
+        else:
+            self.recommendations.append("Add an llms.txt describing your services and service area for AI assistants")
+
+        self.scores['crawler_access'] = score
+        self.scores['ai_crawlers_blocked'] = robots['blocked_ai_crawlers']
+        self.scores['crawl_files'] = {name: audit[name]['found'] for name in ('robots_txt', 'llms_txt', 'sitemap')}
+        return score
+
     def check_structured_data(self):
         """Check for Schema.org structured data - CRITICAL for AI visibility"""
         score = 0
 
-        # Look for JSON-LD
-        json_ld_scripts = self.soup.find_all('script', type='application/ld+json')
-
-        schema_types = []
-        for script in json_ld_scripts:
-            try:
-                data = json.loads(script.string)
-                if isinstance(data, list):
-                    for item in data:
-                        if '@type' in item:
-                            schema_types.append(item['@type'])
-                elif '@type' in data:
-                    schema_types.append(data['@type'])
-            except:
-                pass
+        # Every entity in the JSON-LD, including @graph members and nested ones
+        json_ld_scripts = self.features.json_ld
+        json_ld = extract_json_ld(json_ld_scripts)
+        schema_types = json_ld['types']
 
         # Check for important schema types
         important_schemas = ['LocalBusiness', 'Organization', 'Service', 'Product',
@@ -269,11 +677,17 @@ class WebsiteGrader:
             self.issues.append("No structured data (Schema.org) found")
             self.recommendations.append("Add LocalBusiness and Service schema for AI discoverability")
 
+        if len(json_ld['errors']) == 1:
+            self.issues.append("A JSON-LD block can't be parsed - search engines ignore it")
+        elif json_ld['errors']:
+            self.issues.append(f"{len(json_ld['errors'])} JSON-LD blocks can't be parsed - search engines ignore them")
+
         if 'FAQPage' not in schema_types:
             self.recommendations.append("Add FAQ schema - AI assistants love citing FAQ content")
 
         self.scores['structured_data'] = score
         self.scores['schema_types'] = schema_types
+        self.scores['json_ld'] = json_ld
         return score
 
     def check_social_presence(self):
@@ -292,10 +706,8 @@ class WebsiteGrader:
         }
 
         found_platforms = []
-        all_links = self.soup.find_all('a', href=True)
-
-        for link in all_links:
-            href = link.get('href', '').lower()
+        for href in self.features.links:
+            href = href.lower()
             for platform, name in social_platforms.items():
                 if platform in href and name not in found_platforms:
                     found_platforms.append(name)
@@ -324,20 +736,13 @@ class WebsiteGrader:
         """Check for visible contact information - critical for local SEO and AI"""
         score = 0
 
-        page_text = self.soup.get_text().lower()
-
-        # Phone number pattern
-        phone_pattern = r'[\+]?[(]?[0-9]{3}[)]?[-\s\.]?[0-9]{3}[-\s\.]?[0-9]{4}'
-        has_phone = bool(re.search(phone_pattern, self.html))
-
-        # Email pattern
-        email_pattern = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
-        has_email = bool(re.search(email_pattern, self.html))
+        # Phones and emails from the visible text and tel:/mailto: links, not inline scripts
+        contacts = extract_contacts(self.features)
+        has_phone = bool(contacts['phones'])
+        has_email = bool(contacts['emails'])
 
         # Address indicators
-        address_words = ['street', 'avenue', 'ave', 'road', 'rd', 'boulevard',
-                        'blvd', 'suite', 'floor', 'az', 'arizona', 'phoenix']
-        has_address = any(word in page_text for word in address_words)
+        has_address = bool(self.page_keywords()['address'])
 
         if has_phone:
             score += 35
@@ -357,19 +762,17 @@ class WebsiteGrader:
             self.recommendations.append("Add full business address for local AI visibility")
 
         self.scores['contact'] = score
+        self.scores['contact_details'] = contacts
         return score
 
     def check_content_quality(self):
         """Check content quality indicators"""
         score = 0
 
-        # Get text content (make a copy to preserve original soup)
-        soup_copy = BeautifulSoup(self.html, 'html.parser')
-        for tag in soup_copy(['script', 'style', 'nav', 'footer', 'header']):
-            tag.decompose()
-
-        text = soup_copy.get_text(separator=' ', strip=True)
+        # Text with script/style/nav/footer/header already stripped by the index
+        text = self.features.content_text
         word_count = len(text.split())
+        keywords = CONTENT_KEYWORDS.scan(text.lower())
 
         # Word count scoring
         if word_count >= 1000:
@@ -383,8 +786,7 @@ class WebsiteGrader:
             self.recommendations.append("Add more content - aim for 500+ words on main pages")
 
         # Check for FAQ-style content (great for AI)
-        faq_indicators = ['faq', 'frequently asked', 'questions', 'q:', 'a:', 'q&a']
-        has_faq = any(ind in text.lower() for ind in faq_indicators)
+        has_faq = bool(keywords['faq'])
 
         if has_faq:
             score += 30
@@ -392,9 +794,7 @@ class WebsiteGrader:
             self.recommendations.append("Add FAQ section - AI assistants frequently cite Q&A content")
 
         # Check for service/product descriptions
-        service_words = ['service', 'we offer', 'we provide', 'our services',
-                        'what we do', 'how we help']
-        has_services = any(word in text.lower() for word in service_words)
+        has_services = bool(keywords['services'])
 
         if has_services:
             score += 30
@@ -407,14 +807,10 @@ class WebsiteGrader:
         """Check for essential business elements important for home services/contractors"""
         score = 0
         business_factors = []
-        text = self.soup.get_text(separator=' ', strip=True).lower()
+        keywords = self.page_keywords()
 
         # 1. Service area mentions - critical for local businesses
-        service_area_patterns = ['serving', 'service area', 'we serve', 'locations',
-                                 'phoenix', 'scottsdale', 'mesa', 'tempe', 'chandler',
-                                 'gilbert', 'glendale', 'peoria', 'tucson', 'arizona',
-                                 'az', 'valley', 'metro', 'surrounding areas']
-        has_service_area = any(pattern in text for pattern in service_area_patterns)
+        has_service_area = bool(keywords['service_area'])
         if has_service_area:
             score += 15
             business_factors.append("Service area defined")
@@ -423,10 +819,7 @@ class WebsiteGrader:
             self.recommendations.append("Add service area - list cities/regions you serve")
 
         # 2. Trust signals - licenses, insurance, certifications
-        trust_signals = ['licensed', 'insured', 'bonded', 'certified', 'roc#', 'roc #',
-                        'license #', 'license:', 'bbb', 'better business', 'accredited',
-                        'warranty', 'guarantee', 'satisfaction', 'background check']
-        found_trust = [s for s in trust_signals if s in text]
+        found_trust = keywords['trust']
         if len(found_trust) >= 3:
             score += 20
             business_factors.append("Strong trust signals")
@@ -438,9 +831,7 @@ class WebsiteGrader:
             self.recommendations.append("Display license number and insurance info prominently")
 
         # 3. Call-to-action presence
-        cta_patterns = ['free quote', 'free estimate', 'get a quote', 'call now', 'call today',
-                       'schedule', 'book', 'contact us', 'request', 'get started']
-        found_ctas = [c for c in cta_patterns if c in text]
+        found_ctas = keywords['cta']
         if len(found_ctas) >= 2:
             score += 15
             business_factors.append("Clear calls-to-action")
@@ -451,9 +842,7 @@ class WebsiteGrader:
             self.recommendations.append("Add 'Get a Free Quote' buttons throughout the page")
 
         # 4. Portfolio/project gallery indicators
-        portfolio_indicators = ['portfolio', 'gallery', 'our work', 'projects', 'before and after',
-                               'recent work', 'completed', 'showcase']
-        has_portfolio = any(p in text for p in portfolio_indicators)
+        has_portfolio = bool(keywords['portfolio'])
         if has_portfolio:
             score += 15
             business_factors.append("Portfolio/gallery present")
@@ -461,9 +850,7 @@ class WebsiteGrader:
             self.recommendations.append("Add project gallery - visuals build trust for contractors")
 
         # 5. Reviews/testimonials
-        review_indicators = ['review', 'testimonial', 'customer said', 'clients say',
-                            'what our', 'rated', 'stars', '5 star', 'five star']
-        has_reviews = any(r in text for r in review_indicators)
+        has_reviews = bool(keywords['reviews'])
         if has_reviews:
             score += 15
             business_factors.append("Reviews/testimonials shown")
@@ -471,11 +858,7 @@ class WebsiteGrader:
             self.recommendations.append("Add customer testimonials - builds trust and AI visibility")
 
         # 6. Specific services listed
-        service_types = ['remodel', 'renovation', 'kitchen', 'bathroom', 'flooring',
-                        'painting', 'plumbing', 'hvac', 'electrical', 'roofing',
-                        'landscaping', 'deck', 'patio', 'addition', 'repair',
-                        'installation', 'maintenance', 'construction']
-        found_services = [s for s in service_types if s in text]
+        found_services = keywords['services']
         if len(found_services) >= 4:
             score += 20
             business_factors.append(f"Services clearly listed ({len(found_services)}+ types)")
@@ -550,6 +933,17 @@ class WebsiteGrader:
             ai_score += 7
             ai_factors.append("Customer reviews visible")
 
+        # Assistants can't cite what their crawlers may not read (unknown for pages graded offline)
+        if 'ai_crawlers_blocked' in self.scores:
+            blocked = self.scores['ai_crawlers_blocked']
+            if blocked:
+                ai_score = max(ai_score - min(30, 5 * len(blocked)), 0)
+            else:
+                ai_factors.append("AI crawlers allowed")
+        if self.scores.get('crawl_files', {}).get('llms_txt'):
+            ai_score += 5
+            ai_factors.append("llms.txt published")
+
         self.scores['ai_visibility'] = min(ai_score, 100)
         self.scores['ai_factors'] = ai_factors
 
@@ -560,23 +954,8 @@ class WebsiteGrader:
 
     def calculate_overall_score(self):
         """Calculate weighted overall score"""
-        weights = {
-            'ai_visibility': 0.22,  # Most important for the future
-            'business_essentials': 0.15,  # Critical for home services
-            'structured_data': 0.12,
-            'meta_tags': 0.10,
-            'mobile': 0.08,
-            'speed': 0.07,
-            'headings': 0.06,
-            'content': 0.06,
-            'social': 0.05,
-            'contact': 0.05,
-            'https': 0.02,
-            'images': 0.02
-        }
-
         total = 0
-        for key, weight in weights.items():
+        for key, weight in OVERALL_WEIGHTS.items():
             score = self.scores.get(key, 0)
             if isinstance(score, (int, float)):
                 total += score * weight
@@ -597,80 +976,237 @@ class WebsiteGrader:
         else:
             return 'F'
 
-    def run_full_analysis(self):
-        """Run complete website analysis"""
-        if not self.fetch_page():
+    def run_full_analysis(self, checks=None):
+        """Run complete website analysis (checks: optional subset of check names)"""
+        if not self.fetch_page(checks=checks):
             return {
                 'success': False,
                 'error': 'Could not fetch website',
                 'url': self.url
             }
 
-        # Run all checks
-        self.check_https()
-        self.check_mobile_viewport()
-        self.check_meta_tags()
-        self.check_headings()
-        self.check_images()
-        self.check_page_speed()
-        self.check_structured_data()
-        self.check_social_presence()
-        self.check_contact_info()
-        self.check_content_quality()
-        self.check_business_essentials()  # Home services specific checks
-        self.check_ai_visibility()
-        self.calculate_overall_score()
+        self.run_checks(checks)
+        return self.build_result()
+
+    def run_checks(self, checks=None, defer_network=False, defer_volatile=False):
+        """Run the requested checks (default all) and their dependencies against the parsed page"""
+        for _ in self.iter_checks(checks, defer_network, defer_volatile):
+            pass
 
+    def iter_checks(self, checks=None, defer_network=False, defer_volatile=False):
+        """
+        Run the checks one at a time, yielding (score key, score) as each finishes
+        defer_network skips network checks, leaving a mark where their messages belong;
+        run_deferred_checks() runs them later (in the process that did the fetch)
+        defer_volatile also skips the volatile checks and their readers, so everything
+        before run_deferred_checks() depends only on the HTML and can be reused for it
+        """
+        plan = self.plan_checks(checks)
+        deferred = self.volatile_checks() if defer_volatile else set()
+        if checks is not None:
+            self.checks_run = [check.name for check in plan]
+        for check in plan:
+            if (defer_network and check.network) or check.name in deferred:
+                self.deferred_checks.append(check.name)
+                self.issues.append(DEFERRED_MARK + check.name)
+                self.recommendations.append(DEFERRED_MARK + check.name)
+                continue
+            self._run_check(check)
+            yield check.name, self.scores.get(check.name, 0)
+
+    def _run_check(self, check):
+        start = time.perf_counter()
+        getattr(self, check.method)()
+        self._record_step(check.method, time.perf_counter() - start)
+
+    def run_deferred_checks(self):
+        """Run the skipped checks, putting their issues and recommendations in run order"""
+        for _ in self.iter_deferred_checks():
+            pass
+
+    def iter_deferred_checks(self):
+        """run_deferred_checks() one check at a time, yielding (score key, score) as each finishes"""
+        self.analysis = self.analysis_state()
+        by_name = {check.name: check for check in self.CHECKS}
+        for name in self.deferred_checks:
+            # The check sees the messages before its mark, as if it had run in its turn
+            # (so one that inserts at the top still lands at the top)
+            mark = DEFERRED_MARK + name
+            at = self.issues.index(mark)
+            issues_after = self.issues[at + 1:]
+            self.issues = self.issues[:at]
+            at = self.recommendations.index(mark)
+            recommendations_after = self.recommendations[at + 1:]
+            self.recommendations = self.recommendations[:at]
+            self._run_check(by_name[name])
+            self.issues += issues_after
+            self.recommendations += recommendations_after
+            yield name, self.scores.get(name, 0)
+        self.deferred_checks = []
+
+    def analysis_state(self):
+        """
+        Scores and messages so far, with marks for the deferred checks
+        restore_analysis() on a grader that fetched the same HTML picks up from here
+        """
         return {
+            'scores': dict(self.scores),
+            'issues': list(self.issues),
+            'recommendations': list(self.recommendations),
+            'deferred_checks': list(self.deferred_checks),
+            'checks_run': self.checks_run,
+        }
+
+    def restore_analysis(self, state, features):
+        """Load an earlier analysis_state() of this page; run_deferred_checks() completes it"""
+        self.features = features
+        self.scores = dict(state['scores'])
+        self.issues = list(state['issues'])
+        self.recommendations = list(state['recommendations'])
+        self.deferred_checks = list(state['deferred_checks'])
+        self.checks_run = state['checks_run']
+
+    def _score(self, key, default=0):
+        """A score for the result; checks a partial run skipped come out as None"""
+        if key not in self.scores and self.checks_run is not None:
+            return None
+        return self.scores.get(key, default)
+
+    def _grade_of(self, key):
+        score = self._score(key)
+        return None if score is None else self.get_grade(score)
+
+    def build_result(self):
+        """Assemble the API response from the computed scores"""
+        result = {
             'success': True,
             'url': self.url,
             'domain': self.domain,
             'scores': {
-                'overall': self.scores.get('overall', 0),
-                'overall_grade': self.get_grade(self.scores.get('overall', 0)),
-                'ai_visibility': self.scores.get('ai_visibility', 0),
-                'ai_visibility_grade': self.get_grade(self.scores.get('ai_visibility', 0)),
-                'business_essentials': self.scores.get('business_essentials', 0),
+                'overall': self._score('overall'),
+                'overall_grade': self._grade_of('overall'),
+                'ai_visibility': self._score('ai_visibility'),
+                'ai_visibility_grade': self._grade_of('ai_visibility'),
+                'business_essentials': self._score('business_essentials'),
                 'seo': {
-                    'meta_tags': self.scores.get('meta_tags', 0),
-                    'headings': self.scores.get('headings', 0),
-                    'structured_data': self.scores.get('structured_data', 0),
+                    'meta_tags': self._score('meta_tags'),
+                    'headings': self._score('headings'),
+                    'structured_data': self._score('structured_data'),
+                    'crawler_access': self.scores.get('crawler_access'),
                 },
                 'technical': {
-                    'https': self.scores.get('https', 0),
-                    'mobile': self.scores.get('mobile', 0),
-                    'speed': self.scores.get('speed', 0),
-                    'images': self.scores.get('images', 0),
+                    'https': self._score('https'),
+                    'mobile': self._score('mobile'),
+                    'speed': self._score('speed'),
+                    'page_weight': self.scores.get('page_weight'),
+                    'images': self._score('images'),
                 },
                 'presence': {
-                    'social': self.scores.get('social', 0),
-                    'contact': self.scores.get('contact', 0),
-                    'content': self.scores.get('content', 0),
+                    'social': self._score('social'),
+                    'contact': self._score('contact'),
+                    'content': self._score('content'),
                 }
             },
             'details': {
                 'load_time': round(self.load_time, 2) if self.load_time else None,
-                'word_count': self.scores.get('word_count', 0),
-                'social_platforms': self.scores.get('social_platforms', []),
-                'schema_types': self.scores.get('schema_types', []),
-                'ai_factors': self.scores.get('ai_factors', []),
-                'business_factors': self.scores.get('business_factors', []),
+                'timings': self.timings,
+                'page_weight': self.page_weight,
+                'crawler_access': self.crawler_access,
+                'tls': self.tls,
+                'page_bytes': self.page_bytes,
+                'truncated': self.truncated,
+                'word_count': self._score('word_count'),
+                'social_platforms': self._score('social_platforms', []),
+                'schema_types': self._score('schema_types', []),
+                'structured_data': self._score('json_ld', {}),
+                'ai_factors': self._score('ai_factors', []),
+                'business_factors': self._score('business_factors', []),
+                'contact_details': self._score('contact_details', {}),
             },
             'issues': self.issues[:10],  # Top 10 issues
             'recommendations': self.recommendations[:8],  # Top 8 recommendations
         }
-
-
-def grade_website(url):
-    """Main function to grade a website"""
-    grader = WebsiteGrader(url)
-    return grader.run_full_analysis()
+        if self.checks_run is not None:
+            result['checks'] = self.checks_run
+        return result
+
+
+def grade_website(url, checks=None):
+    """Main function to grade a website (blocking wrapper around the async engine)"""
+    from async_grader import grade_website_async, shared_session
+    # Concurrent calls for the same page wait on the one already running
+    key = ('direct', WebsiteGrader._normalize_url(url), tuple(checks) if checks else None)
+    result, _ = grade_flights.do(
+        key, lambda: shared_session.run(lambda session: grade_website_async(url, session, checks=checks)))
+    return dict(result)
+
+
+def grade_saved_page(url, content, content_type=None, parser=None, checks=None):
+    """
+    Grade a page saved earlier (HTML file, web archive) without touching the network
+    content is the raw body, cut at MAX_PAGE_BYTES like a live fetch; the network checks
+    are skipped and speed has no fetch timing to score
+    """
+    grader = WebsiteGrader(url, parser=parser)
+    grader.truncated = len(content) > MAX_PAGE_BYTES
+    content = content[:MAX_PAGE_BYTES]
+    grader.html = decode_body(content, content_type)
+    grader.page_bytes = len(content)
+    grader.content_hash = hashlib.sha256(content).hexdigest()
+    grader.parse_page()
+    grader.run_checks(checks)
+    return grader.build_result()
+
+
+def grade_websites(urls, max_workers=8, per_host_limit=2, grade_fn=grade_website):
+    """
+    Grade many websites on a bounded thread pool, yielding (url, result) as each finishes
+    At most per_host_limit grades run against the same host at once; URLs for busy
+    hosts wait in the queue without holding a worker
+    Used by the grade_list CLI; API batches go through the job queue (grade_jobs.py)
+    """
+    pending = deque(urls)
+    host_load = {}
+    running = {}
+
+    def host_of(url):
+        return urlparse(WebsiteGrader._normalize_url(url)).netloc.lower()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while pending or running:
+            # Fill free workers with the oldest URLs whose host has capacity
+            skipped = deque()
+            while pending and len(running) < max_workers:
+                url = pending.popleft()
+                host = host_of(url)
+                if host_load.get(host, 0) >= per_host_limit:
+                    skipped.append(url)
+                    continue
+                host_load[host] = host_load.get(host, 0) + 1
+                running[pool.submit(grade_fn, url)] = (url, host)
+            skipped.extend(pending)
+            pending = skipped
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                url, host = running.pop(future)
+                host_load[host] -= 1
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {'success': False, 'error': str(e), 'url': url}
+                yield url, result
 
 
 # For testing
 if __name__ == '__main__':
     import sys
 
+    if len(sys.argv) > 1 and sys.argv[1] == '--list':
+        # List mode: python grader.py --list urls.txt (see grade_list.py)
+        from grade_list import main
+        sys.exit(main(sys.argv[2:]))
+
     if len(sys.argv) > 1:
         url = sys.argv[1]
     else:
@@ -0,0 +1,33 @@
+"""
+Remodely AI - Grader Database
+Engine for the grader's own tables (job queue, grade history): Postgres via DATABASE_URL,
+or a local SQLite file, used with plain SQLAlchemy so no Flask app context is needed
+"""
+
+import os
+
+from sqlalchemy import create_engine, event
+
+DEFAULT_GRADER_DB = 'sqlite:///' + os.path.join(os.path.dirname(os.path.abspath(__file__)), 'grader.db')
+
+
+def grader_database_url():
+    """GRADER_DATABASE_URL, else the app database, else a SQLite file next to the API"""
+    url = os.environ.get('GRADER_DATABASE_URL') or os.environ.get('DATABASE_URL') or DEFAULT_GRADER_DB
+    # Fix for Render PostgreSQL URL format
+    if url.startswith('postgres://'):
+        url = url.replace('postgres://', 'postgresql://', 1)
+    return url
+
+
+def create_grader_engine(url):
+    if url.startswith('sqlite'):
+        engine = create_engine(url, connect_args={'check_same_thread': False, 'timeout': 30})
+
+        @event.listens_for(engine, 'connect')
+        def _sqlite_wal(connection, _):
+            # Readers don't block the writer, so polling doesn't stall the workers
+            connection.execute('PRAGMA journal_mode=WAL')
+
+        return engine
+    return create_engine(url, pool_recycle=300, pool_pre_ping=True)
@@ -0,0 +1,101 @@
+"""
+Remodely AI - Page Download Helpers
+Capped streaming reads and fast charset detection shared by the sync and async graders
+"""
+
+import codecs
+import os
+import re
+
+# Bytes of (decompressed) HTML kept per page; the rest is never downloaded
+MAX_PAGE_BYTES = int(os.environ.get('GRADER_MAX_PAGE_BYTES', 2 * 1024 * 1024))
+CHUNK_SIZE = 64 * 1024
+
+# How far into the document a <meta charset> may appear (the HTML spec says 1024 bytes)
+META_SNIFF_BYTES = 4096
+
+CHARSET_HEADER = re.compile(r'charset\s*=\s*["\']?([\w.:-]+)', re.IGNORECASE)
+CHARSET_META = re.compile(rb'<meta[^>]{0,200}?charset\s*=\s*["\']?([\w.:-]+)', re.IGNORECASE)
+
+BOMS = [
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+
+
+def _valid_codec(name):
+    try:
+        return codecs.lookup(name).name
+    except (LookupError, TypeError):
+        return None
+
+
+def detect_charset(content_type, head):
+    """
+    Pick the page encoding without statistical sniffing:
+    BOM, then the Content-Type charset, then a <meta> charset in the first bytes, then UTF-8
+    """
+    for bom, name in BOMS:
+        if head.startswith(bom):
+            return name
+
+    if content_type:
+        match = CHARSET_HEADER.search(content_type)
+        if match and _valid_codec(match.group(1)):
+            return _valid_codec(match.group(1))
+
+    match = CHARSET_META.search(head[:META_SNIFF_BYTES])
+    if match:
+        name = _valid_codec(match.group(1).decode('ascii', 'ignore'))
+        if name:
+            return name
+
+    return 'utf-8'
+
+
+def decode_body(content, content_type):
+    """Decode downloaded bytes to text; undecodable bytes are replaced, never fatal"""
+    charset = detect_charset(content_type, content[:META_SNIFF_BYTES])
+    return content.decode(charset, errors='replace')
+
+
+def read_capped(response, max_bytes=MAX_PAGE_BYTES):
+    """
+    Read a streamed requests response up to max_bytes
+    Returns (content, truncated); a cut-off response has its connection dropped
+    """
+    chunks = []
+    size = 0
+    truncated = False
+    completed = False
+    try:
+        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size > max_bytes:
+                truncated = True
+                break
+        completed = not truncated
+    finally:
+        # A fully read response has already gone back to the pool
+        if not completed:
+            response.close()
+    return b''.join(chunks)[:max_bytes], truncated
+
+
+async def read_capped_async(response, max_bytes=MAX_PAGE_BYTES):
+    """aiohttp version of read_capped; the caller's context manager releases the connection"""
+    chunks = []
+    size = 0
+    truncated = False
+    async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+        chunks.append(chunk)
+        size += len(chunk)
+        if size > max_bytes:
+            truncated = True
+            break
+    if truncated:
+        # Don't return a half-read connection to the pool
+        response.close()
+    return b''.join(chunks)[:max_bytes], truncated
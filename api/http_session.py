@@ -0,0 +1,283 @@
+"""
+Remodely AI - Pooled HTTP Sessions
+Keep-alive connection pools shared by every grader in the worker process, a TTL'd DNS
+cache in front of them and, when httpx is installed, optional HTTP/2 for page fetches.
+Page fetches also record where their time went (DNS, connect, TLS, TTFB, redirect hops).
+"""
+
+import os
+import socket
+import threading
+import time
+
+import requests
+import urllib3.connection
+import urllib3.util.connection
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+try:
+    import h2  # noqa: F401 - httpx only speaks HTTP/2 when h2 is installed
+    import httpx
+except ImportError:
+    httpx = None
+
+# Hosts kept in the pool, and idle keep-alive connections kept per host
+POOL_HOSTS = int(os.environ.get('GRADER_POOL_HOSTS', 100))
+POOL_CONNECTIONS_PER_HOST = int(os.environ.get('GRADER_POOL_PER_HOST', 4))
+# Seconds a resolved address is reused; 0 turns the DNS cache off
+DNS_CACHE_TTL = int(os.environ.get('GRADER_DNS_TTL', 300))
+DNS_CACHE_MAX_ENTRIES = 10000
+# HTTP/2 for page fetches (needs httpx[http2]); keep-alive HTTP/1.1 otherwise
+HTTP2_ENABLED = os.environ.get('GRADER_HTTP2', '').lower() in ('1', 'true', 'yes')
+
+
+class DNSCache:
+    """
+    Thread-safe getaddrinfo cache
+    Entries expire after ttl seconds and are dropped early when every address fails
+    """
+
+    def __init__(self, ttl=DNS_CACHE_TTL, max_entries=DNS_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def resolve(self, host, port):
+        """Addresses for host as getaddrinfo would return them for a TCP connection"""
+        key = (host, port, urllib3.util.connection.allowed_gai_family())
+        if self.ttl <= 0:
+            return socket.getaddrinfo(host, port, key[2], socket.SOCK_STREAM)
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self.hits += 1
+                return entry[1]
+
+        addresses = socket.getaddrinfo(host, port, key[2], socket.SOCK_STREAM)
+        with self._lock:
+            self.misses += 1
+            if len(self._entries) >= self.max_entries:
+                self._entries = {k: v for k, v in self._entries.items() if v[0] > now}
+                if len(self._entries) >= self.max_entries:
+                    self._entries.clear()
+            self._entries[key] = (now + self.ttl, addresses)
+        return addresses
+
+    def forget(self, host):
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == host]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+dns_cache = DNSCache()
+
+
+class PhaseTimer:
+    """
+    Where one page fetch spent its time, hop by hop through any redirects
+    dns/connect/tls accumulate until a hop's response headers arrive; whatever is left of
+    the hop is its ttfb (request sent -> first byte). A reused keep-alive connection costs 0.
+    tls=False when the engine can't separate the handshake from connect (aiohttp)
+    """
+
+    PHASES = ('dns', 'connect', 'tls')
+
+    def __init__(self, tls=True):
+        self.tls = tls
+        self.hops = []
+        self.download = None
+        self._pending = dict.fromkeys(self.PHASES, 0.0)
+
+    def add(self, phase, seconds):
+        self._pending[phase] += seconds
+
+    def end_hop(self, url, status, elapsed):
+        """Close the current hop once its response headers are in"""
+        setup = sum(self._pending.values())
+        self.hops.append(dict(self._pending, url=url, status=status, time=elapsed,
+                              ttfb=max(elapsed - setup, 0.0)))
+        self._pending = dict.fromkeys(self.PHASES, 0.0)
+
+    def summary(self):
+        """Timings for the result details (seconds), or None if nothing was recorded"""
+        if not self.hops:
+            return None
+        *redirects, final = self.hops
+        return {
+            'dns': round(sum(h['dns'] for h in self.hops), 3),
+            'connect': round(sum(h['connect'] for h in self.hops), 3),
+            'tls': round(sum(h['tls'] for h in self.hops), 3) if self.tls else None,
+            'ttfb': round(final['ttfb'], 3),
+            'download': round(self.download, 3) if self.download is not None else None,
+            'redirect_time': round(sum((h['time'] for h in redirects), 0.0), 3),
+            'redirects': [{'url': h['url'], 'status': h['status'], 'time': round(h['time'], 3)}
+                          for h in redirects],
+        }
+
+
+_local = threading.local()
+
+
+def _record(phase, seconds):
+    timer = getattr(_local, 'timer', None)
+    if timer is not None:
+        timer.add(phase, seconds)
+
+
+class _CachedDNSConnection:
+    """
+    Opens sockets through dns_cache, timing the lookup and the connect
+    Mixed into the connection classes of the grader's own pools only, so other urllib3
+    users in the process (the app's outbound calls, SDKs) keep plain, uncached DNS
+    """
+
+    def _new_conn(self):
+        host = self._dns_host
+        start = opened = time.perf_counter()
+        try:
+            addresses = dns_cache.resolve(host, self.port)
+        except socket.gaierror as e:
+            raise NewConnectionError(self, f"Failed to resolve '{host}' ({e})") from e
+        finally:
+            _record('dns', time.perf_counter() - start)
+
+        last_error = None
+        try:
+            for _, _, _, _, sockaddr in addresses:
+                self._dns_host = sockaddr[0]  # connect to the cached address; Host and SNI keep self.host
+                start = time.perf_counter()
+                try:
+                    sock = super()._new_conn()
+                    self.socket_setup_time = time.perf_counter() - opened
+                    return sock
+                except ConnectTimeoutError as e:  # NewConnectionError included
+                    last_error = e
+                finally:
+                    _record('connect', time.perf_counter() - start)
+        finally:
+            self._dns_host = host
+        # Every cached address failed: the host may have moved, so look it up again next time
+        dns_cache.forget(host)
+        raise last_error or NewConnectionError(self, f"getaddrinfo returned no addresses for {host}")
+
+
+class GraderHTTPConnection(_CachedDNSConnection, urllib3.connection.HTTPConnection):
+    pass
+
+
+class GraderHTTPSConnection(_CachedDNSConnection, urllib3.connection.HTTPSConnection):
+    """Also times the TLS handshake: whatever connect() spends after the socket is open"""
+
+    def connect(self):
+        self.socket_setup_time = 0.0
+        start = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _record('tls', max(time.perf_counter() - start - self.socket_setup_time, 0.0))
+
+
+class GraderHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = GraderHTTPConnection
+
+
+class GraderHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = GraderHTTPSConnection
+
+
+class GraderAdapter(HTTPAdapter):
+    """HTTPAdapter whose pools open their connections through the grader's DNS cache and timers"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {'http': GraderHTTPConnectionPool, 'https': GraderHTTPSConnectionPool}
+
+
+# One adapter (and so one set of connection pools) for the whole process;
+# urllib3 pools are thread-safe, requests.Session objects are not
+_adapter = GraderAdapter(pool_connections=POOL_HOSTS, pool_maxsize=POOL_CONNECTIONS_PER_HOST)
+
+
+def get_session():
+    """This thread's requests.Session, backed by the shared keep-alive pools"""
+    session = getattr(_local, 'session', None)
+    if session is None:
+        session = requests.Session()
+        session.mount('http://', _adapter)
+        session.mount('https://', _adapter)
+        _local.session = session
+    return session
+
+
+class _Http2Response:
+    """The slice of the requests.Response interface the graders read, over an httpx response"""
+
+    def __init__(self, response):
+        self._response = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.url = str(response.url)
+
+    def iter_content(self, chunk_size):
+        return self._response.iter_bytes(chunk_size)
+
+    def close(self):
+        self._response.close()
+
+
+_http2_client = None
+_http2_lock = threading.Lock()
+
+
+def _get_http2_client():
+    global _http2_client
+    with _http2_lock:
+        if _http2_client is None:
+            _http2_client = httpx.Client(
+                http2=True,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=POOL_HOSTS * POOL_CONNECTIONS_PER_HOST,
+                                    max_keepalive_connections=POOL_HOSTS),
+            )
+        return _http2_client
+
+
+def open_page(url, headers, timeout, timer=None):
+    """
+    Start a streamed GET on the pooled connections; read the body with http_fetch.read_capped
+    Cookies never carry over from an earlier page fetch
+    timer: optional PhaseTimer that gets one hop per response, redirects included
+    (phases are only broken down on HTTP/1.1)
+    """
+    if HTTP2_ENABLED:
+        client = _get_http2_client()
+        request = client.build_request('GET', url, headers=headers, timeout=timeout)
+        return _Http2Response(client.send(request, stream=True))
+
+    def end_hop(response, **kwargs):
+        timer.end_hop(response.url, response.status_code, response.elapsed.total_seconds())
+
+    session = get_session()
+    session.cookies.clear()
+    _local.timer = timer
+    try:
+        return session.get(url, headers=headers, timeout=timeout, allow_redirects=True, stream=True,
+                           hooks={'response': end_hop} if timer else None)
+    finally:
+        _local.timer = None
+
+
+if HTTP2_ENABLED and httpx is None:
+    print("GRADER_HTTP2 is set but httpx[http2] is not installed - grader using HTTP/1.1")
+    HTTP2_ENABLED = False
@@ -0,0 +1,83 @@
+"""
+Remodely AI - Keyword Matcher
+Finds every keyword from a set of groups in one pass over the page text,
+with word-boundary awareness so 'az' doesn't fire inside 'amazing'
+"""
+
+import re
+
+# Short keywords ('az', 'rd', 'ave', 'bbb') must be whole words; longer ones also
+# match as word prefixes so 'remodel' covers 'remodeling' and 'review' covers 'reviews'
+WHOLE_WORD_MAX_LEN = 3
+
+_SPACE = object()  # trie token for "one or more whitespace characters"
+
+
+def _tokens(pattern):
+    return [_SPACE if c == ' ' else c for c in pattern]
+
+
+def _is_whole_word(pattern):
+    return len(pattern) <= WHOLE_WORD_MAX_LEN and re.match(r'\w', pattern[-1]) is not None
+
+
+class KeywordMatcher:
+    """
+    Compiles {group: [keywords]} into a single trie-shaped regex
+    scan() walks the text once and reports, per group, which keywords appear
+    """
+
+    def __init__(self, groups):
+        self.groups = {name: [' '.join(p.lower().split()) for p in patterns]
+                       for name, patterns in groups.items()}
+
+        # keyword -> groups it belongs to (e.g. 'phoenix' is both a service area and an address hint)
+        self._owners = {}
+        for name, patterns in self.groups.items():
+            for pattern in patterns:
+                self._owners.setdefault(pattern, []).append(name)
+
+        patterns = sorted(self._owners)
+        self._whole_word = {p for p in patterns if _is_whole_word(p)}
+
+        # Shorter keywords that a longer match also satisfies ('service' inside 'service area')
+        self._implied = {}
+        for p in patterns:
+            self._implied[p] = [q for q in patterns if q != p and p.startswith(q)
+                                and (q not in self._whole_word or not re.match(r'\w', p[len(q)]))]
+
+        trie = {}
+        for p in patterns:
+            node = trie
+            for token in _tokens(p):
+                node = node.setdefault(token, {})
+            node[None] = p
+
+        # Zero-width lookahead so overlapping keywords at different word starts are all found
+        self._regex = re.compile(r'(?<!\w)(?=(' + self._compile(trie) + '))')
+
+    def _compile(self, node):
+        branches = []
+        for token, child in node.items():
+            if token is None:
+                continue
+            prefix = r'\s+' if token is _SPACE else re.escape(token)
+            branches.append(prefix + self._compile(child))
+        if None in node:
+            # Longer continuations are tried first so the longest keyword wins
+            branches.append(r'(?!\w)' if node[None] in self._whole_word else '')
+        if len(branches) == 1:
+            return branches[0]
+        return '(?:' + '|'.join(branches) + ')'
+
+    def scan(self, text):
+        """Return {group: [keywords found, in declaration order]} for an already-lowercased text"""
+        found = set()
+        for match in self._regex.finditer(text):
+            keyword = ' '.join(match.group(1).split())
+            if keyword in found:
+                continue
+            found.add(keyword)
+            found.update(self._implied[keyword])
+
+        return {name: [p for p in patterns if p in found] for name, patterns in self.groups.items()}
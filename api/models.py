@@ -1,10 +1,11 @@
 """
 Multi-tenant Aria System Models
-Database models for AriaCompany and AriaLead
+Database models for AriaCompany and AriaLead, plus the grader job queue and grade history
 """
 
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+import json
 import uuid
 
 db = SQLAlchemy()
@@ -260,3 +261,123 @@ class ClientProject(db.Model):
             'due_date': self.due_date.isoformat() if self.due_date else None,
             'completed_at': self.completed_at.isoformat() if self.completed_at else None
         }
+
+
+class GradeJob(db.Model):
+    """
+    A website grade queued for the background workers (see grade_jobs.py)
+    Callers poll /api/grade/jobs/<id> for its status and result
+    """
+    __tablename__ = 'grade_jobs'
+
+    id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
+    url = db.Column(db.String(2048), nullable=False)
+    host = db.Column(db.String(255), index=True)  # normalized host, for the per-host running limit
+    batch_id = db.Column(db.String(36), index=True)  # set for jobs queued by /api/grade/batch
+    options = db.Column(db.Text)  # JSON string: refresh, checks
+
+    # Lifecycle
+    status = db.Column(db.String(20), default="queued", index=True)  # queued, running, done, failed, expired
+    attempts = db.Column(db.Integer, default=0)
+    max_attempts = db.Column(db.Integer, default=3)
+    run_after = db.Column(db.DateTime, default=datetime.utcnow, index=True)  # earliest next attempt (retry backoff)
+    locked_by = db.Column(db.String(100))  # worker running the job
+    lease_expires_at = db.Column(db.DateTime)  # a running job past its lease is picked up again
+    expires_at = db.Column(db.DateTime)  # queued: dropped if not started by then; finished: deleted after
+
+    # Outcome
+    result = db.Column(db.Text)  # JSON string of the grade result
+    error = db.Column(db.Text)
+
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f'<GradeJob {self.id} {self.status}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'url': self.url,
+            'batch_id': self.batch_id,
+            'status': self.status,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None
+        }
+
+
+class GradeRecord(db.Model):
+    """
+    One completed website grade (see grade_history.py)
+    Only scores and fetch figures; the rows per domain make up its score history. The
+    analysis of the graded HTML is stored once, in GradeAnalysis under content_hash
+    """
+    __tablename__ = 'grade_history'
+
+    id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
+    url = db.Column(db.String(2048), nullable=False, index=True)  # normalized URL
+    domain = db.Column(db.String(255), nullable=False, index=True)
+    content_hash = db.Column(db.String(64))  # sha256 of the fetched HTML
+
+    # Scores
+    overall_score = db.Column(db.Integer)
+    overall_grade = db.Column(db.String(2))
+    scores = db.Column(db.Text)  # JSON string of the result's scores block
+
+    reused = db.Column(db.Boolean, default=False)  # analysis taken from an earlier grade of the same HTML
+
+    # Fetch
+    load_time = db.Column(db.Float)
+    page_bytes = db.Column(db.Integer)
+
+    # Timestamps
+    graded_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'<GradeRecord {self.url} {self.overall_score}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'url': self.url,
+            'content_hash': self.content_hash,
+            'overall_score': self.overall_score,
+            'overall_grade': self.overall_grade,
+            'scores': json.loads(self.scores) if self.scores else None,
+            'reused': self.reused,
+            'load_time': self.load_time,
+            'page_bytes': self.page_bytes,
+            'graded_at': self.graded_at.isoformat() if self.graded_at else None
+        }
+
+
+class GradeAnalysis(db.Model):
+    """
+    The HTML-only analysis of one version of a page (see grade_history.py), stored once
+    however many grades share it, so an unchanged page is regraded without re-parsing
+    Keyed by URL as well as content hash: the same HTML on another page is analysed apart
+    """
+    __tablename__ = 'grade_analyses'
+    __table_args__ = (db.Index('ix_grade_analyses_url_hash', 'url', 'content_hash'),)
+
+    id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
+    url = db.Column(db.String(2048), nullable=False)  # normalized URL
+    content_hash = db.Column(db.String(64), nullable=False)  # sha256 of the analysed HTML
+
+    features = db.Column(db.Text)  # JSON string of the extracted page features (no text)
+    analysis = db.Column(db.Text)  # JSON string: scores and messages before the volatile checks ran
+    analysis_version = db.Column(db.Integer)  # grader.ANALYSIS_VERSION that produced the analysis
+
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    used_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)  # last grade that stored or reused it
+
+    def __repr__(self):
+        return f'<GradeAnalysis {self.url} {self.content_hash[:12]}>'
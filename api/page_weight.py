@@ -0,0 +1,289 @@
+"""
+Remodely AI - Page Weight Audit
+Sizes the stylesheets, scripts, fonts and images a page loads with concurrent HEAD
+(or one-byte range) requests under a strict time budget. The probes start as soon as the
+page is fetched (WeightPrefetch), from a quick scan of the raw HTML, so they run while the
+page is parsed and scored. Probes of popular shared CDN assets are cached across grades,
+so jQuery or Google Fonts are only looked up once.
+"""
+
+import html
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+from urllib.parse import urljoin, urlparse
+
+from features import PRELOAD_KINDS
+from http_session import get_session
+
+# Seconds the whole audit may take; resources still pending after that count as unknown
+WEIGHT_AUDIT_BUDGET = float(os.environ.get('GRADER_WEIGHT_BUDGET', 3.0))
+WEIGHT_AUDIT_WORKERS = int(os.environ.get('GRADER_WEIGHT_WORKERS', 16))
+MAX_RESOURCES = 60
+RESOURCE_TIMEOUT = 2.5  # seconds per probe, never more than the audit budget
+TOP_OFFENDERS = 5
+# Share of the resources that must be sized for the audit to be scored; below it the
+# page would look lighter than it is, so the check is inconclusive
+WEIGHT_MIN_COVERAGE = float(os.environ.get('GRADER_WEIGHT_MIN_COVERAGE', 0.5))
+
+# Files smaller than about one packet gain nothing from compression
+COMPRESSIBLE_MIN_BYTES = 1400
+COMPRESSIBLE_TYPES = ('text/', 'javascript', 'json', 'xml', 'svg')
+
+ASSET_CACHE_TTL = int(os.environ.get('GRADER_ASSET_CACHE_TTL', 24 * 3600))
+ASSET_CACHE_MAX_ENTRIES = 5000
+
+# Hosts serving the same versioned files to thousands of sites
+SHARED_ASSET_HOSTS = {
+    'ajax.googleapis.com', 'fonts.googleapis.com', 'fonts.gstatic.com',
+    'code.jquery.com', 'cdnjs.cloudflare.com', 'cdn.jsdelivr.net', 'unpkg.com',
+    'maxcdn.bootstrapcdn.com', 'stackpath.bootstrapcdn.com', 'use.fontawesome.com',
+    'kit.fontawesome.com', 'www.googletagmanager.com', 'www.google-analytics.com',
+    'connect.facebook.net', 'static.cloudflareinsights.com', 'cdn.shopify.com',
+    'assets.squarespace.com', 'static.wixstatic.com', 'www.gstatic.com',
+}
+
+CONTENT_RANGE_TOTAL = re.compile(r'/\s*(\d+)\s*$')
+
+RESOURCE_TAG = re.compile(r'<(img|link|script)\b([^>]*)>', re.IGNORECASE)
+TAG_ATTR = re.compile(r'([^\s=/>]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s>]+))')
+
+# Compression is judged from what a browser would be sent
+PROBE_ACCEPT_ENCODING = 'gzip, deflate, br'
+
+
+class AssetCache:
+    """Per-process LRU of probe results for shared CDN assets"""
+
+    def __init__(self, ttl=ASSET_CACHE_TTL, max_entries=ASSET_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, url):
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None:
+                return None
+            if time.time() - entry[0] >= self.ttl:
+                del self._entries[url]
+                return None
+            self._entries.move_to_end(url)
+            return entry[1]
+
+    def put(self, url, probe):
+        with self._lock:
+            self._entries[url] = (time.time(), probe)
+            self._entries.move_to_end(url)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+asset_cache = AssetCache()
+_executor = ThreadPoolExecutor(max_workers=WEIGHT_AUDIT_WORKERS, thread_name_prefix='page-weight')
+
+
+def is_shared_asset(url):
+    return urlparse(url).hostname in SHARED_ASSET_HOSTS
+
+
+def _content_length(response):
+    try:
+        return int(response.headers['Content-Length'])
+    except (KeyError, ValueError):
+        return None
+
+
+def probe_resource(url, headers, timeout=RESOURCE_TIMEOUT):
+    """
+    Size one resource without downloading it
+    Returns {'bytes', 'encoding', 'type', 'status'}; bytes is None when the server won't say
+    """
+    session = get_session()
+    headers = dict(headers, **{'Accept-Encoding': PROBE_ACCEPT_ENCODING})
+    response = session.head(url, headers=headers, timeout=timeout, allow_redirects=True)
+    size = _content_length(response) if response.status_code < 400 else None
+
+    if size is None and response.status_code not in (404, 410):
+        # No length on HEAD (or HEAD refused): ask for one byte and read the total from Content-Range
+        response = session.get(url, headers=dict(headers, Range='bytes=0-0'), timeout=timeout,
+                               allow_redirects=True, stream=True)
+        response.close()
+        match = CONTENT_RANGE_TOTAL.search(response.headers.get('Content-Range', ''))
+        if response.status_code == 206 and match:
+            size = int(match.group(1))
+        elif response.status_code == 200:
+            size = _content_length(response)
+
+    return {
+        'bytes': size,
+        'encoding': response.headers.get('Content-Encoding'),
+        'type': (response.headers.get('Content-Type') or '').split(';')[0].strip().lower(),
+        'status': response.status_code,
+    }
+
+
+def _probe_cached(url, headers, timeout, scope=None, deadline=None):
+    if scope is not None:
+        # One crawl's pages share their probes, and the crawl decides which may run
+        return scope.probe(url, deadline, lambda: _probe_cached(url, headers, timeout))
+    shared = is_shared_asset(url)
+    if shared:
+        probe = asset_cache.get(url)
+        if probe is not None:
+            return dict(probe, cached=True)
+    probe = probe_resource(url, headers, timeout)
+    if shared and probe['status'] < 400:
+        asset_cache.put(url, probe)
+    return dict(probe, cached=False)
+
+
+def page_resources(page_url, resources, limit=MAX_RESOURCES):
+    """Absolute, de-duplicated (kind, url) pairs for the http(s) resources a page references"""
+    found = {}
+    for kind, src in resources:
+        url = urljoin(page_url, src.strip())
+        if urlparse(url).scheme in ('http', 'https') and url not in found:
+            found[url] = kind
+            if len(found) >= limit:
+                break
+    return [(kind, url) for url, kind in found.items()]
+
+
+def scan_resources(page_html):
+    """
+    (kind, src) of the resources in raw HTML, found the way PageFeatures finds them but
+    without parsing the page, so probes can start before it is parsed. The parsed
+    features still decide what the audit counts
+    """
+    resources = []
+    for match in RESOURCE_TAG.finditer(page_html or ''):
+        tag = match.group(1).lower()
+        attrs = {m.group(1).lower(): html.unescape(next(v for v in m.groups()[1:] if v is not None))
+                 for m in TAG_ATTR.finditer(match.group(2))}
+        if tag == 'img' and attrs.get('src'):
+            resources.append(('image', attrs['src']))
+        elif tag == 'link' and attrs.get('href'):
+            rel = attrs.get('rel', '').lower().split()
+            if 'stylesheet' in rel:
+                resources.append(('stylesheet', attrs['href']))
+            elif 'preload' in rel and attrs.get('as') in PRELOAD_KINDS:
+                resources.append((PRELOAD_KINDS[attrs['as']], attrs['href']))
+        elif tag == 'script' and attrs.get('src'):
+            if attrs.get('type', '').split(';')[0].strip().lower() != 'application/ld+json':
+                resources.append(('script', attrs['src']))
+    return resources
+
+
+class WeightPrefetch:
+    """
+    Probes a fetched page's resources on the audit pool while the page is parsed and scored
+    The audit's time budget starts here; audit_page_weight(prefetch=...) picks the probes up
+    """
+
+    def __init__(self, page_url, page_html, headers, budget=WEIGHT_AUDIT_BUDGET):
+        self.page_url = page_url
+        self.headers = headers
+        self.deadline = time.monotonic() + budget
+        timeout = min(RESOURCE_TIMEOUT, budget)
+        self.futures = {url: _executor.submit(_probe_cached, url, headers, timeout)
+                        for _, url in page_resources(page_url, scan_resources(page_html))}
+
+    def cancel(self):
+        for future in self.futures.values():
+            future.cancel()
+
+
+def _is_uncompressed_text(kind, probe):
+    if probe['encoding'] or (probe['bytes'] or 0) < COMPRESSIBLE_MIN_BYTES:
+        return False
+    if probe['type']:
+        return any(t in probe['type'] for t in COMPRESSIBLE_TYPES)
+    return kind in ('stylesheet', 'script')
+
+
+def audit_page_weight(page_url, resources, html_bytes, headers, budget=WEIGHT_AUDIT_BUDGET, scope=None,
+                      prefetch=None):
+    """
+    Probe every resource concurrently and sum up what the page costs to load
+    Returns total/html bytes, bytes per kind, the largest files and uncompressed text assets.
+    Resources that couldn't be sized in time are estimated from the sized ones of their kind;
+    inconclusive is True when fewer than WEIGHT_MIN_COVERAGE of them were sized
+    scope: optional site_crawler.CrawlProbeScope; its probe(url, deadline, fetch) returns a
+    probe, or None for a resource the crawl won't request (robots.txt, no turn within budget)
+    prefetch: optional WeightPrefetch of this page, whose probes (and budget) are reused
+    """
+    targets = page_resources(page_url, resources)
+    timeout = min(RESOURCE_TIMEOUT, budget)
+    started = {}
+    deadline = time.monotonic() + budget
+    if prefetch is not None and prefetch.page_url == page_url:
+        started, deadline = prefetch.futures, prefetch.deadline
+    futures = {}
+    for kind, url in targets:
+        future = started.get(url) or _executor.submit(_probe_cached, url, headers, timeout, scope, deadline)
+        futures[future] = (kind, url)
+    for future in set(started.values()) - set(futures):
+        future.cancel()  # the raw-HTML scan found something the parser didn't
+    done, pending = wait(futures, timeout=max(deadline - time.monotonic(), 0))
+    for future in pending:
+        future.cancel()
+
+    sized = []
+    unknown = [futures[future][0] for future in pending]
+    skipped = 0
+    cached = 0
+    for future in done:
+        kind, url = futures[future]
+        try:
+            probe = future.result()
+        except Exception:
+            unknown.append(kind)
+            continue
+        if probe is None:
+            skipped += 1
+            continue
+        if probe['bytes'] is None or probe['status'] >= 400:
+            unknown.append(kind)
+            continue
+        cached += probe['cached']
+        sized.append((kind, url, probe))
+
+    by_kind = {}
+    for kind, _, probe in sized:
+        by_kind[kind] = by_kind.get(kind, 0) + probe['bytes']
+
+    # An unsized file counts as the average sized file of its kind (of any kind if none was)
+    counts = {}
+    for kind, _, _ in sized:
+        counts[kind] = counts.get(kind, 0) + 1
+    average = sum(by_kind.values()) / len(sized) if sized else 0
+    estimated = round(sum(by_kind[kind] / counts[kind] if kind in counts else average for kind in unknown))
+
+    requested = len(targets) - skipped
+    coverage = len(sized) / requested if requested else 1.0
+    largest = sorted(sized, key=lambda item: -item[2]['bytes'])[:TOP_OFFENDERS]
+    return {
+        'total_bytes': (html_bytes or 0) + sum(by_kind.values()) + estimated,
+        'html_bytes': html_bytes,
+        'by_kind': by_kind,
+        'estimated_bytes': estimated,
+        'resources_found': len(targets),
+        'resources_sized': len(sized),
+        'resources_unknown': len(unknown),
+        'resources_skipped': skipped,
+        'coverage': round(coverage, 2),
+        'inconclusive': coverage < WEIGHT_MIN_COVERAGE,
+        'timed_out': bool(pending),
+        'shared_cache_hits': cached,
+        'largest': [{'url': url, 'kind': kind, 'bytes': probe['bytes']} for kind, url, probe in largest],
+        'uncompressed': [url for kind, url, probe in sized if _is_uncompressed_text(kind, probe)],
+    }
@@ -0,0 +1,53 @@
+"""
+Remodely AI - Parser Parity
+Grades the saved fixture pages (api/fixtures/pages) offline with any HTML parser backend,
+so each backend can be compared against the html.parser reference. Shared by the test
+suite (tests/test_parser_parity.py) and scripts/check_parser_parity.py
+"""
+
+import glob
+import os
+
+from grader import WebsiteGrader
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'pages')
+REFERENCE_PARSER = 'html.parser'
+BACKENDS = ['lxml', 'selectolax']
+
+
+def fixture_paths():
+    """Every saved fixture page, sorted by name"""
+    return sorted(glob.glob(os.path.join(FIXTURES_DIR, '*.html')))
+
+
+def read_fixture(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def grade_fixture(html, parser):
+    """Run every check on a saved page with the given backend"""
+    grader = WebsiteGrader('https://fixture.example', parser=parser)
+    grader.html = html
+    grader.load_time = 0.5
+    grader.parse_page()
+    grader.run_checks()
+    return {
+        'scores': grader.scores,
+        'issues': grader.issues,
+        'recommendations': grader.recommendations,
+    }
+
+
+def diff_results(expected, actual):
+    """Human-readable differences between two graded fixtures; empty when they match"""
+    diffs = []
+    for key in sorted(set(expected['scores']) | set(actual['scores'])):
+        want = expected['scores'].get(key)
+        got = actual['scores'].get(key)
+        if want != got:
+            diffs.append(f"{key}: {want!r} != {got!r}")
+    for field in ('issues', 'recommendations'):
+        if expected[field] != actual[field]:
+            diffs.append(f"{field}: {expected[field]!r} != {actual[field]!r}")
+    return diffs
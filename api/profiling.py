@@ -0,0 +1,91 @@
+"""
+Remodely AI - Grader Profiling
+Times fetch, parse and every check_* step of each grade and keeps per-step latency
+histograms for the whole process (served on /api/grade/metrics)
+"""
+
+import bisect
+import os
+import threading
+import time
+
+PROFILING_ENABLED = os.environ.get('GRADER_PROFILING', '1').lower() not in ('0', 'false', 'no')
+
+# Histogram bucket upper bounds in milliseconds; anything slower lands in the overflow bucket
+BUCKET_BOUNDS_MS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000]
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram; percentiles are estimated from the buckets"""
+
+    def __init__(self, bounds=BUCKET_BOUNDS_MS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms):
+        self.counts[bisect.bisect_left(self.bounds, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of observations"""
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return self.bounds[i] if i < len(self.bounds) else round(self.max_ms, 1)
+        return round(self.max_ms, 1)
+
+    def snapshot(self):
+        labels = [f"le_{b}ms" for b in self.bounds] + ['overflow']
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total_ms / self.count, 2) if self.count else None,
+            'max_ms': round(self.max_ms, 2),
+            'p50_ms': self.percentile(0.50),
+            'p95_ms': self.percentile(0.95),
+            'p99_ms': self.percentile(0.99),
+            'buckets': dict(zip(labels, self.counts)),
+        }
+
+
+class StepProfiler:
+    """Per-step histograms shared by every grader in the process"""
+
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def record(self, step, seconds):
+        if not PROFILING_ENABLED:
+            return
+        with self._lock:
+            histogram = self._histograms.get(step)
+            if histogram is None:
+                histogram = self._histograms[step] = LatencyHistogram()
+            histogram.observe(seconds * 1000)
+
+    def snapshot(self):
+        with self._lock:
+            steps = {step: h.snapshot() for step, h in self._histograms.items()}
+        return {
+            'enabled': PROFILING_ENABLED,
+            'since': self.started_at,
+            'steps': steps,
+        }
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self.started_at = time.time()
+
+
+profiler = StepProfiler()
@@ -3,9 +3,17 @@ Remodely AI - Website Grader API Server
 Multi-tenant Aria AI Receptionist System
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
-from grader import grade_website
+from grader import WebsiteGrader
+from grade_cache import grade_website_cached, grade_website_streamed
+from grade_pool import grade_pool, PoolSaturated, RETRY_AFTER
+from grade_jobs import get_job_queue, job_response, batch_response
+from profiling import profiler
+from single_flight import grade_flights
+from tls_inspect import tls_cache, tls_flights
+from grade_history import (get_grade_history, history_response, normalize_domain,
+                           HISTORY_DEFAULT_LIMIT, HISTORY_MAX_LIMIT)
 import os
 import smtplib
 import ssl
@@ -13,6 +21,7 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime, timedelta
 import json
+import uuid
 
 app = Flask(__name__)
 CORS(app)
@@ -95,6 +104,21 @@ def send_email(to_email, subject, html_content, text_content):
 # WEBSITE GRADER ENDPOINTS
 # =============================================================================
 
+def parse_checks(value):
+    """
+    Requested check names from 'ai_visibility,speed' or a JSON list; None means all checks
+    Raises ValueError for names that aren't checks
+    """
+    if not value:
+        return None
+    names = value.split(',') if isinstance(value, str) else list(value)
+    names = [str(name).strip() for name in names if str(name).strip()]
+    if not names:
+        return None
+    WebsiteGrader.plan_checks(names)
+    return names
+
+
 @app.route('/api/grade', methods=['POST', 'OPTIONS'])
 def grade():
     if request.method == 'OPTIONS':
@@ -108,13 +132,279 @@ def grade():
     if not url:
         return jsonify({'success': False, 'error': 'URL cannot be empty'}), 400
 
+    # Only run some checks (plus what they depend on): {"checks": ["ai_visibility"]} or ?checks=ai_visibility,speed
+    try:
+        checks = parse_checks(data.get('checks') or request.args.get('checks'))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    # Job mode: {"async": true} returns a job id right away instead of waiting for the grade
+    if data.get('async'):
+        return enqueue_grade_job(url, data, checks)
+
     try:
-        result = grade_website(url)
+        # Repeat grades within GRADE_CACHE_TTL are served from cache; pass refresh to force a regrade
+        result = grade_website_cached(url, refresh=bool(data.get('refresh')),
+                                      debug=bool(data.get('debug')), checks=checks)
         return jsonify(result)
+    except PoolSaturated as e:
+        return pool_saturated_response(e)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+def pool_saturated_response(error=None):
+    """503 telling the caller when to retry a grade the grading pool turned away"""
+    message = str(error) if error else "Grader is at capacity - try again shortly"
+    return jsonify({'success': False, 'error': message}), 503, {'Retry-After': str(RETRY_AFTER)}
+
+
+def job_queue():
+    """The grading job queue, with this process's background workers running"""
+    queue = get_job_queue()
+    queue.start_workers()
+    return queue
+
+
+def enqueue_grade_job(url, data, checks):
+    try:
+        job = job_queue().enqueue(url, refresh=bool(data.get('refresh')), checks=checks)
+        return jsonify({
+            'success': True,
+            'job_id': job.id,
+            'status': job.status,
+            'status_url': f'/api/grade/jobs/{job.id}'
+        }), 202
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@app.route('/api/grade/jobs', methods=['POST', 'OPTIONS'])
+def create_grade_job():
+    """Queue a grade; poll /api/grade/jobs/<id> for its status and result"""
+    if request.method == 'OPTIONS':
+        return '', 204
+
+    data = request.get_json()
+    if not data or 'url' not in data:
+        return jsonify({'success': False, 'error': 'URL is required'}), 400
+
+    url = data['url'].strip()
+    if not url:
+        return jsonify({'success': False, 'error': 'URL cannot be empty'}), 400
+
+    try:
+        checks = parse_checks(data.get('checks'))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    return enqueue_grade_job(url, data, checks)
+
+
+@app.route('/api/grade/jobs/<job_id>', methods=['GET'])
+def get_grade_job(job_id):
+    """
+    Status of a queued grade: queued, running, done, failed or expired
+    The grade result is included once the job is done (and the last result when it failed)
+    """
+    try:
+        job = job_queue().get(job_id)
+        if not job:
+            return jsonify({'success': False, 'error': 'Job not found (it may have expired)'}), 404
+        return jsonify(job_response(job))
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@app.route('/api/grade/history/<domain>', methods=['GET'])
+def grade_history(domain):
+    """
+    Stored grades of a domain's pages, each page's oldest first, with how its overall, AI
+    visibility and business essentials scores moved (?limit=N grades per page, default 30;
+    ?url=... for one page)
+    """
+    history = get_grade_history()
+    if history is None:
+        return jsonify({'success': False, 'error': 'Grade history is disabled'}), 404
+    try:
+        limit = int(request.args.get('limit', HISTORY_DEFAULT_LIMIT))
+    except ValueError:
+        return jsonify({'success': False, 'error': 'limit must be a number'}), 400
+    limit = max(1, min(limit, HISTORY_MAX_LIMIT))
+
+    url = request.args.get('url', '').strip()
+    url = WebsiteGrader._normalize_url(url) if url else None
+
+    try:
+        domain = normalize_domain(domain)
+        return jsonify(history_response(domain, history.for_domain(domain, limit, url=url)))
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+def sse_event(event, data):
+    """Format one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.route('/api/grade/stream', methods=['GET'])
+def grade_stream():
+    """
+    Grade a website, streaming progress as Server-Sent Events
+    Events: start, fetched, one check event per score as soon as it is computed
+    (https, mobile, ... ai_visibility, overall), then the full result; error if the fetch fails
+    debug=1 adds a per-step timing breakdown to the result event
+    checks=ai_visibility,speed only runs those checks and what they depend on
+    Scoring runs on the grading pool: a saturated pool is a 503 up front, or an error
+    event if it fills up during the fetch. Concurrent grades of the page, streamed or not,
+    share one fetch and analysis; a stream that joins one gets its scores with the result
+    """
+    url = request.args.get('url', '').strip()
+    if not url:
+        return jsonify({'success': False, 'error': 'URL is required'}), 400
+    debug = request.args.get('debug') in ('1', 'true')
+    try:
+        checks = parse_checks(request.args.get('checks'))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    if grade_pool.enabled and grade_pool.saturated:
+        return pool_saturated_response()
+
+    def generate():
+        grader = WebsiteGrader(url)
+        yield sse_event('start', {'url': grader.url})
+        try:
+            for event, data in grade_website_streamed(url, checks, debug):
+                if event == 'check':
+                    check, score = data
+                    data = {'check': check, 'score': score}
+                    if check in ('overall', 'ai_visibility'):
+                        data['grade'] = grader.get_grade(score)
+                yield sse_event(event, data)
+        except PoolSaturated as e:
+            yield sse_event('error', {'success': False, 'error': str(e), 'url': grader.url,
+                                      'retry_after': RETRY_AFTER})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+GRADE_CRAWL_MAX_PAGES = int(os.environ.get('GRADE_CRAWL_MAX_PAGES', 25))
+GRADE_CRAWL_MAX_DEPTH = int(os.environ.get('GRADE_CRAWL_MAX_DEPTH', 3))
+
+
+@app.route('/api/grade/site', methods=['POST', 'OPTIONS'])
+def grade_site():
+    """
+    Crawl a site from its sitemap and internal links and grade it as a whole
+    A crawl takes far longer than a web request may, so it is queued: returns a job id (202);
+    poll /api/grade/jobs/<id> for the site-level result
+    """
+    if request.method == 'OPTIONS':
+        return '', 204
+
+    data = request.get_json()
+    if not data or 'url' not in data:
+        return jsonify({'success': False, 'error': 'URL is required'}), 400
+
+    url = data['url'].strip()
+    if not url:
+        return jsonify({'success': False, 'error': 'URL cannot be empty'}), 400
+
+    try:
+        max_pages = min(int(data.get('max_pages', 10)), GRADE_CRAWL_MAX_PAGES)
+        max_depth = min(int(data.get('max_depth', 2)), GRADE_CRAWL_MAX_DEPTH)
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'max_pages and max_depth must be integers'}), 400
+
+    try:
+        job = job_queue().enqueue_crawl(url, max_pages=max(max_pages, 1), max_depth=max(max_depth, 0))
+        return jsonify({
+            'success': True,
+            'job_id': job.id,
+            'status': job.status,
+            'status_url': f'/api/grade/jobs/{job.id}'
+        }), 202
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+GRADE_BATCH_MAX_URLS = int(os.environ.get('GRADE_BATCH_MAX_URLS', 500))
+
+
+@app.route('/api/grade/batch', methods=['POST', 'OPTIONS'])
+def grade_batch():
+    """
+    Queue a grade job per URL and return right away (202) with a batch id; poll
+    /api/grade/batch/<id> for the results finished so far (or /api/grade/jobs/<id> per URL)
+    The job queue's workers grade them, at most GRADE_JOB_PER_HOST at once per host,
+    so a batch never holds a web worker
+    """
+    if request.method == 'OPTIONS':
+        return '', 204
+
+    data = request.get_json()
+    if not data or not isinstance(data.get('urls'), list):
+        return jsonify({'success': False, 'error': 'urls list is required'}), 400
+
+    # Drop blanks and duplicates (same normalized URL) but keep the caller's order
+    urls = []
+    seen = set()
+    for url in data['urls']:
+        url = str(url).strip()
+        key = WebsiteGrader._normalize_url(url) if url else None
+        if url and key not in seen:
+            seen.add(key)
+            urls.append(url)
+
+    if not urls:
+        return jsonify({'success': False, 'error': 'urls cannot be empty'}), 400
+    if len(urls) > GRADE_BATCH_MAX_URLS:
+        return jsonify({'success': False, 'error': f'At most {GRADE_BATCH_MAX_URLS} URLs per batch'}), 400
+
+    batch_id = str(uuid.uuid4())
+    try:
+        jobs = job_queue().enqueue_many(urls, refresh=bool(data.get('refresh')), batch_id=batch_id)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+    return jsonify({
+        'success': True,
+        'batch_id': batch_id,
+        'status_url': f'/api/grade/batch/{batch_id}',
+        'count': len(jobs),
+        'jobs': [{'input': url, 'job_id': job.id, 'status': job.status,
+                  'status_url': f'/api/grade/jobs/{job.id}'} for url, job in zip(urls, jobs)]
+    }), 202
+
+
+@app.route('/api/grade/batch/<batch_id>', methods=['GET'])
+def get_grade_batch(batch_id):
+    """Status of a queued batch, with the result of every URL graded so far"""
+    try:
+        jobs = job_queue().get_batch(batch_id)
+        if not jobs:
+            return jsonify({'success': False, 'error': 'Batch not found (it may have expired)'}), 404
+        return jsonify(batch_response(batch_id, jobs))
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@app.route('/api/grade/metrics', methods=['GET'])
+def grade_metrics():
+    """Internal: per-step grader latency histograms (fetch, parse, each check) for this worker,
+    plus how many fetches request coalescing saved and how often TLS inspections were reused"""
+    metrics = profiler.snapshot()
+    metrics['coalescing'] = grade_flights.stats()
+    metrics['tls_cache'] = dict(tls_cache.stats(), handshakes_saved=tls_flights.saved)
+    if request.args.get('reset') in ('1', 'true'):
+        profiler.reset()
+    return jsonify(metrics)
+
+
 @app.route('/api/health', methods=['GET'])
 def health():
     db_url = os.environ.get('DATABASE_URL', '')
@@ -1083,6 +1373,11 @@ def index():
         'version': '3.0',
         'endpoints': {
             'grader': '/api/grade',
+            'grader_batch': '/api/grade/batch',
+            'grader_jobs': '/api/grade/jobs',
+            'grader_history': '/api/grade/history/<domain>',
+            'grader_stream': '/api/grade/stream?url=<url>',
+            'grader_site': '/api/grade/site',
             'aria_companies': '/api/aria/companies',
             'aria_leads': '/api/aria/companies/<id>/leads',
             'vapi_webhook': '/api/aria/webhook/vapi',
@@ -0,0 +1,71 @@
+"""
+Remodely AI - Request Coalescing
+When a grader link gets shared, many people grade the same site at once; concurrent
+grades of the same normalized URL share one fetch and analysis instead of each doing their own
+"""
+
+import threading
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time
+    Callers arriving while it runs wait for it and get the same outcome (result or exception)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+        self.leaders = 0
+        self.saved = 0  # calls answered by another caller's in-flight work
+
+    def do(self, key, fn):
+        """Returns (result, shared); shared is True when another caller's call produced it"""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+                self.leaders += 1
+                leader = True
+            else:
+                flight.waiters += 1
+                self.saved += 1
+                leader = False
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+
+        try:
+            flight.result = fn()
+            return flight.result, False
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'fetches_saved': self.saved,
+                'fetches_run': self.leaders,
+                'in_flight': len(self._flights),
+                'waiting': sum(f.waiters for f in self._flights.values()),
+            }
+
+
+# Shared by every grading entry point in the process
+grade_flights = SingleFlight()
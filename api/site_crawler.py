@@ -0,0 +1,326 @@
+"""
+Remodely AI - Site Crawler
+Grades a whole site instead of just the homepage: seeds from sitemap.xml and
+internal links, runs the usual checks per page and rolls them up into a site score
+"""
+
+import asyncio
+import html
+import re
+import threading
+import time
+from collections import deque
+from urllib.parse import urljoin, urldefrag, urlparse
+from urllib.robotparser import RobotFileParser
+
+import aiohttp
+
+from async_grader import AsyncWebsiteGrader, AsyncCrawlFilePrefetch, create_session
+from grade_pool import grade_pool
+from grader import WebsiteGrader, USER_AGENT
+from single_flight import SingleFlight
+
+ROBOTS_AGENT = 'RemodelySiteGrader'
+DEFAULT_MAX_PAGES = 10
+DEFAULT_MAX_DEPTH = 2
+DEFAULT_CONCURRENCY = 2
+DEFAULT_POLITENESS_DELAY = 0.25  # seconds between request starts on the domain
+MAX_CRAWL_DELAY = 5  # cap on robots.txt Crawl-delay so one site can't stall the API
+MAX_CHILD_SITEMAPS = 3
+AUX_TIMEOUT = 5  # robots.txt / sitemap fetches
+
+# Links that are never HTML pages
+SKIP_EXTENSIONS = ('.pdf', '.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.zip',
+                   '.mp4', '.mp3', '.doc', '.docx', '.xls', '.xlsx', '.css', '.js', '.xml')
+
+LOC_PATTERN = re.compile(r'<loc>\s*(.*?)\s*</loc>', re.IGNORECASE | re.DOTALL)
+
+# Site-wide checks: one strong page is enough (e.g. an FAQ page carrying the FAQ schema)
+BEST_PAGE_SCORES = ['structured_data', 'social', 'contact', 'content', 'business_essentials']
+# Per-page quality checks: every page should pass, so they are averaged
+AVERAGED_SCORES = ['https', 'mobile', 'meta_tags', 'headings', 'images', 'speed', 'page_weight']
+MERGED_LISTS = ['schema_types', 'social_platforms', 'business_factors']
+# Checks of the site's crawl files, the same on every page
+SITE_SCORES = ['crawler_access', 'ai_crawlers_blocked', 'crawl_files']
+
+
+def _site_key(netloc):
+    netloc = netloc.lower()
+    return netloc[4:] if netloc.startswith('www.') else netloc
+
+
+def _rank_by_pages(per_page):
+    """Unique messages ordered by how many pages raised them (ties keep first-seen order)"""
+    counts = {}
+    for messages in per_page:
+        for message in set(messages):
+            counts[message] = counts.get(message, 0) + 1
+    order = list(dict.fromkeys(m for messages in per_page for m in messages))
+    return sorted(order, key=lambda m: -counts[m])
+
+
+class RequestSpacer:
+    """
+    Spaces request starts on one site by delay seconds
+    Thread-safe, so page fetches on the event loop and resource probes on threads take turns
+    """
+
+    def __init__(self, delay):
+        self.delay = delay
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def reserve(self, max_wait=None):
+        """Seconds to wait for the next turn, or None (and no turn taken) if that's over max_wait"""
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            if max_wait is not None and start - now > max_wait:
+                return None
+            self._next = start + self.delay
+            return start - now
+
+
+class CrawlProbeScope:
+    """
+    Page-weight probes for one crawl: each resource is probed once for all its pages, and
+    resources on the crawled site obey its robots.txt and the crawler's request spacing
+    """
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+        self.probes = {}
+        self._lock = threading.Lock()
+        self._flights = SingleFlight()
+
+    def _admit(self, url, deadline):
+        crawler = self.crawler
+        if _site_key(urlparse(url).netloc) != crawler.site:
+            return True
+        if crawler.robots and not crawler.robots.can_fetch(ROBOTS_AGENT, url):
+            return False
+        wait = crawler.spacer.reserve(deadline - time.monotonic())
+        if wait is None:
+            return False
+        time.sleep(wait)
+        return True
+
+    def probe(self, url, deadline, fetch):
+        """A probe of url, fetched at most once per crawl; None if the crawl won't request it"""
+        with self._lock:
+            probe = self.probes.get(url)
+        if probe is not None:
+            return dict(probe, cached=True)
+
+        def run():
+            if not self._admit(url, deadline):
+                return None
+            result = fetch()
+            with self._lock:
+                self.probes[url] = result
+            return result
+
+        probe, shared = self._flights.do(url, run)
+        return dict(probe, cached=probe['cached'] or shared) if probe else None
+
+
+class SiteCrawler:
+    """
+    Crawls one domain with a shared session
+    robots.txt, llms.txt and the sitemap are fetched once; page requests and the pages' resource
+    probes are spaced by the politeness delay
+    """
+
+    def __init__(self, url, max_pages=DEFAULT_MAX_PAGES, max_depth=DEFAULT_MAX_DEPTH,
+                 concurrency=DEFAULT_CONCURRENCY, politeness_delay=DEFAULT_POLITENESS_DELAY,
+                 parser=None, executor=None):
+        self.url = WebsiteGrader._normalize_url(url)
+        self.site = _site_key(urlparse(self.url).netloc)
+        self.max_pages = max_pages
+        self.max_depth = max_depth
+        self.concurrency = concurrency
+        self.politeness_delay = politeness_delay
+        self.parser = parser
+        self.executor = executor
+        self.session = None
+        self.robots = None
+        self.crawl_prefetch = None
+        self.crawl_files = None  # shared by every page's crawler_access check
+        self.sitemap_urls = []
+        self.pages = []  # (url, depth, grader or None if the fetch failed) in crawl order
+        self.spacer = RequestSpacer(politeness_delay)
+        self.probe_scope = CrawlProbeScope(self)
+
+    async def _fetch_text(self, url):
+        try:
+            async with self.session.get(url, headers={'User-Agent': USER_AGENT},
+                                        timeout=aiohttp.ClientTimeout(total=AUX_TIMEOUT)) as response:
+                if response.status != 200:
+                    return None
+                return await response.text(errors='replace')
+        except Exception:
+            return None
+
+    async def _wait_turn(self):
+        """Space request starts on this domain by the politeness delay"""
+        wait = self.spacer.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    async def load_robots(self):
+        """Fetch the crawl files once; honours robots.txt's Crawl-delay and Sitemap lines"""
+        self.crawl_prefetch = AsyncCrawlFilePrefetch(self.session, self.url, {'User-Agent': USER_AGENT})
+        self.crawl_files = await self.crawl_prefetch.files()
+        robots = self.crawl_files['robots_txt']
+        if robots['status'] != 200:
+            return
+        self.robots = RobotFileParser()
+        self.robots.parse(robots['text'].splitlines())
+        delay = self.robots.crawl_delay(ROBOTS_AGENT)
+        if delay:
+            self.politeness_delay = max(self.politeness_delay, min(float(delay), MAX_CRAWL_DELAY))
+            self.spacer.delay = self.politeness_delay
+
+    async def load_sitemap(self):
+        """Fetch the sitemap once (following a sitemap index a level down) and keep its page URLs"""
+        sources = (self.robots.site_maps() if self.robots else None) or [urljoin(self.url + '/', '/sitemap.xml')]
+        text = await self._fetch_text(sources[0])
+        if text is None:
+            return
+
+        locs = [html.unescape(loc) for loc in LOC_PATTERN.findall(text)]
+        if '<sitemapindex' in text[:1000].lower():
+            children = await asyncio.gather(*[self._fetch_text(loc) for loc in locs[:MAX_CHILD_SITEMAPS]])
+            locs = [html.unescape(loc) for child in children if child for loc in LOC_PATTERN.findall(child)]
+        self.sitemap_urls = locs
+
+    def _crawlable(self, url):
+        """Normalized URL if it is an HTML page on this site we may fetch, else None"""
+        url = urldefrag(url)[0]
+        parsed = urlparse(url)
+        if parsed.scheme not in ('http', 'https') or _site_key(parsed.netloc) != self.site:
+            return None
+        if parsed.path.lower().endswith(SKIP_EXTENSIONS):
+            return None
+        if self.robots and not self.robots.can_fetch(ROBOTS_AGENT, url):
+            return None
+        return WebsiteGrader._normalize_url(url)
+
+    async def _grade_page(self, url):
+        """Fetch and check one page; returns its grader, or None if it isn't a live page"""
+        await self._wait_turn()
+        grader = AsyncWebsiteGrader(url, self.session, parser=self.parser, executor=self.executor)
+        if not await grader.fetch_page(parse=not grade_pool.enabled, prefetch=False) or grader.status_code >= 400:
+            return None
+        grader.crawl_prefetch, grader.crawl_files = self.crawl_prefetch, self.crawl_files
+        grader.probe_scope = self.probe_scope
+        loop = asyncio.get_running_loop()
+        if grade_pool.enabled:
+            # A queued crawl waits for grading workers rather than failing halfway
+            await loop.run_in_executor(self.executor, grade_pool.run_checks, grader, None, True)
+        else:
+            await loop.run_in_executor(self.executor, grader.run_checks)
+        return grader
+
+    async def crawl(self):
+        """Grade up to max_pages pages breadth-first from the homepage and sitemap"""
+        async with create_session(limit=self.concurrency, limit_per_host=self.concurrency) as session:
+            self.session = session
+            await self.load_robots()
+            await self.load_sitemap()
+
+            frontier = deque([(self.url, 0)])
+            seen = {self.url}
+            for loc in self.sitemap_urls:
+                url = self._crawlable(loc)
+                if url and url not in seen and self.max_depth >= 1:
+                    seen.add(url)
+                    frontier.append((url, 1))
+
+            while frontier and len(self.pages) < self.max_pages:
+                take = min(self.concurrency, self.max_pages - len(self.pages))
+                batch = [frontier.popleft() for _ in range(min(take, len(frontier)))]
+                graders = await asyncio.gather(*[self._grade_page(url) for url, _ in batch])
+
+                for (url, depth), grader in zip(batch, graders):
+                    self.pages.append((url, depth, grader))
+                    if grader is None or depth >= self.max_depth:
+                        continue
+                    base = grader.final_url or grader.url
+                    for href in grader.features.links:
+                        link = self._crawlable(urljoin(base, href))
+                        if link and link not in seen:
+                            seen.add(link)
+                            frontier.append((link, depth + 1))
+            self.session = None
+
+        return self.build_result()
+
+    def aggregate(self, graded):
+        """Roll the per-page scores up into a grader holding the site-level scores"""
+        site = WebsiteGrader(self.url)
+        scores = [g.scores for g in graded]
+        for key in BEST_PAGE_SCORES:
+            site.scores[key] = max(s.get(key, 0) for s in scores)
+        for key in AVERAGED_SCORES:
+            # Over the pages the check scored (page weight is left out when inconclusive)
+            values = [s[key] for s in scores if isinstance(s.get(key), (int, float))]
+            if values:
+                site.scores[key] = round(sum(values) / len(values))
+        for key in MERGED_LISTS:
+            merged = []
+            for s in scores:
+                merged.extend(v for v in s.get(key, []) if v not in merged)
+            site.scores[key] = merged
+        site.scores['word_count'] = max(s.get('word_count', 0) for s in scores)
+        for key in SITE_SCORES:
+            if key in scores[0]:
+                site.scores[key] = scores[0][key]
+        site.crawler_access = graded[0].crawler_access
+        site.tls = graded[0].tls
+
+        load_times = [g.load_time for g in graded if g.load_time]
+        site.load_time = sum(load_times) / len(load_times) if load_times else None
+
+        # Issues/recommendations shared by the most pages first
+        site.issues = _rank_by_pages([g.issues for g in graded])
+        site.recommendations = _rank_by_pages([g.recommendations for g in graded])
+        site.check_ai_visibility()
+        site.recommendations = list(dict.fromkeys(site.recommendations))
+        site.calculate_overall_score()
+        return site
+
+    def build_result(self):
+        """Site-level result in the single-page shape, plus a per-page breakdown"""
+        graded = [g for _, _, g in self.pages if g is not None]
+        if not graded:
+            return {
+                'success': False,
+                'error': 'Could not fetch website',
+                'url': self.url
+            }
+
+        result = self.aggregate(graded).build_result()
+        result['mode'] = 'crawl'
+        result['pages_crawled'] = len(graded)
+        result['pages'] = [{
+            'url': url,
+            'depth': depth,
+            'success': g is not None,
+            'overall': g.scores.get('overall') if g else None,
+            'ai_visibility': g.scores.get('ai_visibility') if g else None,
+            'load_time': round(g.load_time, 2) if g and g.load_time else None,
+        } for url, depth, g in self.pages]
+        result['details']['robots_txt'] = self.robots is not None
+        result['details']['sitemap_urls'] = len(self.sitemap_urls)
+        return result
+
+
+async def crawl_site_async(url, max_pages=DEFAULT_MAX_PAGES, max_depth=DEFAULT_MAX_DEPTH, **kwargs):
+    """Crawl and grade a site on the running event loop"""
+    return await SiteCrawler(url, max_pages=max_pages, max_depth=max_depth, **kwargs).crawl()
+
+
+def crawl_site(url, max_pages=DEFAULT_MAX_PAGES, max_depth=DEFAULT_MAX_DEPTH, **kwargs):
+    """Blocking wrapper around crawl_site_async"""
+    return asyncio.run(crawl_site_async(url, max_pages=max_pages, max_depth=max_depth, **kwargs))
@@ -0,0 +1,139 @@
+"""
+Remodely AI - Structured Data Extractor
+Reads every JSON-LD block on a page into a flat list of Schema.org entities: top-level
+nodes, @graph members (as Yoast and RankMath emit them) and entities nested in
+properties (a LocalBusiness's address, an FAQPage's questions). Blocks are decoded with
+orjson when it is installed and parsed under per-block and per-page byte budgets, so a
+page embedding megabytes of JSON can't stall the grade.
+"""
+
+import json
+import os
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSON_LD_MAX_BLOCK_BYTES = int(os.environ.get('GRADER_JSON_LD_MAX_BLOCK', 512 * 1024))
+JSON_LD_MAX_TOTAL_BYTES = int(os.environ.get('GRADER_JSON_LD_MAX_TOTAL', 2 * 1024 * 1024))
+MAX_ENTITIES = 200
+MAX_DEPTH = 32  # nesting followed below a block's top level
+MAX_NAME_CHARS = 200
+
+# Prefixes full IRIs and compact forms put before a Schema.org type name
+SCHEMA_PREFIXES = ('http://schema.org/', 'https://schema.org/', 'schema:')
+
+_loads = orjson.loads if orjson else json.loads
+
+
+def _strip_wrapper(text):
+    """Drop the CDATA and HTML comment wrappers some CMSes put around the JSON"""
+    text = text.strip()
+    for start, end in (('<![CDATA[', ']]>'), ('//<![CDATA[', '//]]>'), ('<!--', '-->')):
+        if text.startswith(start) and text.endswith(end):
+            text = text[len(start):-len(end)].strip()
+    return text
+
+
+def _type_names(value):
+    """@type as a list of short names; it may be a string or a list of them"""
+    values = value if isinstance(value, list) else [value]
+    names = []
+    for name in values:
+        if isinstance(name, str) and name:
+            for prefix in SCHEMA_PREFIXES:
+                if name.startswith(prefix):
+                    name = name[len(prefix):]
+                    break
+            names.append(name)
+    return names
+
+
+def _entity(node, types, path):
+    name = node.get('name')
+    if isinstance(name, list):
+        name = next((n for n in name if isinstance(n, str)), None)
+    return {
+        'types': types,
+        'id': node.get('@id') if isinstance(node.get('@id'), str) else None,
+        'name': name[:MAX_NAME_CHARS] if isinstance(name, str) else None,
+        'path': path,
+        'properties': sorted(key for key in node if not key.startswith('@')),
+    }
+
+
+def _walk(data, block, entities, by_id):
+    """
+    Add every typed node under data to entities; a node repeated by @id only adds its types
+    Returns how many entities didn't fit under MAX_ENTITIES
+    """
+    dropped = 0
+    stack = [(data, f'[{block}]', 0)]
+    while stack:
+        node, path, depth = stack.pop()
+        if isinstance(node, list):
+            stack.extend((item, f'{path}[{i}]', depth + 1) for i, item in reversed(list(enumerate(node))))
+            continue
+        if not isinstance(node, dict) or depth > MAX_DEPTH:
+            continue
+
+        types = _type_names(node.get('@type'))
+        if types:
+            entity_id = node.get('@id') if isinstance(node.get('@id'), str) else None
+            known = by_id.get(entity_id) if entity_id else None
+            if known is not None:
+                known['types'].extend(t for t in types if t not in known['types'])
+            elif len(entities) < MAX_ENTITIES:
+                entity = _entity(node, types, path)
+                entities.append(entity)
+                if entity_id:
+                    by_id[entity_id] = entity
+            else:
+                dropped += 1
+
+        children = [(key, value) for key, value in node.items()
+                    if isinstance(value, (dict, list)) and key != '@context']
+        stack.extend((value, f'{path}.{key}', depth + 1) for key, value in reversed(children))
+    return dropped
+
+
+def extract_json_ld(blocks):
+    """
+    Entities of a page's JSON-LD blocks (raw script bodies), in document order
+    Blocks over JSON_LD_MAX_BLOCK_BYTES, or past JSON_LD_MAX_TOTAL_BYTES for the page, are
+    skipped; blocks that aren't valid JSON are counted as errors
+    """
+    entities, by_id = [], {}
+    errors, skipped = [], []
+    parsed = total = dropped = 0
+    for index, block in enumerate(blocks):
+        if not block:
+            continue
+        size = len(block.encode('utf-8', 'surrogatepass'))
+        if size > JSON_LD_MAX_BLOCK_BYTES or total + size > JSON_LD_MAX_TOTAL_BYTES:
+            skipped.append({'block': index, 'bytes': size})
+            continue
+        total += size
+        try:
+            data = _loads(_strip_wrapper(block))
+        except (ValueError, RecursionError) as e:  # both decoders' JSONDecodeError is a ValueError
+            errors.append({'block': index, 'error': str(e)[:200]})
+            continue
+        parsed += 1
+        dropped += _walk(data, index, entities, by_id)
+
+    types = []
+    for entity in entities:
+        types.extend(t for t in entity['types'] if t not in types)
+    return {
+        'blocks': len(blocks),
+        'parsed': parsed,
+        'bytes': total,
+        'errors': errors,
+        'skipped': skipped,
+        'types': types,
+        'entities': entities,
+        'entities_dropped': dropped,
+        'decoder': 'orjson' if orjson else 'json',
+    }
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The grader modules import each other flat, as they do when run from api/
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, API_DIR)
@@ -0,0 +1,83 @@
+"""
+Phone and email extraction: tel:/mailto: links, obfuscated addresses, and numbers that
+only appear inside script, style or other markup a visitor never sees.
+"""
+
+import pytest
+
+from contacts import MAX_RESULTS, extract_contacts
+from parsers import available_parsers, parse_features
+
+
+def contacts_of(body, parser="html.parser"):
+    return extract_contacts(parse_features(f"<html><body>{body}</body></html>", parser))
+
+
+@pytest.mark.parametrize("body, phones", [
+    ('<a href="tel:+16025550187">Call us</a>', ["6025550187"]),
+    ('<a href="tel:602-555-0187">Call us</a>', ["6025550187"]),
+    ('<a href="TEL: (602) 555 0187">Call us</a>', ["6025550187"]),
+    ('<a href="tel:911">Emergency</a>', []),  # too short to be a phone number
+    # A link and the visible number it wraps count once, link first
+    ('<a href="tel:+1-602-555-0187">(602) 555-0187</a> or 480.555.0100', ["6025550187", "4805550100"]),
+])
+def test_tel_links(body, phones):
+    assert contacts_of(body)["phones"] == phones
+
+
+@pytest.mark.parametrize("body, emails", [
+    ('<a href="mailto:Info@Example.com">Email us</a>', ["info@example.com"]),
+    ('<a href="mailto:info@example.com?subject=Quote%20request">Email us</a>', ["info@example.com"]),
+    ('<a href="mailto:not-an-address">Email us</a>', []),
+    ('<a href="mailto:info@example.com">info@example.com</a>', ["info@example.com"]),
+])
+def test_mailto_links(body, emails):
+    assert contacts_of(body)["emails"] == emails
+
+
+@pytest.mark.parametrize("body, emails", [
+    # Entity and percent encoding only hide an address from naive scrapers
+    ("<p>info&#64;example&#46;com</p>", ["info@example.com"]),
+    ("<p>info&#x40;example.com</p>", ["info@example.com"]),
+    ('<a href="mailto:info%40example.com">Email us</a>', ["info@example.com"]),
+    ('<p>info<span>@</span>example.com</p>', []),  # split across text nodes, joined with a space
+    # Spelled-out addresses aren't machine-readable; the check asks for a real one
+    ("<p>info [at] example [dot] com</p>", []),
+    ("<p>info(at)example.com</p>", []),
+    # Retina assets look like addresses
+    ("<p>logo@2x.png</p>", []),
+])
+def test_obfuscated_emails(body, emails):
+    assert contacts_of(body)["emails"] == emails
+
+
+@pytest.mark.parametrize("parser", available_parsers())
+@pytest.mark.parametrize("hidden", [
+    '<script>var support = "602-555-0187"; var mail = "dev@example.com";</script>',
+    '<script type="application/ld+json">{"telephone": "602-555-0187", "email": "dev@example.com"}</script>',
+    "<style>/* 602-555-0187 dev@example.com */ .a { width: 6025550187px }</style>",
+    "<template><p>602-555-0187 dev@example.com</p></template>",
+    "<!-- 602-555-0187 dev@example.com -->",
+])
+def test_numbers_in_hidden_markup_are_ignored(hidden, parser):
+    contacts = contacts_of(f"<p>Call 480-555-0100</p>{hidden}", parser)
+    assert contacts["phones"] == ["4805550100"]
+    assert contacts["emails"] == []
+
+
+@pytest.mark.parametrize("text, phones", [
+    ("Order #16025550187000", []),  # digits inside a longer number
+    ("Call +1 602 555 0187", ["6025550187"]),
+    ("ID 98765432101", []),
+])
+def test_phone_boundaries(text, phones):
+    assert contacts_of(f"<p>{text}</p>")["phones"] == phones
+
+
+def test_results_are_capped_and_scan_is_budgeted():
+    numbers = " ".join(f"602-555-01{i:02d}" for i in range(MAX_RESULTS + 3))
+    assert len(contacts_of(f"<p>{numbers}</p>")["phones"]) == MAX_RESULTS
+
+    features = parse_features("<p>" + "word " * 100 + "602-555-0187</p>", "html.parser")
+    contacts = extract_contacts(features, budget=50)
+    assert contacts["truncated"] and contacts["phones"] == []
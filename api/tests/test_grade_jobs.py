@@ -0,0 +1,174 @@
+"""
+The grading job queue against a throwaway SQLite database: claiming, the per-host
+running limit, retries, expiry, leases and batches. Grades are faked and the queue's
+clock is moved by hand; nothing here touches the network.
+"""
+
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+import grade_jobs
+from grade_jobs import GradeJobQueue, batch_response
+from grader_db import create_grader_engine
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [datetime(2026, 1, 1, 12, 0, 0)]
+
+    def advance(seconds):
+        now[0] += timedelta(seconds=seconds)
+
+    monkeypatch.setattr(grade_jobs, '_utcnow', lambda: now[0])
+    return advance
+
+
+@pytest.fixture
+def queue(tmp_path, clock):
+    graded = []
+
+    def grade(url, refresh=False, checks=None, block=False):
+        graded.append(url)
+        return {'success': True, 'url': url}
+
+    queue = GradeJobQueue(create_grader_engine(f"sqlite:///{tmp_path / 'jobs.db'}"), grade_fn=grade)
+    queue.graded = graded
+    return queue
+
+
+def test_claims_oldest_first(queue):
+    first, second = queue.enqueue_many(['https://a.example/1', 'https://b.example/2'])
+    assert queue.claim('w1').id == first.id
+    assert queue.claim('w2').id == second.id
+    assert queue.claim('w3') is None
+
+
+def test_per_host_limit(queue, monkeypatch):
+    monkeypatch.setattr(grade_jobs, 'GRADE_JOB_PER_HOST', 2)
+    jobs = queue.enqueue_many([f'https://busy.example/{i}' for i in range(4)] + ['https://other.example/'])
+
+    claimed = [queue.claim(f'w{i}') for i in range(3)]
+    # Two jobs on busy.example run; the third waits and other.example goes ahead of it
+    assert [job.id for job in claimed] == [jobs[0].id, jobs[1].id, jobs[4].id]
+    assert queue.claim('w4') is None
+
+    queue.complete(claimed[0], 'w0', {'success': True})
+    assert queue.claim('w5').id == jobs[2].id
+
+
+def test_batch_reports_finished_results(queue):
+    jobs = queue.enqueue_many(['https://a.example/', 'https://b.example/'], batch_id='batch-1')
+    queue.enqueue('https://c.example/')
+
+    job = queue.claim('w1')
+    queue.process(job, 'w1')
+
+    batch = batch_response('batch-1', queue.get_batch('batch-1'))
+    assert batch['count'] == 2
+    assert batch['finished'] == 1 and not batch['done']
+    assert [entry['input'] for entry in batch['results']] == ['https://a.example/', 'https://b.example/']
+    assert batch['results'][0]['result'] == {'success': True, 'url': jobs[0].url}
+    assert 'result' not in batch['results'][1]
+
+
+def test_failed_attempt_is_retried_with_backoff(queue, clock):
+    queue.enqueue('https://a.example/', max_attempts=3)
+
+    job = queue.claim('w1')
+    assert queue.fail(job, 'w1', 'timed out')
+    assert queue.get(job.id).status == 'queued'
+    assert queue.claim('w1') is None  # not before the first delay
+
+    clock(grade_jobs.GRADE_JOB_RETRY_DELAY)
+    job = queue.claim('w1')
+    assert job.attempts == 2
+    queue.fail(job, 'w1', 'timed out')
+
+    clock(grade_jobs.GRADE_JOB_RETRY_DELAY)
+    assert queue.claim('w1') is None  # the second delay is twice as long
+    clock(grade_jobs.GRADE_JOB_RETRY_DELAY)
+    job = queue.claim('w1')
+    queue.fail(job, 'w1', 'still timed out')
+
+    failed = queue.get(job.id)
+    assert failed.status == 'failed' and failed.error == 'still timed out'
+    clock(grade_jobs.GRADE_JOB_RETRY_DELAY * 10)
+    assert queue.claim('w1') is None
+
+
+
+def test_unstarted_jobs_expire_and_finished_jobs_are_deleted(queue, clock):
+    stale = queue.enqueue('https://stale.example/')
+    clock(grade_jobs.GRADE_JOB_QUEUE_TIMEOUT + 1)
+    finished = queue.enqueue('https://finished.example/')
+
+    queue.expire()
+    assert queue.get(stale.id).status == 'expired'
+    queue.process(queue.claim('w1'), 'w1')
+    assert queue.claim('w1') is None
+    assert queue.get(finished.id).status == 'done'
+
+    clock(grade_jobs.GRADE_JOB_RESULT_TTL + 1)
+    queue.expire()
+    assert queue.get(stale.id) is None
+    assert queue.get(finished.id) is None
+
+
+def test_abandoned_last_attempt_fails(queue, clock):
+    job = queue.enqueue('https://a.example/', max_attempts=1)
+    queue.claim('w1')
+
+    clock(grade_jobs.GRADE_JOB_LEASE + 1)
+    queue.expire()
+    assert queue.get(job.id).status == 'failed'
+    assert queue.claim('w2') is None
+
+
+def test_expired_lease_is_taken_over(queue, clock):
+    queue.enqueue('https://a.example/')
+    job = queue.claim('w1')
+    assert queue.claim('w2') is None
+
+    clock(grade_jobs.GRADE_JOB_LEASE + 1)
+    taken = queue.claim('w2')
+    assert taken.id == job.id and taken.attempts == 2
+    # The first worker finishing late must not overwrite the new attempt
+    assert not queue.complete(job, 'w1', {'success': True})
+    assert not queue.renew(job.id, 'w1')
+    assert queue.complete(taken, 'w2', {'success': True})
+    assert queue.get(job.id).status == 'done'
+
+
+def test_renewed_lease_is_not_taken_over(queue, clock):
+    queue.enqueue('https://a.example/')
+    job = queue.claim('w1')
+
+    for _ in range(3):
+        clock(grade_jobs.GRADE_JOB_LEASE - 1)
+        assert queue.renew(job.id, 'w1')
+        assert queue.claim('w2') is None
+    assert not queue.renew(job.id, 'w2')
+
+
+def test_process_renews_lease_while_running(queue, clock, monkeypatch):
+    monkeypatch.setattr(grade_jobs, 'HEARTBEAT_INTERVAL', 0.01)
+    queue.enqueue('https://slow.example/')
+    job = queue.claim('w1')
+    renewed = threading.Event()
+
+    def slow_grade(url, refresh=False, checks=None, block=False):
+        leased_until = queue.get(job.id).lease_expires_at
+        clock(grade_jobs.GRADE_JOB_LEASE / 2)
+        for _ in range(500):
+            if queue.get(job.id).lease_expires_at > leased_until:
+                renewed.set()
+                break
+            threading.Event().wait(0.01)
+        return {'success': True, 'url': url}
+
+    queue.grade_fn = slow_grade
+    queue.process(job, 'w1')
+    assert renewed.is_set()
+    assert queue.get(job.id).status == 'done'
@@ -0,0 +1,109 @@
+"""
+KeywordMatcher: word boundaries, overlapping phrases and case folding, and on the fixture
+corpus the same hits as a plain substring search except where a match starts (or, for
+short keywords, ends) inside a word.
+"""
+
+import re
+
+import pytest
+
+from grader import CONTENT_KEYWORDS, PAGE_KEYWORDS
+from keywords import KeywordMatcher, WHOLE_WORD_MAX_LEN
+from parser_parity import fixture_paths, read_fixture
+from parsers import parse_features
+
+
+def found(keywords, text):
+    return KeywordMatcher({"group": keywords}).scan(text)["group"]
+
+
+@pytest.mark.parametrize("keyword, text, expected", [
+    # Short keywords only match whole words
+    ("az", "serving phoenix, az and beyond", True),
+    ("az", "amazing results", False),
+    ("az", "az.", True),
+    ("rd", "123 main rd, suite 4", True),
+    ("rd", "our third project", False),
+    ("bbb", "bbb accredited", True),
+    ("bbb", "bbbs", False),
+    # Longer keywords match as word prefixes, never from inside a word
+    ("remodel", "kitchen remodeling", True),
+    ("review", "read our reviews", True),
+    ("review", "a preview of the work", False),
+    ("schedule", "rescheduled", False),
+    # Keywords ending in punctuation have no boundary after them
+    ("roc#", "roc#123456", True),
+    ("license:", "license: 12345", True),
+    # Any run of whitespace matches the space in a phrase
+    ("free estimate", "get a free   estimate", True),
+    ("free estimate", "get a free\nestimate", True),
+    ("free estimate", "get a freeestimate", False),
+    ("free estimate", "free estimates today", True),
+])
+def test_word_boundaries(keyword, text, expected):
+    assert found([keyword], text) == ([keyword] if expected else [])
+
+
+@pytest.mark.parametrize("keywords, text, expected", [
+    # A longer keyword also satisfies the shorter ones it starts with
+    (["service", "service area"], "our service area", ["service", "service area"]),
+    (["service", "service area"], "service only", ["service"]),
+    # Keywords overlapping at different word starts are all found
+    (["kitchen remodel", "remodel"], "kitchen remodeling", ["kitchen remodel", "remodel"]),
+    (["we serve", "serve the valley"], "we serve the valley", ["we serve", "serve the valley"]),
+    # A short whole-word keyword isn't implied by a longer one running on past it
+    (["rd", "rdx"], "rdx", ["rdx"]),
+    (["call now", "call today"], "call today", ["call today"]),
+])
+def test_overlapping_phrases(keywords, text, expected):
+    assert found(keywords, text) == expected
+
+
+@pytest.mark.parametrize("keywords, text, expected", [
+    (["Free Estimate"], "get a free estimate", ["free estimate"]),
+    (["FAQ", "Q&A"], "faq and q&a", ["faq", "q&a"]),
+    (["  We   Serve "], "we serve mesa", ["we serve"]),
+])
+def test_case_folding(keywords, text, expected):
+    # Keywords are folded when compiled; scan() takes text the caller already lowercased
+    assert found(keywords, text) == expected
+
+
+def test_groups_keep_declaration_order_and_share_keywords():
+    matcher = KeywordMatcher({"address": ["suite", "phoenix"], "area": ["tempe", "phoenix"]})
+    assert matcher.scan("phoenix office, suite 2, near tempe") == {
+        "address": ["suite", "phoenix"],
+        "area": ["tempe", "phoenix"],
+    }
+
+
+def substring_hits(matcher, text):
+    """The old behaviour: a keyword counted if it appeared anywhere in the text"""
+    text = " ".join(text.split())
+    return {name: [p for p in patterns if p in text] for name, patterns in matcher.groups.items()}
+
+
+def boundary_hits(matcher, text):
+    """Substring search with the matcher's word rules, one keyword at a time"""
+    def hit(pattern):
+        regex = r"(?<!\w)" + r"\s+".join(re.escape(word) for word in pattern.split(" "))
+        if len(pattern) <= WHOLE_WORD_MAX_LEN and re.match(r"\w", pattern[-1]):
+            regex += r"(?!\w)"
+        return re.search(regex, text) is not None
+
+    return {name: [p for p in patterns if hit(p)] for name, patterns in matcher.groups.items()}
+
+
+@pytest.mark.parametrize("path", fixture_paths(), ids=lambda path: path.rsplit("/", 1)[-1])
+@pytest.mark.parametrize("matcher, field", [(PAGE_KEYWORDS, "visible_text"), (CONTENT_KEYWORDS, "content_text")],
+                         ids=["page", "content"])
+def test_fixtures_match_substring_search(path, matcher, field):
+    text = getattr(parse_features(read_fixture(path), "html.parser"), field).lower()
+    hits = matcher.scan(text)
+    old = substring_hits(matcher, text)
+
+    assert hits == boundary_hits(matcher, text)
+    for name, keywords in hits.items():
+        # Word boundaries only ever drop substring hits, never add any
+        assert set(keywords) <= set(old[name])
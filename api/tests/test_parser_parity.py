@@ -0,0 +1,32 @@
+"""
+Every HTML parser backend must grade the fixture corpus exactly like the html.parser
+reference: same scores, issues and recommendations for every page in api/fixtures/pages.
+Backends whose dependencies aren't installed are skipped.
+"""
+
+import os
+
+import pytest
+
+from parser_parity import (BACKENDS, FIXTURES_DIR, REFERENCE_PARSER, diff_results, fixture_paths,
+                           grade_fixture, read_fixture)
+from parsers import available_parsers
+
+FIXTURES = fixture_paths()
+
+
+def test_fixture_corpus_present():
+    assert FIXTURES, f"no fixtures in {FIXTURES_DIR}"
+
+
+@pytest.mark.parametrize("parser", BACKENDS)
+@pytest.mark.parametrize("path", FIXTURES, ids=os.path.basename)
+def test_backend_matches_reference(path, parser):
+    if parser not in available_parsers():
+        pytest.skip(f"{parser} is not installed")
+    html = read_fixture(path)
+
+    expected = grade_fixture(html, REFERENCE_PARSER)
+    actual = grade_fixture(html, parser)
+
+    assert diff_results(expected, actual) == []
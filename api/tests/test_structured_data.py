@@ -0,0 +1,136 @@
+"""
+JSON-LD extraction: @graph members, @type given as a list, nested entities, repeated
+@ids, and a malformed block next to a valid one - both in extract_json_ld() and in the
+structured data score a page gets from it.
+"""
+
+import json
+
+import pytest
+
+import structured_data
+from grader import WebsiteGrader
+from structured_data import extract_json_ld
+
+LOCAL_BUSINESS = {
+    "@context": "https://schema.org",
+    "@type": "LocalBusiness",
+    "@id": "https://example.com/#business",
+    "name": "Desert Remodeling",
+    "address": {"@type": "PostalAddress", "streetAddress": "1 Main St", "addressLocality": "Phoenix"},
+    "aggregateRating": {"@type": "AggregateRating", "ratingValue": "4.9", "reviewCount": "87"},
+}
+
+YOAST_GRAPH = {
+    "@context": "https://schema.org",
+    "@graph": [
+        {"@type": "WebSite", "@id": "https://example.com/#website", "name": "Example"},
+        {"@type": ["Organization", "HomeAndConstructionBusiness"], "@id": "https://example.com/#org",
+         "name": "Example Co", "logo": {"@type": "ImageObject", "url": "https://example.com/logo.png"}},
+        {"@type": "WebPage", "@id": "https://example.com/", "isPartOf": {"@id": "https://example.com/#website"}},
+    ],
+}
+
+FAQ = {
+    "@context": "https://schema.org",
+    "@type": "FAQPage",
+    "mainEntity": [
+        {"@type": "Question", "name": "Do you pull permits?",
+         "acceptedAnswer": {"@type": "Answer", "text": "Yes."}},
+        {"@type": "Question", "name": "Are you insured?",
+         "acceptedAnswer": {"@type": "Answer", "text": "Yes."}},
+    ],
+}
+
+
+def extract(*data):
+    return extract_json_ld([d if isinstance(d, str) else json.dumps(d) for d in data])
+
+
+def test_graph_members_are_entities():
+    result = extract(YOAST_GRAPH)
+    assert result["types"] == ["WebSite", "Organization", "HomeAndConstructionBusiness", "ImageObject", "WebPage"]
+    # In document order; an @id reference without a @type (isPartOf) is not an entity
+    assert [entity["path"] for entity in result["entities"]] == [
+        "[0].@graph[0]", "[0].@graph[1]", "[0].@graph[1].logo", "[0].@graph[2]",
+    ]
+
+
+@pytest.mark.parametrize("type_value, expected", [
+    ("LocalBusiness", ["LocalBusiness"]),
+    (["LocalBusiness", "RoofingContractor"], ["LocalBusiness", "RoofingContractor"]),
+    (["https://schema.org/Service", "schema:Product", "http://schema.org/Review"], ["Service", "Product", "Review"]),
+    (["", None, 7, "Organization"], ["Organization"]),
+    ([], []),
+])
+def test_type_lists_and_prefixes(type_value, expected):
+    result = extract({"@context": "https://schema.org", "@type": type_value, "name": "Example"})
+    assert result["types"] == expected
+    assert len(result["entities"]) == (1 if expected else 0)
+
+
+def test_nested_entities():
+    result = extract(LOCAL_BUSINESS, FAQ)
+    assert result["types"] == ["LocalBusiness", "PostalAddress", "AggregateRating", "FAQPage", "Question", "Answer"]
+    paths = {entity["path"]: entity for entity in result["entities"]}
+    assert paths["[0].address"]["types"] == ["PostalAddress"]
+    assert paths["[1].mainEntity[1]"]["name"] == "Are you insured?"
+    assert paths["[1].mainEntity[1].acceptedAnswer"]["types"] == ["Answer"]
+    assert paths["[0]"]["properties"] == ["address", "aggregateRating", "name"]
+
+
+def test_repeated_id_merges_types():
+    extra = {"@context": "https://schema.org", "@type": "RoofingContractor", "@id": "https://example.com/#business"}
+    result = extract(LOCAL_BUSINESS, extra)
+    business = [entity for entity in result["entities"] if entity["id"] == "https://example.com/#business"]
+    assert len(business) == 1
+    assert business[0]["types"] == ["LocalBusiness", "RoofingContractor"]
+
+
+@pytest.mark.parametrize("malformed", [
+    '{"@context": "https://schema.org", "@type": "Service",}',  # trailing comma
+    '{"@type": "Service", "name": "Unterminated',
+    "<!-- not json -->",
+])
+def test_malformed_block_next_to_valid_one(malformed):
+    result = extract(malformed, LOCAL_BUSINESS)
+    assert result["parsed"] == 1
+    assert [error["block"] for error in result["errors"]] == [0]
+    assert result["types"] == ["LocalBusiness", "PostalAddress", "AggregateRating"]
+    assert result["entities"][0]["path"] == "[1]"
+
+
+def test_wrapped_blocks_are_unwrapped():
+    result = extract("<!--" + json.dumps(FAQ) + "-->", "//<![CDATA[\n" + json.dumps(LOCAL_BUSINESS) + "\n//]]>")
+    assert result["errors"] == []
+    assert "FAQPage" in result["types"] and "LocalBusiness" in result["types"]
+
+
+def test_oversized_block_is_skipped(monkeypatch):
+    monkeypatch.setattr(structured_data, "JSON_LD_MAX_BLOCK_BYTES", len(json.dumps(FAQ)))
+    padded = dict(LOCAL_BUSINESS, description="x" * 500)
+    result = extract(padded, FAQ)
+    assert [skip["block"] for skip in result["skipped"]] == [0]
+    assert result["types"][0] == "FAQPage"
+
+
+def graded(*blocks):
+    scripts = "".join(f'<script type="application/ld+json">{block}</script>' for block in blocks)
+    grader = WebsiteGrader("https://example.com")
+    grader.html = f"<html><head><title>Example</title>{scripts}</head><body><p>Hello</p></body></html>"
+    grader.parse_page()
+    grader.run_checks(["structured_data"])
+    return grader
+
+
+def test_score_counts_graph_and_nested_types():
+    grader = graded(json.dumps(LOCAL_BUSINESS), json.dumps(FAQ))
+    # LocalBusiness, AggregateRating (nested) and FAQPage
+    assert grader.scores["structured_data"] == 100
+    assert "FAQPage" in grader.scores["schema_types"]
+
+
+def test_score_survives_malformed_block():
+    grader = graded('{"@type": "Service",}', json.dumps(YOAST_GRAPH))
+    assert grader.scores["structured_data"] == 50  # Organization, from the @graph
+    assert "A JSON-LD block can't be parsed - search engines ignore it" in grader.issues
@@ -0,0 +1,272 @@
+"""
+Remodely AI - TLS Certificate Inspection
+Opens a TLS connection to the page's host - in parallel with the page fetch - and reports
+the certificate's expiry, whether its chain verifies and matches the hostname, the
+protocol the server negotiates and whether it still accepts TLS 1.0/1.1. Results are cached per host and port, and concurrent
+inspections of one host share a single handshake, so batch grades and regrades of a site
+don't repeat the handshake.
+"""
+
+import calendar
+import os
+import socket
+import ssl
+import threading
+import time
+import warnings
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+
+import certifi
+
+from single_flight import SingleFlight
+
+TLS_TIMEOUT = float(os.environ.get('GRADER_TLS_TIMEOUT', 5.0))  # connect + handshake, seconds
+TLS_CACHE_TTL = int(os.environ.get('GRADER_TLS_CACHE_TTL', 6 * 3600))
+TLS_CACHE_MAX_ENTRIES = 5000
+TLS_WORKERS = int(os.environ.get('GRADER_TLS_WORKERS', 16))
+
+EXPIRY_WARNING_DAYS = 14
+EXPIRY_NOTICE_DAYS = 30
+
+# OpenSSL verify codes the check explains in plain words
+X509_NOT_YET_VALID = 9
+X509_EXPIRED = 10
+X509_SELF_SIGNED = (18, 19)
+X509_MISSING_ISSUER = (2, 20, 21)
+X509_HOSTNAME_MISMATCH = 62
+
+
+class TLSCache:
+    """Per-process LRU of finished inspections, keyed by (host, port)"""
+
+    def __init__(self, ttl=TLS_CACHE_TTL, max_entries=TLS_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.time() - entry[0] >= self.ttl:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, inspection):
+        with self._lock:
+            self._entries[key] = (time.time(), inspection)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries)}
+
+
+tls_cache = TLSCache()
+tls_flights = SingleFlight()
+_executor = ThreadPoolExecutor(max_workers=TLS_WORKERS, thread_name_prefix='tls-inspect')
+
+
+def _der_item(der, pos):
+    """(tag, content start, content end) of the DER element at pos"""
+    tag, length = der[pos], der[pos + 1]
+    pos += 2
+    if length & 0x80:
+        size = length & 0x7f
+        length = int.from_bytes(der[pos:pos + size], 'big')
+        pos += size
+    return tag, pos, pos + length
+
+
+def der_validity(der):
+    """(not before, not after) as epoch seconds, read straight from a DER certificate"""
+    _, pos, _ = _der_item(der, 0)  # Certificate
+    _, pos, _ = _der_item(der, pos)  # TBSCertificate
+    tag, _, end = _der_item(der, pos)
+    if tag == 0xa0:  # explicit version
+        pos = end
+    for _ in range(3):  # serial number, signature algorithm, issuer
+        pos = _der_item(der, pos)[2]
+    _, pos, _ = _der_item(der, pos)  # Validity
+    times = []
+    for _ in range(2):
+        tag, start, end = _der_item(der, pos)
+        text = der[start:end].decode('ascii')
+        fmt = '%y%m%d%H%M%SZ' if tag == 0x17 else '%Y%m%d%H%M%SZ'  # UTCTime / GeneralizedTime
+        times.append(calendar.timegm(time.strptime(text, fmt)))
+        pos = end
+    return times[0], times[1]
+
+
+def _name(rdns):
+    return {key: value for rdn in rdns or () for key, value in rdn}
+
+
+def _iso(seconds):
+    return datetime.fromtimestamp(seconds, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def _handshake(host, port, context, timeout):
+    with socket.create_connection((host, port), timeout=timeout) as sock:
+        with context.wrap_socket(sock, server_hostname=host) as tls:
+            return tls.version(), tls.cipher()[0], tls.getpeercert(), tls.getpeercert(binary_form=True)
+
+
+def _ca_bundle():
+    """The trust store the page fetch verifies against, found the way requests finds it"""
+    return os.environ.get('REQUESTS_CA_BUNDLE') or os.environ.get('CURL_CA_BUNDLE') or certifi.where()
+
+
+def _context(verify):
+    context = ssl.create_default_context(cafile=_ca_bundle())
+    if not verify:
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+    return context
+
+
+def _legacy_context():
+    """
+    An unverified context offering only TLS 1.0 and 1.1
+    A normal handshake always negotiates the newest version both sides support, and OpenSSL 3
+    refuses these versions at its default security level, so they have to be asked for alone
+    """
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', DeprecationWarning)
+        context.minimum_version = ssl.TLSVersion.TLSv1
+        context.maximum_version = ssl.TLSVersion.TLSv1_1
+    context.set_ciphers('ALL:@SECLEVEL=0')
+    return context
+
+
+def legacy_protocol(host, port=443, timeout=TLS_TIMEOUT):
+    """
+    (checked, version): the TLS 1.0/1.1 version host still accepts, or None if it refuses both
+    checked is False when this machine's OpenSSL can't offer those versions at all
+    """
+    try:
+        return True, _handshake(host, port, _legacy_context(), timeout)[0]
+    except (ssl.SSLError, ValueError) as e:
+        if isinstance(e, ValueError) or getattr(e, 'reason', None) == 'NO_PROTOCOLS_AVAILABLE':
+            return False, None
+        return True, None  # the server refused the handshake
+    except OSError:
+        return True, None  # many servers just drop the connection
+
+
+def inspect_certificate(host, port=443, timeout=TLS_TIMEOUT):
+    """
+    Handshake with host and describe its certificate; never raises
+    A certificate that fails verification is fetched again unverified, for its dates and protocol
+    """
+    inspection = {
+        'host': host, 'port': port, 'protocol': None, 'cipher': None,
+        'chain_valid': None, 'hostname_match': None, 'verify_error': None, 'verify_code': None,
+        'subject': None, 'issuer': None, 'san_count': None, 'not_before': None, 'not_after': None,
+        'expires_at': None, 'legacy_checked': False, 'legacy_protocol': None,
+        'error': None, 'inspected_at': time.time(),
+    }
+    try:
+        try:
+            protocol, cipher, cert, der = _handshake(host, port, _context(True), timeout)
+            inspection.update(chain_valid=True, hostname_match=True,
+                              subject=_name(cert.get('subject')).get('commonName'),
+                              issuer=_name(cert.get('issuer')).get('organizationName'),
+                              san_count=len(cert.get('subjectAltName', ())))
+        except ssl.SSLCertVerificationError as e:
+            inspection['verify_code'] = e.verify_code
+            inspection['verify_error'] = e.verify_message
+            if e.verify_code == X509_HOSTNAME_MISMATCH:
+                inspection.update(chain_valid=True, hostname_match=False)
+            else:
+                inspection['chain_valid'] = False  # hostname unknown: verification stopped at the chain
+            protocol, cipher, _, der = _handshake(host, port, _context(False), timeout)
+        inspection.update(protocol=protocol, cipher=cipher)
+        not_before, not_after = der_validity(der)
+        inspection.update(not_before=_iso(not_before), not_after=_iso(not_after), expires_at=not_after)
+        inspection['legacy_checked'], inspection['legacy_protocol'] = legacy_protocol(host, port, timeout)
+    except Exception as e:
+        inspection['error'] = str(e) or type(e).__name__
+    return inspection
+
+
+def inspect_cached(host, port=443, timeout=TLS_TIMEOUT):
+    """
+    inspect_certificate through the per-host cache, coalescing concurrent calls
+    Only finished handshakes are cached; connection failures are retried next time
+    """
+    key = (host.lower(), port)
+    inspection = tls_cache.get(key)
+    if inspection is not None:
+        return dict(inspection, cached=True)
+
+    def inspect():
+        result = inspect_certificate(host, port, timeout)
+        if result['error'] is None:
+            tls_cache.put(key, result)
+        return result
+
+    inspection, _ = tls_flights.do(key, inspect)
+    return dict(inspection, cached=False)
+
+
+def tls_target(url):
+    """(host, port) to inspect for an https URL, else None"""
+    parsed = urlparse(url)
+    if parsed.scheme != 'https' or not parsed.hostname:
+        return None
+    return parsed.hostname, parsed.port or 443
+
+
+def days_left(inspection, now=None):
+    """Whole days until the certificate expires (negative once it has), None if unknown"""
+    if inspection.get('expires_at') is None:
+        return None
+    return int((inspection['expires_at'] - (now or time.time())) // 86400)
+
+
+class TLSInspection:
+    """
+    Inspects the page's host on a thread pool, started alongside the page fetch
+    result(final_url) waits for it - or inspects the host the page redirected to instead
+    """
+
+    def __init__(self, page_url):
+        self.target = tls_target(page_url)
+        self._future = _executor.submit(inspect_cached, *self.target) if self.target else None
+
+    def cancel(self):
+        if self._future:
+            self._future.cancel()
+
+    def result(self, final_url):
+        target = tls_target(final_url)
+        if target is None:
+            return None
+        if target != self.target or self._future is None or self._future.cancelled():
+            self.cancel()
+            self.target = target
+            self._future = _executor.submit(inspect_cached, *target)
+        try:
+            return self._future.result(timeout=TLS_TIMEOUT * 2 + 1)
+        except Exception as e:
+            return {'host': target[0], 'port': target[1], 'error': str(e) or type(e).__name__}
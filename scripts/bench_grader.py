@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Benchmark WebsiteGrader over the fixture corpus.
+Serves each saved page from a local HTTP fixture server (every other path answers
+as a fixed-size asset, so the page-weight audit stays local too), grades it end to
+end - fetch, parse, every check - and reports pages/sec, the median time of each
+step and peak memory per page. Each run is compared against a baseline - by default
+the one committed at api/fixtures/bench/baseline.json - and exits non-zero when a
+page got slower or heavier than the threshold allows. After an intended change in
+speed or memory, regenerate the baseline with --save.
+
+Usage: python scripts/bench_grader.py [--parser NAME] [--min-time S] [--threshold 0.5]
+       python scripts/bench_grader.py --save api/fixtures/bench/baseline.json
+       python scripts/bench_grader.py --baseline FILE | --no-baseline
+"""
+
+import argparse
+import gzip
+import json
+import os
+import platform
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API_DIR = os.path.join(BASE_DIR, "api")
+FIXTURES_DIR = os.path.join(API_DIR, "fixtures")
+DEFAULT_BASELINE = os.path.join(FIXTURES_DIR, "bench", "baseline.json")
+
+sys.path.insert(0, API_DIR)
+
+from grader import WebsiteGrader  # noqa: E402
+from parsers import DEFAULT_PARSER  # noqa: E402
+
+# name -> saved page, relative to api/fixtures (.gz files are served decompressed)
+CORPUS = [
+    ("tiny", "pages/tiny.html"),
+    ("contractor", "pages/contractor.html"),
+    ("page_builder", "bench/page_builder.html.gz"),  # 5MB Elementor-style export
+    ("inline_js", "bench/inline_js.html.gz"),  # hydration blob, 900 inline scripts, markup in strings
+]
+
+ASSET_BYTES = 24000  # Content-Length the fixture server reports for every sub-resource
+
+# Allowed slowdown (or memory growth) before a run counts as a regression. Timings of separate
+# runs on one shared or single-CPU machine differ by up to about half, so only a clear
+# regression fails the default comparison; pass a lower --threshold on a quiet machine
+DEFAULT_THRESHOLD = 0.5
+STEP_NOISE_MS = 5.0  # step changes smaller than this are run-to-run noise, whatever the ratio
+MEMORY_NOISE_BYTES = 256 * 1024
+
+
+def load_corpus():
+    pages = {}
+    for name, path in CORPUS:
+        full = os.path.join(FIXTURES_DIR, path)
+        opener = gzip.open if full.endswith(".gz") else open
+        with opener(full, "rb") as f:
+            pages[name] = f.read()
+    return pages
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like a real origin
+    disable_nagle_algorithm = True  # headers and body go out in separate writes
+    pages = {}
+
+    def _respond(self, body_allowed):
+        name = self.path.lstrip("/")
+        if name in self.pages:
+            body = self.pages[name]
+            content_type = "text/html; charset=utf-8"
+        else:
+            body = b"\0" * ASSET_BYTES
+            content_type = "application/octet-stream"
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body_allowed:
+            self.wfile.write(body)
+
+    def do_GET(self):
+        self._respond(True)
+
+    def do_HEAD(self):
+        self._respond(False)
+
+    def log_message(self, *args):
+        pass
+
+
+class FixtureServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # The grader hangs up on pages over its size limit mid-download; that's expected
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def start_fixture_server(pages):
+    FixtureHandler.pages = pages
+    server = FixtureServer(("127.0.0.1", 0), FixtureHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def grade_once(url, parser):
+    grader = WebsiteGrader(url, parser=parser)
+    if not grader.fetch_page():
+        raise RuntimeError(f"Fixture fetch failed: {grader.issues}")
+    grader.run_checks()
+    return grader
+
+
+def bench_page(url, parser, min_time, min_iterations):
+    """Grade one page repeatedly (after a warm-up) for at least min_time seconds and min_iterations runs"""
+    grader = grade_once(url, parser)
+    page_bytes, truncated = grader.page_bytes, grader.truncated
+
+    steps = {}
+    totals = []
+    iterations = 0
+    started = time.perf_counter()
+    while iterations < min_iterations or time.perf_counter() - started < min_time:
+        run_started = time.perf_counter()
+        grader = grade_once(url, parser)
+        totals.append(time.perf_counter() - run_started)
+        for step, seconds in grader.step_timings.items():
+            steps.setdefault(step, []).append(seconds)
+        iterations += 1
+    elapsed = time.perf_counter() - started
+
+    # Separate run: tracemalloc slows everything down too much to time alongside it
+    tracemalloc.start()
+    grade_once(url, parser)
+    peak_bytes = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "page_bytes": page_bytes,
+        "truncated": truncated,
+        "iterations": iterations,
+        "pages_per_sec": round(iterations / elapsed, 2),
+        "median_ms": round(statistics.median(totals) * 1000, 2),
+        "best_ms": round(min(totals) * 1000, 2),
+        "steps": {step: round(statistics.median(values) * 1000, 3) for step, values in steps.items()},
+        "peak_bytes": peak_bytes,
+    }
+
+
+def print_report(results):
+    print(f"\n{'page':<14}{'size':>10}{'pages/s':>10}{'median ms':>12}{'best ms':>10}{'peak MB':>10}  (Python heap)")
+    for name, r in results["pages"].items():
+        size = f"{r['page_bytes'] / 1024:.0f}K" + ("*" if r["truncated"] else "")
+        print(f"{name:<14}{size:>10}{r['pages_per_sec']:>10}{r['median_ms']:>12}{r['best_ms']:>10}"
+              f"{r['peak_bytes'] / 2**20:>10.1f}")
+    if any(r["truncated"] for r in results["pages"].values()):
+        print("* cut off at the grader's page size limit, as in production")
+    if results.get("max_rss_bytes"):
+        print(f"Process max RSS {results['max_rss_bytes'] / 2**20:.0f} MB (includes parser C libraries)")
+
+    names = list(results["pages"])
+    steps = []
+    for r in results["pages"].values():
+        steps.extend(step for step in r["steps"] if step not in steps)
+    print(f"\n{'median ms per step':<28}" + "".join(f"{name:>14}" for name in names))
+    for step in steps:
+        cells = [results["pages"][name]["steps"].get(step) for name in names]
+        print(f"{step:<28}" + "".join(f"{'-' if c is None else c:>14}" for c in cells))
+
+
+def max_rss_bytes():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def find_regressions(baseline, results, threshold):
+    """
+    Human-readable regressions of results against a saved baseline
+    A page's time is its fastest run, the one least slowed by whatever else the machine was doing
+    """
+    regressions = []
+    for name, current in results["pages"].items():
+        base = baseline["pages"].get(name)
+        if not base:
+            continue
+        if current["best_ms"] > base["best_ms"] * (1 + threshold):
+            regressions.append(f"{name}: best run {current['best_ms']} ms, baseline {base['best_ms']} ms")
+        for step, ms in current["steps"].items():
+            was = base["steps"].get(step)
+            if was is not None and ms > was * (1 + threshold) and ms - was > STEP_NOISE_MS:
+                regressions.append(f"{name}: {step} {ms} ms, baseline {was} ms")
+        grown = current["peak_bytes"] - base["peak_bytes"]
+        if current["peak_bytes"] > base["peak_bytes"] * (1 + threshold) and grown > MEMORY_NOISE_BYTES:
+            regressions.append(f"{name}: peak memory {current['peak_bytes']} bytes, baseline {base['peak_bytes']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the website grader over the fixture corpus")
+    parser.add_argument("--parser", default=DEFAULT_PARSER, help="HTML parser backend")
+    parser.add_argument("--min-time", type=float, default=2.0, help="seconds to spend on each page")
+    parser.add_argument("--min-iterations", type=int, default=3, help="runs per page at least")
+    parser.add_argument("--pages", help="comma-separated subset of: " + ", ".join(name for name, _ in CORPUS))
+    parser.add_argument("--save", help="write the results as JSON (e.g. to use as a baseline)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE,
+                        help="results JSON to compare against (default: the committed baseline)")
+    parser.add_argument("--no-baseline", dest="baseline", action="store_const", const=None,
+                        help="only report, don't compare")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"allowed regression as a fraction (default {DEFAULT_THRESHOLD})")
+    args = parser.parse_args()
+
+    pages = load_corpus()
+    selected = args.pages.split(",") if args.pages else list(pages)
+    unknown = [name for name in selected if name not in pages]
+    if unknown:
+        parser.error(f"unknown page(s): {', '.join(unknown)}")
+
+    server, base_url = start_fixture_server(pages)
+    results = {
+        "meta": {
+            "parser": args.parser,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+        },
+        "pages": {},
+    }
+    try:
+        for name in selected:
+            print(f"  {name}...", flush=True)
+            results["pages"][name] = bench_page(f"{base_url}/{name}", args.parser,
+                                                args.min_time, args.min_iterations)
+    finally:
+        server.shutdown()
+    results["max_rss_bytes"] = max_rss_bytes()
+
+    print_report(results)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved results to {args.save}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline["meta"]["parser"] != results["meta"]["parser"]:
+            print(f"\nNot compared: {args.baseline} was taken with the {baseline['meta']['parser']} parser")
+            return 0
+        if baseline["meta"] != results["meta"]:
+            print(f"\nNote: baseline was taken with {baseline['meta']}, this run is {results['meta']}")
+        regressions = find_regressions(baseline, results, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}:")
+            for regression in regressions:
+                print(f"  [FAIL] {regression}")
+            return 1
+        print(f"\nNo regressions over {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Verify every HTML parser backend grades the fixture corpus identically.
+Runs all WebsiteGrader checks offline on api/fixtures/pages/*.html with each
+installed backend and compares scores, issues and recommendations against
+the html.parser reference. Exits non-zero on any difference.
+The same comparison (api/parser_parity.py) runs in the test suite
+(api/tests/test_parser_parity.py); this script prints every differing score
+for debugging a backend.
+
+Usage: python scripts/check_parser_parity.py
+"""
+
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API_DIR = os.path.join(BASE_DIR, "api")
+
+sys.path.insert(0, API_DIR)
+
+from parser_parity import REFERENCE_PARSER, diff_results, fixture_paths, grade_fixture, read_fixture  # noqa: E402
+from parsers import available_parsers  # noqa: E402
+
+
+def main():
+    parsers = [p for p in available_parsers() if p != REFERENCE_PARSER]
+    if not parsers:
+        print("Only html.parser is installed - install lxml and selectolax to compare backends")
+        return 1
+
+    fixtures = fixture_paths()
+    failures = 0
+
+    for path in fixtures:
+        html = read_fixture(path)
+        name = os.path.basename(path)
+        expected = grade_fixture(html, REFERENCE_PARSER)
+
+        for parser in parsers:
+            diffs = diff_results(expected, grade_fixture(html, parser))
+            if diffs:
+                failures += 1
+                print(f"  [FAIL] {name} ({parser})")
+                for d in diffs:
+                    print(f"         {d}")
+            else:
+                print(f"  [OK]   {name} ({parser})")
+
+    print(f"\n{len(fixtures)} fixtures x {len(parsers)} backends, {failures} mismatches")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())